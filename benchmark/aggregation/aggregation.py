@@ -1,44 +1,145 @@
 import numpy as np
 import pandas as pd
 
-from benchmark.config import BLOCK_SIZE, METRICS_PATH
+from benchmark.aggregation.cache import FRAME_CACHE, files_signature
+from benchmark.aggregation.downsampling import lttb_indices
+from benchmark.config import BLOCK_SIZE, METRICS_PATH, DYNAMIC_CHART_POINTS
+from benchmark.metrics.histogram import LatencyHistogram
+from benchmark.metrics.result_store import ResultStore, store_path, OPS, UNITS, ROLLUP_SECONDS, ROLLUP_STEPS, \
+    ROLLUP_LATENCY
 
+MEASURE_WINDOW = "measure"
+# groupings the per second rollups keep apart
+ROLLUP_CRITERIA = ("phase_id", "operation_id", "operation_type", "thread_id")
 
-def df_by_operation(execution_id, group_by: str | None, aggregation):
-    df = pd.read_csv(METRICS_PATH / f"{execution_id}_ops.csv")
+
+def filter_windows(df, include_transient: bool):
+    """Drops warm-up and cool-down rows unless include_transient is set"""
+    if "window" not in df:
+        df["window"] = MEASURE_WINDOW
+    if include_transient:
+        return df
+    return df[df["window"] == MEASURE_WINDOW].copy()
+
+
+def read_table(execution_id, table):
+    """Reads a result table from the columnar store, or from the CSV of runs made before it"""
+    store = ResultStore(store_path(METRICS_PATH, execution_id))
+    if store.exists():
+        return FRAME_CACHE.get((execution_id, table), files_signature(store.files(table)),
+                               lambda: store.read_frame(table))
+    path = METRICS_PATH / f"{execution_id}_{table}.csv"
+    return FRAME_CACHE.get((execution_id, table), files_signature([path]), lambda: read_csv_table(path))
+
+
+def has_rollups(execution_id, table=ROLLUP_SECONDS):
+    """Rollups are written with each batch, rows of a running phase are merged only when it ends"""
+    return ResultStore(store_path(METRICS_PATH, execution_id)).has_table(table)
+
+
+def latency_quantile(metric):
+    """Quantile of a latency_pNNN metric: latency_p50 is 0.5, latency_p999 is 0.999, latency_p100 is 1.0"""
+    digits = metric[len("latency_p"):] if metric.startswith("latency_p") else ""
+    if not digits.isdigit():
+        return None
+    if digits.startswith("100") and not digits[3:].strip("0"):
+        return 1.0
+    return int(digits) / 10 ** len(digits)
+
+
+def read_csv_table(path):
+    df = pd.read_csv(path)
     df["time"] = pd.to_datetime(df["time"], errors="coerce")
+    for column in ("operation_type", "window"):
+        if column in df:
+            df[column] = df[column].astype("category")
+    return df
+
+
+def df_by_operation(execution_id, group_by: str | None, aggregation, include_transient=True):
+    df = read_table(execution_id, OPS)
+    df = filter_windows(df, include_transient)
+    if "ops" not in df:
+        df["ops"] = df["bytes"] // BLOCK_SIZE
+    if "open_duration" not in df:
+        df["open_duration"] = 0.0
     df["latency_ns"] = df["duration"] * 1000 * 1000
+    return add_axis(df, group_by, aggregation)
+
+
+def df_by_units(execution_id, group_by, aggregation, include_transient=True):
+    df = read_table(execution_id, UNITS)
+    df = filter_windows(df, include_transient)
+    df["latency_ns"] = df["duration"] * 1000 * 1000
+    return add_axis(df, group_by, aggregation)
+
 
+def add_axis(df, group_by, aggregation):
+    """Adds integer keys of the x axis: epoch second of the time bucket, or phase and step group"""
     if group_by == "time":
-        df["x"] = (df["time"].dt.floor(f"{aggregation}s")).astype(str)
+        if "second" not in df:
+            if df["time"].isna().any():
+                df = df[df["time"].notna()].copy()
+            df["second"] = df["time"].to_numpy(dtype="datetime64[ns]").view(np.int64) // 1_000_000_000
+        df["time_group"] = df["second"] // aggregation * aggregation
     elif group_by == "step":
         df["step_group"] = df["step_id"] // aggregation * aggregation
-        df["x"] = df.apply(lambda row: (row["phase_id"], row["step_group"]), axis=1)
     return df
 
 
-def df_by_units(execution_id, group_by, aggregation):
-    df = pd.read_csv(METRICS_PATH / f"{execution_id}_units.csv")
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
-    df["latency_ns"] = df["duration"] * 1000 * 1000
+def axis_keys(group_by):
+    return ["time_group"] if group_by == "time" else ["phase_id", "step_group"]
 
+
+def axis_position(df, group_by):
+    """Position on the x axis as one integer, steps are ordered by phase first"""
     if group_by == "time":
-        df["x"] = (df["time"].dt.floor(f"{aggregation}s")).astype(str)
-    elif group_by == "step":
-        df["step_group"] = df["step_id"] // aggregation * aggregation
-        df["x"] = df.apply(lambda row: (row["phase_id"], row["step_group"]), axis=1)
-    return df
+        return df["time_group"].to_numpy(dtype=np.int64)
+    return (df["phase_id"].to_numpy(dtype=np.int64) << 32) | df["step_group"].to_numpy(dtype=np.int64)
+
+
+def parse_axis_position(group_by, value, aggregation):
+    """Position of a zoom bound: a timestamp on the time axis, "phase_id,step" on the step axis"""
+    if group_by == "time":
+        second = pd.Timestamp(value).value // 1_000_000_000
+        return second // aggregation * aggregation
+    phase_id, step = (int(v) for v in value.split(","))
+    return (phase_id << 32) | (step // aggregation * aggregation)
+
+
+def zoom(df, group_by, aggregation, start=None, end=None):
+    if not start and not end:
+        return df
+    position = axis_position(df, group_by)
+    mask = np.ones(len(df), dtype=bool)
+    if start:
+        mask &= position >= parse_axis_position(group_by, start, aggregation)
+    if end:
+        mask &= position <= parse_axis_position(group_by, end, aggregation)
+    return df[mask]
+
+
+def downsample(group, group_by, points):
+    """Keeps at most points rows of each operation type, picked by LTTB so the chart keeps its shape"""
+    parts = []
+    for _, sub in group.groupby("operation_type", sort=False, observed=True):
+        x = sub["time_group"].to_numpy() if group_by == "time" else np.arange(len(sub))
+        parts.append(sub.iloc[lttb_indices(x, sub["value"].to_numpy(), points)])
+    return pd.concat(parts) if parts else group
+
+
+def add_axis_labels(group, group_by):
+    """Turns axis keys into labels only once the rows are grouped"""
+    if group_by == "time":
+        group["x"] = pd.to_datetime(group["time_group"], unit="s").astype(str)
+    else:
+        group["x"] = list(zip(group["phase_id"].tolist(), group["step_group"].tolist()))
+    return group
 
 
 def build_xy_data(group, value_column, aggregate_by):
-    result = {}
-    for op in group[aggregate_by].unique():
-        sub = group[group[aggregate_by] == op]
-        result[op] = {
-            "x": sub["x"].tolist(),
-            "y": sub[value_column].tolist()
-        }
-    return result
+    return {op: {"x": sub["x"].tolist(), "y": sub[value_column].tolist()}
+            for op, sub in group.groupby(aggregate_by, sort=False, observed=True)}
 
 
 def format_aggregation_criterion(criterion, value):
@@ -50,9 +151,10 @@ def format_aggregation_criterion(criterion, value):
 
 
 def build_summary_data(group, value_column, group_by, aggregation):
+    parts = dict(list(group.groupby(group_by, observed=True)))
     result = {}
-    for op in sorted(group[group_by].unique()):
-        sub = group[group[group_by] == op]
+    for op in sorted(parts):
+        sub = parts[op]
         result[format_aggregation_criterion(group_by, op)] = {
             "x": [format_aggregation_criterion(aggregation, x) for x in sub[aggregation].tolist()],
             "y": sub[value_column].tolist()
@@ -60,33 +162,66 @@ def build_summary_data(group, value_column, group_by, aggregation):
     return result
 
 
-def aggregate_throughput_summary(execution_id, metric, group_by, aggregation_by):
+def summary_group(execution_id, metric, gb, include_transient=False):
+    """Metric per group of the summary criteria, from rollups when the run has them"""
+    quantile = latency_quantile(metric)
+    if all(c in ROLLUP_CRITERIA for c in gb):
+        # latency histograms are written along with the units, so they also cover a running phase
+        if quantile is not None and has_rollups(execution_id, ROLLUP_LATENCY):
+            df = filter_windows(read_table(execution_id, ROLLUP_LATENCY), include_transient)
+            return rollup_quantile(df, gb, quantile)
+        if quantile is None and has_rollups(execution_id):
+            df = filter_windows(read_table(execution_id, ROLLUP_SECONDS), include_transient)
+            return rollup_metric(df, gb, metric)
+
     if metric.startswith("latency"):
-        df = df_by_units(execution_id, None, None)
+        df = df_by_units(execution_id, None, None, include_transient)
     else:
-        df = df_by_operation(execution_id, None, None)
+        df = df_by_operation(execution_id, None, None, include_transient)
+    return group_metric(df.groupby(gb, observed=True)[fields_by_metric(metric)], metric)
 
-    gb = [group_by, aggregation_by] if group_by != aggregation_by else [group_by]
-    group = df.groupby(gb)[fields_by_metric(metric)]
-    group = group_metric(group, metric)
-
-    return build_summary_data(group, "x", group_by, aggregation_by)
 
+def aggregate_throughput_summary(execution_id, metric, group_by, aggregation_by, include_transient=False):
+    gb = [group_by, aggregation_by] if group_by != aggregation_by else [group_by]
+    group = summary_group(execution_id, metric, gb, include_transient)
+    return build_summary_data(group, "value", group_by, aggregation_by)
 
-def aggregate_throughput_per_steps(execution_id, group_by="step", metric="mbps", aggregation=5):
-    df = df_by_operation(execution_id, group_by, aggregation)
 
-    group = df.groupby(["operation_type", "x"])[fields_by_metric(metric)].sum().reset_index()
-    group = group_metric(group, metric)
+def aggregate_throughput_per_steps(execution_id, group_by="step", metric="mbps", aggregation=5,
+                                   points=DYNAMIC_CHART_POINTS, start=None, end=None):
+    """Chart series per operation type, limited to the zoom window and downsampled to points per series"""
+    gb = ["operation_type", *axis_keys(group_by)]
+    quantile = latency_quantile(metric)
+    # histograms are kept per second, quantiles per step need the raw units
+    if quantile is not None and group_by == "time" and has_rollups(execution_id, ROLLUP_LATENCY):
+        df = add_axis(read_table(execution_id, ROLLUP_LATENCY), group_by, aggregation)
+        group = rollup_quantile(zoom(df, group_by, aggregation, start, end), gb, quantile)
+    elif quantile is None and has_rollups(execution_id):
+        df = read_table(execution_id, ROLLUP_SECONDS if group_by == "time" else ROLLUP_STEPS)
+        df = add_axis(df, group_by, aggregation)
+        group = rollup_metric(zoom(df, group_by, aggregation, start, end), gb, metric)
+    else:
+        if metric.startswith("latency"):
+            df = df_by_units(execution_id, group_by, aggregation)
+        else:
+            df = df_by_operation(execution_id, group_by, aggregation)
+        df = zoom(df, group_by, aggregation, start, end)
+        group = group_metric(df.groupby(gb, observed=True)[fields_by_metric(metric)], metric)
 
-    return build_xy_data(group, "x", "operation_type")
+    if points:
+        group = downsample(group, group_by, points)
+    return build_xy_data(add_axis_labels(group, group_by), "value", "operation_type")
 
 
 def fields_by_metric(metric):
-    if metric == "iops" or metric == "mbps":
+    if metric == "iops":
+        return ["duration", "ops"]
+    elif metric == "mbps":
         return ["duration", "bytes"]
     elif metric == "errors":
         return ["is_failed"]
+    elif metric == "open_time":
+        return ["open_duration"]
     elif metric.startswith("latency"):
         return ["latency_ns"]
 
@@ -94,21 +229,61 @@ def fields_by_metric(metric):
 def group_metric(group, metric):
     if metric == "iops":
         group = group.sum().reset_index()
-        group["x"] = group["bytes"] / BLOCK_SIZE / group["duration"]
+        group["value"] = group["ops"] / group["duration"]
     elif metric == "mbps":
-        group = group.mean().reset_index()
-        group["x"] = group["bytes"] / (1024 ** 2) / group["duration"]
+        # ratio of means equals ratio of sums
+        group = group.sum().reset_index()
+        group["value"] = group["bytes"] / (1024 ** 2) / group["duration"]
     elif metric == "errors":
         group = group.sum().reset_index()
-        group["x"] = group["is_failed"]
+        group["value"] = group["is_failed"]
+    elif metric == "open_time":
+        group = group.mean().reset_index()
+        group["value"] = group["open_duration"]
     elif metric.startswith("latency"):
         if metric == "latency_max":
-            group = group.agg(latency_ns=("latency_ns", "max")).reset_index()
-        elif metric == "latency_p99":
-            group = group.agg(latency_ns=("latency_ns", lambda x: np.percentile(x, 99))).reset_index()
-        elif metric == "latency_p95":
-            group = group.agg(latency_ns=("latency_ns", lambda x: np.percentile(x, 95))).reset_index()
+            group = group.max().reset_index()
+        elif latency_quantile(metric) is not None:
+            group = group.quantile(latency_quantile(metric)).reset_index()
         else:
             group = group.mean().reset_index()
-        group["x"] = group["latency_ns"]
+        group["value"] = group["latency_ns"]
+    return group
+
+
+def rollup_metric(df, gb, metric):
+    """Computes a metric per group from rollup sums"""
+    measures = ["steps", "ops", "bytes", "duration", "open_duration", "errors", "units", "latency_sum"]
+    group = df.groupby(gb, observed=True).agg(**{m: (m, "sum") for m in measures},
+                               latency_max=("latency_max", "max")).reset_index()
+    # rows only exist on one side when a step and its units fall into different seconds
+    if metric.startswith("latency"):
+        group = group[group["units"] > 0].copy()
+    else:
+        group = group[group["steps"] > 0].copy()
+
+    if metric == "iops":
+        group["value"] = group["ops"] / group["duration"]
+    elif metric == "mbps":
+        group["value"] = group["bytes"] / (1024 ** 2) / group["duration"]
+    elif metric == "errors":
+        group["value"] = group["errors"]
+    elif metric == "open_time":
+        group["value"] = group["open_duration"] / group["steps"]
+    elif metric == "latency_max":
+        group["value"] = group["latency_max"] * 1000 * 1000
+    else:
+        group["value"] = group["latency_sum"] / group["units"] * 1000 * 1000
+    return group
+
+
+def rollup_quantile(df, gb, q):
+    """Merges latency histograms of each group and reads the quantile from the merged one"""
+    counts = df.groupby([*gb, "bucket"], observed=True)["count"].sum().reset_index()
+    counts = counts[counts["count"] > 0]
+    cumulative = counts.groupby(gb, observed=True)["count"].cumsum()
+    total = counts.groupby(gb, observed=True)["count"].transform("sum")
+    # buckets are sorted inside each group, the first one reaching the rank holds the quantile
+    group = counts[cumulative >= np.maximum(np.ceil(q * total), 1)].groupby(gb, observed=True).head(1).copy()
+    group["value"] = LatencyHistogram().bucket_value(group["bucket"].to_numpy()) / 1000
     return group
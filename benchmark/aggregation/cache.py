@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Hashable, List, Optional, Tuple
+
+import pandas as pd
+
+from benchmark.config import AGGREGATION_CACHE_BUDGET
+
+Signature = Tuple[float, int]
+
+
+def files_signature(paths: List[Path]) -> Optional[Signature]:
+    """Latest mtime and total size of the files, None if none of them exists"""
+    mtime, size, found = 0.0, 0, False
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        mtime, size, found = max(mtime, stat.st_mtime), size + stat.st_size, True
+    return (mtime, size) if found else None
+
+
+class FrameCache:
+    """LRU cache of parsed result frames with a memory budget.
+
+    An entry is only reused while the signature (mtime and size) of its source files is
+    unchanged, so frames of a running execution are reloaded as results are appended.
+    """
+
+    def __init__(self, budget_bytes: int = AGGREGATION_CACHE_BUDGET):
+        self._budget_bytes = budget_bytes
+        self._entries: OrderedDict[Hashable, Tuple[Signature, pd.DataFrame, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, signature: Optional[Signature], load: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """Returns a shallow copy, callers may add columns without touching the cached frame"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and signature is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                return entry[1].copy(deep=False)
+
+        df = load()
+        if signature is not None:
+            size = int(df.memory_usage(deep=True).sum())
+            with self._lock:
+                self._discard(key)
+                if size <= self._budget_bytes:
+                    self._entries[key] = (signature, df, size)
+                    self._size += size
+                    self._evict()
+        return df.copy(deep=False)
+
+    def _discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def _evict(self):
+        while self._size > self._budget_bytes and self._entries:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._size -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+FRAME_CACHE = FrameCache()
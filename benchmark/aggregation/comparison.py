@@ -0,0 +1,67 @@
+import math
+from typing import Dict, List, Tuple
+
+from benchmark.aggregation.aggregation import summary_group, format_aggregation_criterion
+from benchmark.config import METRICS_PATH
+from benchmark.repository.catalog import RunCatalog, RunAggregate, CATALOG_FILE
+
+COMPARISON_METRICS = ("iops", "mbps", "errors", "latency", "latency_p50", "latency_p90", "latency_p99",
+                      "latency_p999")
+KEYS = ["phase_id", "operation_id", "operation_type"]
+
+Key = Tuple[int, int, str]
+
+
+def run_aggregates(execution_id) -> List[RunAggregate]:
+    """Comparison metrics of a run per phase and operation, measure window only"""
+    result = []
+    for metric in COMPARISON_METRICS:
+        group = summary_group(execution_id, metric, KEYS)
+        for phase_id, operation_id, operation_type, value in group[[*KEYS, "value"]].itertuples(index=False):
+            result.append(RunAggregate(int(phase_id), int(operation_id), str(operation_type), metric,
+                                       None if math.isnan(value) else float(value)))
+    return result
+
+
+def cached_run_aggregates(catalog: RunCatalog, execution_id) -> List[RunAggregate]:
+    """Aggregates of a finished run are computed once and kept in the catalog"""
+    entry = catalog.get(execution_id)
+    finished = entry is not None and entry.status == "done"
+    if finished:
+        aggregates = catalog.aggregates(execution_id)
+        if aggregates:
+            return aggregates
+    aggregates = run_aggregates(execution_id)
+    if finished:
+        catalog.record_aggregates(execution_id, aggregates)
+    return aggregates
+
+
+def format_key(key: Key) -> str:
+    phase_id, operation_id, operation_type = key
+    return (f"{format_aggregation_criterion('phase_id', phase_id)}, "
+            f"{format_aggregation_criterion('operation_id', operation_id)} ({operation_type})")
+
+
+def compare_runs(execution_ids: List[str], catalog: RunCatalog = None) -> dict:
+    """Metrics of several runs aligned by phase and operation.
+
+    For every metric each run gets a list of values in the order of keys, None where the run
+    has no such operation, so runs of different profiles can be compared too.
+    """
+    catalog = catalog or RunCatalog(METRICS_PATH / CATALOG_FILE)
+    values: Dict[str, Dict[Key, Dict[str, float]]] = {}
+    for execution_id in execution_ids:
+        values[execution_id] = {}
+        for a in cached_run_aggregates(catalog, execution_id):
+            values[execution_id].setdefault((a.phase_id, a.operation_id, a.operation_type), {})[a.metric] = a.value
+    keys = sorted({key for run in values.values() for key in run})
+    return {
+        "runs": execution_ids,
+        "keys": [format_key(key) for key in keys],
+        "metrics": {
+            metric: {execution_id: [values[execution_id].get(key, {}).get(metric) for key in keys]
+                     for execution_id in execution_ids}
+            for metric in COMPARISON_METRICS
+        },
+    }
@@ -0,0 +1,32 @@
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Indices of at most points samples chosen by Largest-Triangle-Three-Buckets.
+
+    The first and the last sample are kept; from every bucket in between the sample forming
+    the largest triangle with the previously chosen one and the average of the next bucket,
+    so spikes and dips survive downsampling.
+    """
+    n = len(x)
+    if n <= points:
+        return np.arange(n)
+    if points < 3:
+        return np.array([0, n - 1][:points])
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_x = x[hi:edges[i + 2]].mean()
+        next_y = y[hi:edges[i + 2]].mean()
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
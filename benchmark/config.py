@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from benchmark.model.execution import StorageConfiguration
@@ -10,3 +11,18 @@ METRICS_PATH = Path("_results")
 STORAGE_CONFIG: StorageConfiguration = StorageConfiguration(path="_test", device="sdb")
 
 DISKSTATUS_INTERVAL = 1.0
+
+DATASET_PREPARATION_PROCESSES = os.cpu_count() or 1
+DATASET_CACHE_BUDGET = 64 * 1024 ** 3
+DATASET_CACHE_INDEX = ".dataset_cache.json"
+
+AGGREGATION_CACHE_BUDGET = 1024 ** 3
+
+LIVE_RING_SECONDS = 900
+# seconds the live stream lags behind, so workers have published a second before it is sent
+LIVE_DELAY_SEC = 2
+
+# points per series the dynamic charts are downsampled to
+DYNAMIC_CHART_POINTS = 2000
+
+RUNS_PAGE_SIZE = 50
@@ -119,6 +119,15 @@ def get_diskstats(disk_name: str) -> Optional[DiskStats]:
     return None
 
 
+def get_logical_block_size(disk_name: Optional[str], default: int = 512) -> int:
+    if not disk_name:
+        return default
+    try:
+        return int(Path(f"/sys/block/{disk_name}/queue/logical_block_size").read_text().strip())
+    except (OSError, ValueError):
+        return default
+
+
 def get_disk_io_utilization(disk: str, interval: float = 1.0):
     if not disk:
         return
@@ -0,0 +1,175 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from benchmark.model.results import HistogramData, LatencyStats, PerSecondCounters
+
+SUB_BUCKET_BITS = 7
+MAX_EXPONENT = 40
+
+
+class LatencyHistogram:
+    """Log-linear (HDR-style) latency histogram with nanosecond resolution.
+
+    Every power of two is split into 2^(SUB_BUCKET_BITS - 1) linear buckets, which keeps
+    the relative error of any quantile under 1% with a few thousand counters.
+    """
+
+    def __init__(self, sub_bucket_bits: int = SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_buckets = 1 << sub_bucket_bits
+        self._half = self._sub_buckets // 2
+        self.counts = np.zeros(self._sub_buckets + MAX_EXPONENT * self._half, dtype=np.int64)
+        self.total_ns = 0
+        self.min_ns: Optional[int] = None
+        self.max_ns = 0
+
+    def record(self, latencies_sec: Iterable[float]):
+        values = np.rint(np.asarray(latencies_sec, dtype=np.float64) * 1e9).astype(np.int64)
+        if not len(values):
+            return
+        values = np.maximum(values, 0)
+        self.counts += np.bincount(self.bucket_index(values), minlength=len(self.counts))[:len(self.counts)]
+        self.total_ns += int(values.sum())
+        low = int(values.min())
+        self.min_ns = low if self.min_ns is None else min(self.min_ns, low)
+        self.max_ns = max(self.max_ns, int(values.max()))
+
+    def bucket_index(self, values: np.ndarray) -> np.ndarray:
+        """Bucket of each latency given in nanoseconds."""
+        _, bits = np.frexp(values.astype(np.float64))
+        exponent = np.maximum(bits.astype(np.int64) - self.sub_bucket_bits, 0)
+        index = np.where(exponent == 0, values,
+                         self._sub_buckets + (exponent - 1) * self._half + (values >> exponent) - self._half)
+        return np.minimum(index, len(self.counts) - 1)
+
+    def bucket_value(self, index: np.ndarray) -> np.ndarray:
+        """Middle of the value range covered by each bucket, in nanoseconds."""
+        index = np.asarray(index, dtype=np.int64)
+        k = index - self._sub_buckets
+        exponent = k // self._half + 1
+        low = np.where(index < self._sub_buckets, index, (k % self._half + self._half) << np.maximum(exponent, 0))
+        width = np.where(index < self._sub_buckets, 1, 1 << np.maximum(exponent, 0))
+        return low + (width - 1) / 2
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def quantile(self, q: float) -> float:
+        """Returns the latency in seconds at quantile q (0..1)."""
+        total = self.count
+        if not total:
+            return 0.0
+        rank = max(1, int(np.ceil(q * total)))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        value = float(self.bucket_value(index))
+        return min(max(value, self.min_ns or 0), self.max_ns) / 1e9
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        self.counts += other.counts
+        self.total_ns += other.total_ns
+        if other.min_ns is not None:
+            self.min_ns = other.min_ns if self.min_ns is None else min(self.min_ns, other.min_ns)
+        self.max_ns = max(self.max_ns, other.max_ns)
+        return self
+
+    def stats(self) -> LatencyStats:
+        count = self.count
+        return LatencyStats(count=count,
+                            mean=self.total_ns / count / 1e9 if count else 0.0,
+                            min=(self.min_ns or 0) / 1e9,
+                            max=self.max_ns / 1e9,
+                            p50=self.quantile(0.5),
+                            p90=self.quantile(0.9),
+                            p99=self.quantile(0.99),
+                            p999=self.quantile(0.999))
+
+    def to_data(self) -> HistogramData:
+        nonzero = np.flatnonzero(self.counts)
+        return HistogramData(sub_bucket_bits=self.sub_bucket_bits,
+                             counts=dict(zip(nonzero.tolist(), self.counts[nonzero].tolist())),
+                             total_ns=self.total_ns, min_ns=self.min_ns or 0, max_ns=self.max_ns)
+
+    @classmethod
+    def from_data(cls, data: HistogramData) -> "LatencyHistogram":
+        h = cls(data.sub_bucket_bits)
+        if data.counts:
+            h.counts[list(data.counts.keys())] = list(data.counts.values())
+            h.min_ns = data.min_ns
+        h.total_ns = data.total_ns
+        h.max_ns = data.max_ns
+        return h
+
+
+class SecondCounters:
+    """Ops, bytes and errors per second since the phase start."""
+
+    def __init__(self):
+        self.ops = np.zeros(0, dtype=np.int64)
+        self.bytes = np.zeros(0, dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int64)
+
+    def _grow(self, size: int):
+        if size > len(self.ops):
+            size = max(size, 2 * len(self.ops))
+            self.ops = np.pad(self.ops, (0, size - len(self.ops)))
+            self.bytes = np.pad(self.bytes, (0, size - len(self.bytes)))
+            self.errors = np.pad(self.errors, (0, size - len(self.errors)))
+
+    def record(self, seconds: np.ndarray, sizes: np.ndarray):
+        if not len(seconds):
+            return
+        seconds = np.maximum(seconds.astype(np.int64), 0)
+        self._grow(int(seconds.max()) + 1)
+        self.ops += np.bincount(seconds, minlength=len(self.ops))
+        self.bytes += np.bincount(seconds, weights=sizes, minlength=len(self.bytes)).astype(np.int64)
+
+    def record_error(self, second: float):
+        second = max(int(second), 0)
+        self._grow(second + 1)
+        self.errors[second] += 1
+
+    def merge(self, other: "SecondCounters") -> "SecondCounters":
+        self._grow(len(other.ops))
+        n = len(other.ops)
+        self.ops[:n] += other.ops
+        self.bytes[:n] += other.bytes
+        self.errors[:n] += other.errors
+        return self
+
+    def to_data(self) -> PerSecondCounters:
+        n = len(self.ops)
+        nonzero = np.flatnonzero(self.ops | self.errors)
+        if len(nonzero):
+            n = int(nonzero[-1]) + 1
+        else:
+            n = 0
+        return PerSecondCounters(ops=self.ops[:n].tolist(), bytes=self.bytes[:n].tolist(),
+                                 errors=self.errors[:n].tolist())
+
+    @classmethod
+    def from_data(cls, data: PerSecondCounters) -> "SecondCounters":
+        c = cls()
+        c.ops = np.array(data.ops, dtype=np.int64)
+        c.bytes = np.array(data.bytes, dtype=np.int64)
+        c.errors = np.array(data.errors, dtype=np.int64)
+        return c
+
+
+def merge_histograms(histograms: List[Dict[int, HistogramData]]) -> Dict[int, LatencyHistogram]:
+    merged: Dict[int, LatencyHistogram] = {}
+    for per_operation in histograms:
+        for op_id, data in per_operation.items():
+            h = LatencyHistogram.from_data(data)
+            merged[op_id] = merged[op_id].merge(h) if op_id in merged else h
+    return merged
+
+
+def merge_counters(counters: List[Dict[int, PerSecondCounters]]) -> Dict[int, SecondCounters]:
+    merged: Dict[int, SecondCounters] = {}
+    for per_operation in counters:
+        for op_id, data in per_operation.items():
+            c = SecondCounters.from_data(data)
+            merged[op_id] = merged[op_id].merge(c) if op_id in merged else c
+    return merged
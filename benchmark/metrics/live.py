@@ -0,0 +1,117 @@
+import multiprocessing
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmark.config import LIVE_RING_SECONDS
+from benchmark.metrics.histogram import LatencyHistogram
+from benchmark.metrics.result_store import OPERATION_TYPES, OPERATION_TYPE_CODES
+from benchmark.model.results import StepResult
+
+# coarser than the stored histograms, a few percent error is enough for live charts
+LIVE_SUB_BUCKET_BITS = 4
+
+# counters of an operation type in a slot, followed by its latency buckets
+OPS = 0
+BYTES = 1
+ERRORS = 2
+BUCKETS = 3
+
+
+class LiveRing:
+    """Per second counters of the running execution in shared memory.
+
+    Each slot holds one wall clock second: ops, bytes, errors and latency histogram buckets
+    per operation type. Workers add completed seconds to it, the web process reads them.
+    Created before the execution process is forked, so workers inherit it.
+    """
+
+    def __init__(self, seconds: int = LIVE_RING_SECONDS):
+        self.histogram = LatencyHistogram(LIVE_SUB_BUCKET_BITS)
+        self._seconds = seconds
+        self._shape = (len(OPERATION_TYPES), BUCKETS + len(self.histogram.counts))
+        self._array = multiprocessing.Array('q', seconds * (1 + self._shape[0] * self._shape[1]))
+
+    def _slots(self) -> np.ndarray:
+        return np.frombuffer(self._array.get_obj(), dtype=np.int64).reshape(self._seconds, -1)
+
+    def clear(self):
+        with self._array.get_lock():
+            self._slots()[:] = 0
+
+    def publish(self, second: int, counters: np.ndarray):
+        with self._array.get_lock():
+            slot = self._slots()[second % self._seconds]
+            if slot[0] > second:
+                return
+            if slot[0] != second:
+                slot[:] = 0
+                slot[0] = second
+            slot[1:] += counters.ravel()
+
+    def read(self, first_second: int, last_second: int) -> List[Tuple[int, np.ndarray]]:
+        """Seconds in [first_second, last_second] that have counters, oldest first"""
+        with self._array.get_lock():
+            slots = self._slots().copy()
+        # an empty slot has second 0
+        slots = slots[(slots[:, 0] > 0) & (slots[:, 0] >= first_second) & (slots[:, 0] <= last_second)]
+        slots = slots[np.argsort(slots[:, 0])]
+        return [(int(slot[0]), slot[1:].reshape(self._shape)) for slot in slots]
+
+    def new_counters(self) -> np.ndarray:
+        return np.zeros(self._shape, dtype=np.int64)
+
+    def second_summary(self, second: int, counters: np.ndarray) -> dict:
+        """IOPS, MB/s and latency percentiles in microseconds of one second, per operation type and in total"""
+        result = {"time": second}
+        for name, rows in [(t, counters[[i]]) for i, t in enumerate(OPERATION_TYPES)] + [("total", counters)]:
+            histogram = LatencyHistogram(LIVE_SUB_BUCKET_BITS)
+            histogram.counts = rows[:, BUCKETS:].sum(axis=0)
+            histogram.max_ns = int(histogram.bucket_value(np.flatnonzero(histogram.counts)[-1])) \
+                if histogram.count else 0
+            result[name] = {
+                "iops": int(rows[:, OPS].sum()),
+                "mbps": rows[:, BYTES].sum() / 1024 ** 2,
+                "errors": int(rows[:, ERRORS].sum()),
+                "p50": histogram.quantile(0.5) * 1e6,
+                "p99": histogram.quantile(0.99) * 1e6,
+            }
+        return result
+
+
+class LivePublisher:
+    """Sums results of a worker per second and adds each second to the ring once it is over"""
+
+    def __init__(self, ring: LiveRing):
+        self._ring = ring
+        self._pending: Dict[int, np.ndarray] = {}
+
+    def _counters(self, second: int) -> np.ndarray:
+        counters = self._pending.get(second)
+        if counters is None:
+            counters = self._pending[second] = self._ring.new_counters()
+        return counters
+
+    def record(self, step: StepResult):
+        type_code = OPERATION_TYPE_CODES[step.operation_type]
+        start = step.time.timestamp()
+        if step.units:
+            units = np.asarray(step.units, dtype=np.float64)
+            seconds = np.floor(start + units[:, 0]).astype(np.int64)
+            buckets = self._ring.histogram.bucket_index(np.rint(units[:, 1] * 1e9).astype(np.int64))
+            for second in np.unique(seconds):
+                mask = seconds == second
+                counters = self._counters(int(second))[type_code]
+                counters[OPS] += int(mask.sum())
+                counters[BYTES] += int(units[mask, 2].sum())
+                counters[BUCKETS:] += np.bincount(buckets[mask], minlength=len(counters) - BUCKETS)
+        end = int(start + step.duration_sec)
+        if step.is_failed:
+            self._counters(end)[type_code][ERRORS] += 1
+        # a second that arrives later anyway is added on top of the published one
+        for second in [s for s in self._pending if s < end]:
+            self._ring.publish(second, self._pending.pop(second))
+
+    def flush(self):
+        for second in sorted(self._pending):
+            self._ring.publish(second, self._pending.pop(second))
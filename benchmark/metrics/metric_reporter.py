@@ -1,14 +1,17 @@
 from abc import ABC, abstractmethod
-from abc import ABC, abstractmethod
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional
 
-from benchmark.config import BLOCK_SIZE, METRICS_PATH
+from benchmark.config import METRICS_PATH
+from benchmark.metrics.result_store import ResultStore, ResultStoreWriter, store_path, encode_batch
+from benchmark.metrics.rollup import write_rollups
 from benchmark.metrics.sys_info import get_system_info
 from benchmark.model.execution import ExecutionRequest
 from benchmark.model.profile import ProfilePhase
-from benchmark.model.results import PhaseThreadResult, StepResult, PhaseResult, BenchmarkResult, DiskStatusUnit
+from benchmark.model.results import PhaseThreadResult, PhaseResult, BenchmarkResult, DiskStatusUnit, \
+    DatasetPreparationResult, PhaseMetrics, SaturationResult
+from benchmark.repository.catalog import RunCatalog, CATALOG_FILE
 
 
 class MetricReporter(ABC):
@@ -17,17 +20,29 @@ class MetricReporter(ABC):
         pass
 
     @abstractmethod
-    def report_phase(self, phase: ProfilePhase, thread_results: List[PhaseThreadResult]):
+    def report_phase(self, phase: ProfilePhase, thread_results: List[PhaseThreadResult],
+                     metrics: Optional[PhaseMetrics] = None):
         pass
 
     @abstractmethod
     def report_disk_status(self, phase_number: int, thread_results: list[DiskStatusUnit]):
         pass
 
+    @abstractmethod
+    def report_preparation(self, result: DatasetPreparationResult):
+        pass
+
     @abstractmethod
     def summarize(self):
         pass
 
+    def report_saturation(self, result: SaturationResult):
+        pass
+
+    def result_store_path(self) -> Optional[Path]:
+        """Store that workers may stream step results into while a phase runs"""
+        return None
+
 
 def metricFileReporter(execution_id: str, request: ExecutionRequest):
     return MetricToFileReporter(request, METRICS_PATH, execution_id)
@@ -35,8 +50,7 @@ def metricFileReporter(execution_id: str, request: ExecutionRequest):
 
 class MetricToFileReporter(MetricReporter):
     _phases_results: List[PhaseResult]
-    _metric_file_name_operations: Path
-    _metric_file_name_units: Path
+    _store: ResultStoreWriter
     _phase_id = 0
 
     def __init__(self, request: ExecutionRequest, metrics_directory: Path, execution_id: str):
@@ -44,18 +58,15 @@ class MetricToFileReporter(MetricReporter):
         self._start_time = None
         self._request = request
         execution_id = execution_id if execution_id else f"{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        self._metric_file_name_operations = metrics_directory / (execution_id + "_ops.csv")
-        self._metric_file_name_units = metrics_directory / (execution_id + "_units.csv")
+        self._store_path = store_path(metrics_directory, execution_id)
+        self._store = ResultStoreWriter(self._store_path)
         self._metric_file_name_summary = metrics_directory / (execution_id + "_summary.json")
         self._metric_file_name_diskstats = metrics_directory / (execution_id + "_diskstats.csv")
+        self._catalog = RunCatalog(metrics_directory / CATALOG_FILE)
         self._phases_results: List[PhaseResult] = []
+        self._preparations: List[DatasetPreparationResult] = []
+        self._saturation: List[SaturationResult] = []
 
-        with open(self._metric_file_name_operations, "w") as f:
-            f.write(
-                "time,phase_id,thread_id,step_id,filename,operation_id,operation_type,operation_random_access,is_failed,bytes,duration\n")
-        with open(self._metric_file_name_units, "w") as f:
-            f.write(
-                "time,phase_id,thread_id,step_id,unit_id,filename,operation_id,operation_type,operation_random_access,is_failed,bytes,duration\n")
         with open(self._metric_file_name_diskstats, "w") as f:
             f.write(
                 "time,phase_id,read_utilization,write_utilization,total_utilization,queue_length\n")
@@ -63,6 +74,8 @@ class MetricToFileReporter(MetricReporter):
     def start_execution(self):
         self._start_time = datetime.now()
         self._phases_results = []
+        self._preparations = []
+        self._saturation = []
         r = BenchmarkResult(execution_id=self._execution_id,
                             start_time=self._start_time,
                             finish_time=None,
@@ -71,8 +84,10 @@ class MetricToFileReporter(MetricReporter):
                             storage_configuration=self._request.storage_configuration,
                             phases_results=[],
                             system_info=get_system_info())
+        summary = r.get_summary()
         with open(self._metric_file_name_summary, "w") as f:
-            f.write(r.get_summary().model_dump_json(indent=2))
+            f.write(summary.model_dump_json(indent=2))
+        self._catalog.record(summary, "running")
 
     def report_disk_status(self, phase_number: int, units: list[DiskStatusUnit]):
         r = [(op.time.strftime("%Y-%m-%d %H:%M:%S.%f"),
@@ -85,42 +100,40 @@ class MetricToFileReporter(MetricReporter):
         with open(self._metric_file_name_diskstats, "a") as f:
             f.writelines(map(lambda u: ",".join(map(str, u)) + "\n", r))
 
-    def report_phase(self, phase: ProfilePhase, thread_results: List[PhaseThreadResult]):
+    def report_preparation(self, result: DatasetPreparationResult):
+        self._preparations.append(result)
+
+    def report_saturation(self, result: SaturationResult):
+        self._saturation.append(result)
+
+    def report_phase(self, phase: ProfilePhase, thread_results: List[PhaseThreadResult],
+                     metrics: Optional[PhaseMetrics] = None):
         print(f"phase {self._phase_id} finished")
         self._phase_id += 1
         phases_result = PhaseResult(
             threads=thread_results,
             start_time=min(map(lambda t: t.start_time, thread_results)),
             finish_time=max(map(lambda t: t.finish_time, thread_results)),
+            metrics=metrics,
         )
         self._phases_results.append(phases_result)
 
-        operations = []
-        units = []
+        # steps are only returned here when workers did not stream them to the store during the phase
+        operations = 0
+        units = 0
         for (thread_id, thread_result) in enumerate(thread_results):
             thread_result: PhaseThreadResult
-            for s_id, s in enumerate(thread_result.steps):
-                s: StepResult
-                operations.append((
-                    s.time.strftime("%Y-%m-%d %H:%M:%S.%f"), self._phase_id, thread_id, s_id, s.filename,
-                    s.operation_id, s.operation_type,
-                    int(s.operation_random_access), int(s.is_failed), s.ops_cnt * BLOCK_SIZE, s.duration_sec))
-
-                for u_id, u in enumerate(s.units):
-                    u: Tuple[float, float]
-                    units.append((
-                        (s.time + timedelta(seconds=u[0])).strftime("%Y-%m-%d %H:%M:%S.%f"), self._phase_id, thread_id,
-                        s_id, u_id, s.filename, s.operation_id, s.operation_type,
-                        int(s.operation_random_access), int(s.is_failed), BLOCK_SIZE, u[1]))
-
-        operations.sort()
-        units.sort()
-
-        with open(self._metric_file_name_operations, "a") as f:
-            f.writelines(map(lambda u: ",".join(map(str, u)) + "\n", operations))
-        with open(self._metric_file_name_units, "a") as f:
-            f.writelines(map(lambda u: ",".join(map(str, u)) + "\n", units))
-        print(f"{len(operations)} operations, {len(units)} units")
+            steps = thread_result.steps
+            if steps:
+                self._store.append_batch(self._phase_id, encode_batch(steps, thread_id))
+            operations += len(steps)
+            units += sum(len(s.units) for s in steps)
+        streamed = sum(t.streamed_batches for t in thread_results)
+        print(f"{operations} operations, {units} units, {streamed} batches streamed")
+        write_rollups(ResultStore(self._store_path), self._store, self._phase_id)
+
+    def result_store_path(self) -> Optional[Path]:
+        return self._store_path
 
     def summarize(self):
         r = BenchmarkResult(execution_id=self._execution_id,
@@ -129,7 +142,11 @@ class MetricToFileReporter(MetricReporter):
                             profile_name=self._request.profile_name,
                             profile=self._request.profile,
                             storage_configuration=self._request.storage_configuration,
+                            preparations=self._preparations,
                             phases_results=self._phases_results,
+                            saturation=self._saturation,
                             system_info=get_system_info())
+        summary = r.get_summary()
         with open(self._metric_file_name_summary, "w") as f:
-            f.write(r.get_summary().model_dump_json(indent=2))
+            f.write(summary.model_dump_json(indent=2))
+        self._catalog.record(summary, "done")
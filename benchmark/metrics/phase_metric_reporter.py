@@ -1,8 +1,18 @@
 import datetime
+import threading
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Callable, Dict, List, Optional
 
-from benchmark.model.results import PhaseThreadResult, StepResult
+import numpy as np
+
+from benchmark.metrics.histogram import LatencyHistogram, SecondCounters
+from benchmark.metrics.live import LivePublisher
+from benchmark.metrics.result_store import ResultBatch, encode_batch
+from benchmark.model.results import PhaseThreadResult, StepResult, PhaseWindow
+
+
+STREAM_BATCH_STEPS = 256
+STREAM_BATCH_UNITS = 64 * 1024
 
 
 class ThreadPhaseMetricReporter(ABC):
@@ -23,29 +33,100 @@ class ThreadPhaseMetricReporter(ABC):
 
 
 class ThreadPhaseMetricReporterImpl(ThreadPhaseMetricReporter):
+    """Collects results of a worker process; may be shared by its threads.
 
-    def __init__(self, thread_name: str):
+    With a sink, steps are sent away in batches while the phase runs instead of being
+    kept until the end, so memory does not grow with the phase length. With a live
+    publisher, per second counters are published while the phase runs.
+    """
+
+    def __init__(self, thread_name: str, capture_units: bool = True,
+                 sink: Optional[Callable[[ResultBatch], None]] = None, thread_id: int = 0,
+                 live: Optional[LivePublisher] = None):
         self._thread_name = thread_name
+        self._capture_units = capture_units
+        self._sink = sink
+        self._live = live
+        self._thread_id = thread_id
         self._unit_results: List[StepResult] = []
+        self._buffered_units = 0
+        self._streamed_steps = 0
+        self._streamed_batches = 0
+        self._measured_ops = 0
+        self._measured_bytes = 0
+        self._measured_errors = 0
+        self._histograms: Dict[int, LatencyHistogram] = {}
+        self._counters: Dict[int, SecondCounters] = {}
         self._duration = 0
         self._n_ops = 0
         self._start_time = datetime.datetime.now()
         self._finish_time = self._start_time
+        self._started = False
+        self._lock = threading.Lock()
 
     def start_phase(self):
-        self._start_time = datetime.datetime.now()
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self._start_time = datetime.datetime.now()
 
     def report_operation(self, step: StepResult):
-        self._unit_results.append(step)
+        with self._lock:
+            self._report_operation(step)
         print(f"step in {self._thread_name}: {step.ops_cnt} {step.duration_sec}")
 
+    def _report_operation(self, step: StepResult):
+        histogram = self._histograms.get(step.operation_id)
+        if histogram is None:
+            histogram = self._histograms[step.operation_id] = LatencyHistogram()
+        counters = self._counters.get(step.operation_id)
+        if counters is None:
+            counters = self._counters[step.operation_id] = SecondCounters()
+
+        step_offset = (step.time - self._start_time).total_seconds()
+        if step.units:
+            units = np.array(step.units, dtype=np.float64)
+            if step.window == PhaseWindow.MEASURE:
+                histogram.record(units[:, 1])
+            counters.record(step_offset + units[:, 0], units[:, 2])
+        if step.is_failed:
+            counters.record_error(step_offset + step.duration_sec)
+        if self._live is not None:
+            self._live.record(step)
+        if step.window == PhaseWindow.MEASURE:
+            self._measured_ops += step.ops_cnt
+            self._measured_bytes += step.bytes
+            self._measured_errors += int(step.is_failed)
+
+        # a sink keeps latency histograms of units that are not captured, so they are dropped when encoding
+        if not self._capture_units and self._sink is None:
+            step.units = []
+        self._unit_results.append(step)
+        self._buffered_units += len(step.units)
+        if len(self._unit_results) >= STREAM_BATCH_STEPS or self._buffered_units >= STREAM_BATCH_UNITS:
+            self._flush()
+
+    def _flush(self):
+        if self._sink is None or not self._unit_results:
+            return
+        self._sink(encode_batch(self._unit_results, self._thread_id, self._streamed_steps, self._capture_units))
+        self._streamed_steps += len(self._unit_results)
+        self._streamed_batches += 1
+        self._unit_results = []
+        self._buffered_units = 0
+
     def finish_phase(self, duration, n_ops):
-        self._duration = duration
-        self._n_ops = n_ops
-        self._finish_time = datetime.datetime.now()
+        with self._lock:
+            self._duration = max(self._duration, duration)
+            self._n_ops += n_ops
+            self._finish_time = datetime.datetime.now()
         print(f"end_phase {self._thread_name}: {duration} {n_ops}")
 
     def phase_metric(self, used_files: List[str]):
+        with self._lock:
+            self._flush()
+            if self._live is not None:
+                self._live.flush()
         return PhaseThreadResult(
             thread_name=self._thread_name,
             steps=self._unit_results,
@@ -54,4 +135,10 @@ class ThreadPhaseMetricReporterImpl(ThreadPhaseMetricReporter):
             duration_sec=self._duration,
             start_time=self._start_time,
             finish_time=self._finish_time,
+            histograms={op_id: h.to_data() for op_id, h in self._histograms.items()},
+            per_second={op_id: c.to_data() for op_id, c in self._counters.items()},
+            streamed_batches=self._streamed_batches,
+            measured_ops=self._measured_ops,
+            measured_bytes=self._measured_bytes,
+            measured_errors=self._measured_errors,
         )
@@ -0,0 +1,351 @@
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmark.metrics.histogram import LatencyHistogram
+from benchmark.model.profile import ProfileOperationType
+from benchmark.model.results import PhaseWindow, StepResult
+
+OPERATION_TYPES = np.array([str(t) for t in ProfileOperationType], dtype=object)
+WINDOWS = np.array([str(w) for w in PhaseWindow], dtype=object)
+
+OPERATION_TYPE_CODES = {t: i for i, t in enumerate(ProfileOperationType)}
+WINDOW_CODES = {w: i for i, w in enumerate(PhaseWindow)}
+
+OPS = "ops"
+UNITS = "units"
+# rollups of ops and units written with each batch and merged at the end of each phase, see benchmark.metrics.rollup
+ROLLUP_SECONDS = "rollup_seconds"
+ROLLUP_STEPS = "rollup_steps"
+# latency histograms written along with each batch of units
+ROLLUP_LATENCY = "rollup_latency"
+
+_ROLLUP_KEYS = {
+    "operation_id": np.dtype(np.uint16),
+    "operation_type": np.dtype(np.uint8),
+    "window": np.dtype(np.uint8),
+}
+_ROLLUP_MEASURES = {
+    "steps": np.dtype(np.uint32),
+    "ops": np.dtype(np.int64),
+    "bytes": np.dtype(np.int64),
+    "duration": np.dtype(np.float64),
+    "open_duration": np.dtype(np.float64),
+    "errors": np.dtype(np.uint32),
+    "units": np.dtype(np.uint32),
+    "latency_sum": np.dtype(np.float64),
+    "latency_max": np.dtype(np.float64),
+}
+
+# fixed dtype of every stored column; phase_id is implied by the partition
+SCHEMAS: Dict[str, Dict[str, np.dtype]] = {
+    OPS: {
+        "time": np.dtype(np.int64),
+        "thread_id": np.dtype(np.uint32),
+        "step_id": np.dtype(np.uint32),
+        "filename": np.dtype(np.uint32),
+        "operation_id": np.dtype(np.uint16),
+        "operation_type": np.dtype(np.uint8),
+        "operation_random_access": np.dtype(np.uint8),
+        "is_failed": np.dtype(np.uint8),
+        "ops": np.dtype(np.uint32),
+        "bytes": np.dtype(np.int64),
+        "duration": np.dtype(np.float64),
+        "open_duration": np.dtype(np.float32),
+        "window": np.dtype(np.uint8),
+    },
+    UNITS: {
+        "time": np.dtype(np.int64),
+        "thread_id": np.dtype(np.uint32),
+        "step_id": np.dtype(np.uint32),
+        "unit_id": np.dtype(np.uint32),
+        "filename": np.dtype(np.uint32),
+        "operation_id": np.dtype(np.uint16),
+        "operation_type": np.dtype(np.uint8),
+        "operation_random_access": np.dtype(np.uint8),
+        "is_failed": np.dtype(np.uint8),
+        "bytes": np.dtype(np.uint32),
+        "duration": np.dtype(np.float32),
+        "window": np.dtype(np.uint8),
+    },
+    ROLLUP_SECONDS: {
+        "second": np.dtype(np.int64),
+        "thread_id": np.dtype(np.uint32),
+        **_ROLLUP_KEYS,
+        **_ROLLUP_MEASURES,
+    },
+    ROLLUP_STEPS: {
+        "step_id": np.dtype(np.uint32),
+        **_ROLLUP_KEYS,
+        **_ROLLUP_MEASURES,
+    },
+    ROLLUP_LATENCY: {
+        "second": np.dtype(np.int64),
+        "thread_id": np.dtype(np.uint32),
+        **_ROLLUP_KEYS,
+        "bucket": np.dtype(np.uint16),
+        "count": np.dtype(np.uint32),
+    },
+}
+
+# column order of the CSV export, same as the CSV files written before the store
+CSV_COLUMNS = {
+    OPS: ["time", "phase_id", "thread_id", "step_id", "filename", "operation_id", "operation_type",
+          "operation_random_access", "is_failed", "ops", "bytes", "duration", "open_duration", "window"],
+    UNITS: ["time", "phase_id", "thread_id", "step_id", "unit_id", "filename", "operation_id", "operation_type",
+            "operation_random_access", "is_failed", "bytes", "duration", "window"],
+}
+
+FILENAMES = "filenames.txt"
+
+
+def store_path(metrics_directory: Path, execution_id: str) -> Path:
+    return metrics_directory / f"{execution_id}_store"
+
+
+def step_columns(steps: List[StepResult], thread_id: int, filename_ids: Dict[str, int],
+                 first_step_id: int = 0) -> Dict[str, np.ndarray]:
+    n = len(steps)
+    return {
+        "time": np.array([s.time for s in steps], dtype="datetime64[ns]").view(np.int64),
+        "thread_id": np.full(n, thread_id),
+        "step_id": np.arange(first_step_id, first_step_id + n),
+        "filename": np.array([filename_ids[s.filename] for s in steps]),
+        "operation_id": np.array([s.operation_id for s in steps]),
+        "operation_type": np.array([OPERATION_TYPE_CODES[s.operation_type] for s in steps]),
+        "operation_random_access": np.array([s.operation_random_access for s in steps]),
+        "is_failed": np.array([s.is_failed for s in steps]),
+        "ops": np.array([s.ops_cnt for s in steps]),
+        "bytes": np.array([s.bytes for s in steps]),
+        "duration": np.array([s.duration_sec for s in steps]),
+        "open_duration": np.array([s.open_duration_sec for s in steps]),
+        "window": np.array([WINDOW_CODES[s.window] for s in steps]),
+    }
+
+
+def unit_columns(steps: List[StepResult], thread_id: int, filename_ids: Dict[str, int],
+                 first_step_id: int = 0) -> Dict[str, np.ndarray]:
+    """Flattens units of all steps; per step values are repeated for each of its units"""
+    ops = step_columns(steps, thread_id, filename_ids, first_step_id)
+    counts = np.array([len(s.units) for s in steps], dtype=np.int64)
+    units = np.array([u for s in steps for u in s.units], dtype=np.float64).reshape(-1, 3)
+    starts = np.cumsum(counts) - counts
+    columns = {name: np.repeat(ops[name], counts) for name in
+               ("thread_id", "step_id", "filename", "operation_id", "operation_type", "operation_random_access",
+                "is_failed", "window")}
+    columns["time"] = np.repeat(ops["time"], counts) + np.rint(units[:, 0] * 1e9).astype(np.int64)
+    columns["unit_id"] = np.arange(len(units)) - np.repeat(starts, counts)
+    columns["bytes"] = units[:, 2]
+    columns["duration"] = units[:, 1]
+    return columns
+
+
+def latency_columns(units: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Latency histogram buckets of units per second, thread and operation.
+
+    Histograms of any grouping coarser than that are merged by summing the counts.
+    """
+    keys = ["second", "thread_id", "operation_id", "operation_type", "window", "bucket"]
+    frame = pd.DataFrame({name: units[name] for name in ("thread_id", "operation_id", "operation_type", "window")})
+    frame["second"] = units["time"] // 1_000_000_000
+    frame["bucket"] = LatencyHistogram().bucket_index(np.rint(units["duration"] * 1e9).astype(np.int64))
+    counts = frame.groupby(keys, sort=False).size().rename("count").reset_index()
+    return {name: counts[name].to_numpy() for name in SCHEMAS[ROLLUP_LATENCY]}
+
+
+def _measures(ops: pd.DataFrame, units: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    steps = ops.groupby(keys, sort=False).agg(steps=("ops", "size"), ops=("ops", "sum"), bytes=("bytes", "sum"),
+                                              duration=("duration", "sum"),
+                                              open_duration=("open_duration", "sum"),
+                                              errors=("is_failed", "sum"))
+    latency = units.groupby(keys, sort=False).agg(units=("duration", "size"), latency_sum=("duration", "sum"),
+                                                  latency_max=("duration", "max"))
+    # a step and its units may fall into different seconds, so either side can miss a key
+    return steps.join(latency, how="outer").fillna(0).reset_index()
+
+
+def rollup_columns(ops: Dict[str, np.ndarray], units: Dict[str, np.ndarray]) -> Dict[str, Dict[str, np.ndarray]]:
+    """Sums of a batch per second and thread and per step.
+
+    Rows of different batches may share keys, they are summed when read and merged at the end of the phase.
+    """
+    keys = list(_ROLLUP_KEYS)
+    ops_frame = pd.DataFrame({name: ops[name] for name in ("thread_id", "step_id", *keys, "is_failed", "ops",
+                                                           "bytes", "duration", "open_duration")})
+    ops_frame["second"] = ops["time"] // 1_000_000_000
+    units_frame = pd.DataFrame({name: units[name] for name in ("thread_id", "step_id", *keys, "duration")})
+    units_frame["second"] = units["time"] // 1_000_000_000
+    seconds = _measures(ops_frame, units_frame, ["second", "thread_id", *keys])
+    steps = _measures(ops_frame, units_frame, ["step_id", *keys])
+    return {table: {name: frame[name].to_numpy() for name in SCHEMAS[table]}
+            for table, frame in ((ROLLUP_SECONDS, seconds), (ROLLUP_STEPS, steps))}
+
+
+class ResultBatch(NamedTuple):
+    """Steps of one worker encoded into columns; filename columns index the batch's own filenames"""
+    thread_id: int
+    filenames: List[str]
+    ops: Dict[str, np.ndarray]
+    units: Dict[str, np.ndarray]
+    latency: Dict[str, np.ndarray]
+    rollups: Dict[str, Dict[str, np.ndarray]]
+
+
+def encode_batch(steps: List[StepResult], thread_id: int, first_step_id: int = 0,
+                 capture_units: bool = True) -> ResultBatch:
+    """Without capture_units only the latency histograms and rollups of the units are kept"""
+    filenames = list(dict.fromkeys(s.filename for s in steps))
+    ids = {name: i for i, name in enumerate(filenames)}
+    ops = step_columns(steps, thread_id, ids, first_step_id)
+    units = unit_columns(steps, thread_id, ids, first_step_id)
+    latency = latency_columns(units)
+    rollups = rollup_columns(ops, units)
+    if not capture_units:
+        units = {name: values[:0] for name, values in units.items()}
+    return ResultBatch(thread_id, filenames, ops, units, latency, rollups)
+
+
+class ResultStoreWriter:
+    """Appends rows to per-phase partitions, one raw binary file per column.
+
+    Filenames are stored as indexes into the partition's filenames.txt.
+    """
+
+    def __init__(self, path: Path, create: bool = True):
+        self._path = path
+        self._filenames: Dict[int, Dict[str, int]] = {}
+        if create:
+            if path.exists():
+                shutil.rmtree(path)
+            path.mkdir(parents=True)
+
+    def filename_ids(self, phase_id: int, filenames: Iterable[str]) -> Dict[str, int]:
+        known = self._filenames.get(phase_id)
+        if known is None:
+            # another writer may have started the partition
+            stored = self._path / f"phase_{phase_id}" / FILENAMES
+            names = stored.read_text().splitlines() if stored.exists() else []
+            known = self._filenames[phase_id] = {name: i for i, name in enumerate(names)}
+        new = [f for f in dict.fromkeys(filenames) if f not in known]
+        if new:
+            partition = self._partition(phase_id)
+            with open(partition / FILENAMES, "a") as f:
+                f.writelines(name + "\n" for name in new)
+            for name in new:
+                known[name] = len(known)
+        return known
+
+    def append(self, table: str, phase_id: int, columns: Dict[str, np.ndarray]):
+        schema = SCHEMAS[table]
+        lengths = {len(columns[name]) for name in schema}
+        if len(lengths) != 1:
+            raise ValueError(f"columns of {table} have different lengths")
+        table_path = self._partition(phase_id) / table
+        table_path.mkdir(exist_ok=True)
+        for name, dtype in schema.items():
+            with open(table_path / f"{name}.bin", "ab") as f:
+                np.ascontiguousarray(columns[name], dtype=dtype).tofile(f)
+
+    def append_batch(self, phase_id: int, batch: ResultBatch):
+        ids = self.filename_ids(phase_id, batch.filenames)
+        mapping = np.array([ids[name] for name in batch.filenames], dtype=np.uint32)
+        for table, columns in ((OPS, batch.ops), (UNITS, batch.units)):
+            columns = dict(columns)
+            columns["filename"] = mapping[columns["filename"]] if len(mapping) else columns["filename"]
+            self.append(table, phase_id, columns)
+        self.append(ROLLUP_LATENCY, phase_id, batch.latency)
+        for table, columns in batch.rollups.items():
+            self.append(table, phase_id, columns)
+
+    def replace(self, table: str, phase_id: int, columns: Dict[str, np.ndarray]):
+        shutil.rmtree(self._partition(phase_id) / table, ignore_errors=True)
+        self.append(table, phase_id, columns)
+
+    def _partition(self, phase_id: int) -> Path:
+        partition = self._path / f"phase_{phase_id}"
+        partition.mkdir(exist_ok=True)
+        return partition
+
+
+class ResultStore:
+    """Reads partitions written by ResultStoreWriter through np.memmap"""
+
+    def __init__(self, path: Path):
+        self._path = path
+
+    def exists(self) -> bool:
+        return self._path.is_dir()
+
+    def files(self, table: str) -> List[Path]:
+        """Files a table is read from, used to detect changes"""
+        return [path for phase in self._path.glob("phase_*")
+                for path in [phase / FILENAMES, *(phase / table).glob("*.bin")]]
+
+    def has_table(self, table: str) -> bool:
+        """Whether every phase of the store has the table written"""
+        phases = list(self._path.glob("phase_*"))
+        return bool(phases) and all((phase / table).is_dir() for phase in phases)
+
+    def phases(self) -> List[int]:
+        return sorted(int(p.name[len("phase_"):]) for p in self._path.glob("phase_*"))
+
+    def read_columns(self, table: str, phase_id: int, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        schema = SCHEMAS[table]
+        table_path = self._path / f"phase_{phase_id}" / table
+        result = {}
+        for name in columns or schema:
+            file = table_path / f"{name}.bin"
+            if not file.exists() or file.stat().st_size == 0:
+                result[name] = np.empty(0, dtype=schema[name])
+            else:
+                result[name] = np.memmap(file, dtype=schema[name], mode="r")
+        return result
+
+    def filenames(self, phase_id: int) -> np.ndarray:
+        path = self._path / f"phase_{phase_id}" / FILENAMES
+        if not path.exists():
+            return np.empty(0, dtype=object)
+        return np.array(path.read_text().splitlines(), dtype=object)
+
+    def read_frame(self, table: str, columns: Optional[List[str]] = None,
+                   phases: Optional[List[int]] = None) -> pd.DataFrame:
+        """Returns rows of the given phases with decoded categories, like the CSV files had"""
+        columns = [c for c in (columns or CSV_COLUMNS.get(table) or list(SCHEMAS[table])) if c != "phase_id"]
+        frames = []
+        for phase_id in phases or self.phases():
+            data = self.read_columns(table, phase_id, columns)
+            n = len(next(iter(data.values()))) if data else 0
+            frame = pd.DataFrame({"phase_id": np.full(n, phase_id, dtype=np.uint16)})
+            for name, values in data.items():
+                frame[name] = self._decode(name, values, phase_id)
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=["phase_id"] + columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def _decode(self, name: str, values: np.ndarray, phase_id: int):
+        if name == "time":
+            return values.view("datetime64[ns]")
+        if name == "operation_type":
+            return pd.Categorical.from_codes(values, categories=OPERATION_TYPES)
+        if name == "window":
+            return pd.Categorical.from_codes(values, categories=WINDOWS)
+        if name == "filename":
+            return pd.Categorical.from_codes(values, categories=self.filenames(phase_id))
+        return values
+
+    def iter_csv(self, table: str, phases: Optional[List[int]] = None) -> Iterator[str]:
+        """A table in the CSV format used before the store, the header and then the rows phase by phase"""
+        yield ",".join(CSV_COLUMNS[table]) + "\n"
+        for phase_id in phases or self.phases():
+            df = self.read_frame(table, phases=[phase_id])
+            df["time"] = df["time"].dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+            yield df.to_csv(header=False, index=False, columns=CSV_COLUMNS[table])
+
+    def export_csv(self, table: str, path: Path, phases: Optional[List[int]] = None):
+        """Writes a table in the CSV format used before the store"""
+        with open(path, "w") as f:
+            f.writelines(self.iter_csv(table, phases))
@@ -0,0 +1,34 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmark.metrics.result_store import ResultStore, ResultStoreWriter, SCHEMAS, ROLLUP_SECONDS, ROLLUP_STEPS
+
+KEYS = ["operation_id", "operation_type", "window"]
+SUMS = ["steps", "ops", "bytes", "duration", "open_duration", "errors", "units", "latency_sum"]
+
+
+def _merge(store: ResultStore, table: str, phase_id: int, keys: List[str]) -> Dict[str, np.ndarray]:
+    frame = pd.DataFrame(store.read_columns(table, phase_id))
+    merged = frame.groupby(keys, sort=False).agg(**{m: (m, "sum") for m in SUMS},
+                                                 latency_max=("latency_max", "max")).reset_index()
+    return {name: merged[name].to_numpy() for name in SCHEMAS[table]}
+
+
+def build_rollups(store: ResultStore, phase_id: int) -> Dict[str, Dict[str, np.ndarray]]:
+    """Sums of a phase per second and per step.
+
+    Every batch has written its own partial rows, here they are merged into one row per key,
+    so the raw ops and units are not read. Seconds are kept per thread, steps are summed over
+    threads like the per step charts do.
+    """
+    return {
+        ROLLUP_SECONDS: _merge(store, ROLLUP_SECONDS, phase_id, ["second", "thread_id", *KEYS]),
+        ROLLUP_STEPS: _merge(store, ROLLUP_STEPS, phase_id, ["step_id", *KEYS]),
+    }
+
+
+def write_rollups(store: ResultStore, writer: ResultStoreWriter, phase_id: int):
+    for table, columns in build_rollups(store, phase_id).items():
+        writer.replace(table, phase_id, columns)
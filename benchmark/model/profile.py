@@ -1,7 +1,7 @@
 from enum import Enum
-from typing import List, Union, Annotated
+from typing import Dict, List, Union, Annotated
 
-from pydantic import BaseModel, Field, BeforeValidator, field_validator
+from pydantic import BaseModel, Field, BeforeValidator, field_validator, model_validator
 from pydantic_core.core_schema import FieldValidationInfo
 
 
@@ -35,6 +35,56 @@ def idle_time_validator(v: Union[int, float, List[float], None]) -> List[float]:
 IDLE_TIME = Annotated[List[float], Field(default_factory=list), BeforeValidator(idle_time_validator)]
 
 
+def block_size_validator(v: Union[int, Dict[int, float], None]) -> Dict[int, float]:
+    if v is None:
+        return {}
+    if isinstance(v, int):
+        v = {v: 1.0}
+    if isinstance(v, dict):
+        sizes = {int(size): float(weight) for size, weight in v.items()}
+        if any(size <= 0 for size in sizes) or any(weight < 0 for weight in sizes.values()):
+            raise ValueError("block sizes must be positive and weights non-negative")
+        if sizes and sum(sizes.values()) <= 0:
+            raise ValueError("block size weights must not all be zero")
+        return sizes
+    raise ValueError("block_size must be number or mapping of sizes to weights")
+
+
+BLOCK_SIZES = Annotated[Dict[int, float], Field(default_factory=dict), BeforeValidator(block_size_validator)]
+
+
+class ProfileAccessDistributionType(Enum):
+    UNIFORM = "uniform"
+    ZIPF = "zipf"
+    HOTSPOT = "hotspot"
+    SEQUENTIAL = "sequential"
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+
+class ProfileAccessDistribution(BaseModel):
+    type: ProfileAccessDistributionType = ProfileAccessDistributionType.UNIFORM
+    zipf_theta: float = Field(default=1.2, gt=0)
+    hot_ops_pct: float = Field(default=80, ge=0, le=100)
+    hot_space_pct: float = Field(default=20, gt=0, le=100)
+    stride: int = Field(default=0, ge=0)
+
+
+def access_distribution_validator(v: Union[str, dict, ProfileAccessDistribution, None]):
+    if isinstance(v, str):
+        return {"type": v}
+    return v
+
+
+def default_access_distribution(random_access: bool) -> ProfileAccessDistribution:
+    return ProfileAccessDistribution(type=ProfileAccessDistributionType.UNIFORM if random_access
+                                     else ProfileAccessDistributionType.SEQUENTIAL)
+
+
+ACCESS_DISTRIBUTION = Annotated[ProfileAccessDistribution | None, BeforeValidator(access_distribution_validator)]
+
+
 class ProfileOperation(BaseModel):
     mode: ProfileOperationType
     random_access: bool = True
@@ -43,6 +93,15 @@ class ProfileOperation(BaseModel):
     duration_sec: int | None = None
     file_selection: ProfileFileSelection = ProfileFileSelection.RANDOM_FILE
     idle_time: IDLE_TIME
+    iodepth: int = Field(default=1, ge=1)
+    block_size: BLOCK_SIZES
+    access_distribution: ACCESS_DISTRIBUTION = None
+    target_iops: float | None = Field(default=None, gt=0)
+    target_mbps: float | None = Field(default=None, gt=0)
+    weight: float = Field(default=1, ge=0)
+
+    def get_access_distribution(self) -> ProfileAccessDistribution:
+        return self.access_distribution or default_access_distribution(self.random_access)
 
 
 class ProfileOperationSelectionType(Enum):
@@ -50,15 +109,102 @@ class ProfileOperationSelectionType(Enum):
     SEQUENTIAL = "sequential"
 
 
+class ProfileDataPattern(Enum):
+    RANDOM = "random"
+    ZERO = "zero"
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+
+class SaturationParameter(Enum):
+    THREADS = "threads"
+    IODEPTH = "iodepth"
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+
+class ThroughputMetric(Enum):
+    IOPS = "iops"
+    MBPS = "mbps"
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+
+class ProfileSaturationSearch(BaseModel):
+    """Turns a phase into a series of probes with a growing number of threads or iodepth.
+
+    The value grows by growth until throughput gains less than plateau_pct or p99 latency
+    exceeds p99_limit_ms, then the knee is narrowed down by bisection.
+    """
+    parameter: SaturationParameter = SaturationParameter.THREADS
+    metric: ThroughputMetric = ThroughputMetric.IOPS
+    start: int = Field(default=1, ge=1)
+    max_value: int = Field(default=256, ge=1)
+    growth: float = Field(default=2, gt=1)
+    plateau_pct: float = Field(default=5, gt=0, lt=100)
+    p99_limit_ms: float | None = Field(default=None, gt=0)
+    max_probes: int = Field(default=16, ge=1)
+
+
+class ProfileSteadyState(BaseModel):
+    """Ends the phase once throughput settles, checked every second on the last window_sec seconds.
+
+    Like SNIA PTS: the range of the per second values and the change of their linear fit over the
+    window both stay within a share of the window average. Measuring lasts at least min_duration_sec,
+    duration_sec of the phase remains the limit.
+    """
+    metric: ThroughputMetric = ThroughputMetric.IOPS
+    window_sec: int = Field(default=30, ge=2)
+    excursion_pct: float = Field(default=20, gt=0)
+    slope_pct: float = Field(default=10, gt=0)
+    min_duration_sec: int = Field(default=0, ge=0)
+
+
 class ProfilePhase(BaseModel):
     idle_time: IDLE_TIME
     threads: int = 1
+    processes: int | None = Field(default=None, ge=1)
+    threads_per_process: int = Field(default=1, ge=1)
+    warmup_sec: float = Field(default=0, ge=0)
+    cooldown_sec: float = Field(default=0, ge=0)
     ops_cnt: int | None = None
     duration_sec: int | None = None
     prepared_files: int = 8
     files_sizes: List[int] = Field(default_factory=lambda: [1024 ** 2])
     operations: List[ProfileOperation] = Field(default_factory=list)
     operations_selection_type: ProfileOperationSelectionType = ProfileOperationSelectionType.RANDOM
+    max_open_files: int = Field(default=64, ge=1)
+    measure_open_time: bool = False
+    data_pattern: ProfileDataPattern = ProfileDataPattern.RANDOM
+    fresh_dataset: bool = False
+    capture_units: bool = True
+    target_iops: float | None = Field(default=None, gt=0)
+    target_mbps: float | None = Field(default=None, gt=0)
+    saturation: ProfileSaturationSearch | None = None
+    steady_state: ProfileSteadyState | None = None
+
+    def get_processes(self) -> int:
+        """Worker processes; without explicit processes every thread is a process"""
+        return self.processes or self.threads
+
+    def get_total_threads(self) -> int:
+        return self.get_processes() * self.threads_per_process
+
+    @field_validator('operations', mode='after')
+    def check_weights(cls, operations: List[ProfileOperation]):
+        if operations and sum(op.weight for op in operations) <= 0:
+            raise ValueError("operation weights must not all be zero")
+        return operations
+
+    @model_validator(mode='after')
+    def check_cooldown(self):
+        # cool-down follows the measured window, a phase limited by steps only has no end time to start it from
+        if self.cooldown_sec and not self.duration_sec:
+            raise ValueError("cooldown_sec requires duration_sec")
+        return self
 
     @field_validator('operations', mode='after')
     def propagate_idle_time(cls, operations: List[ProfileOperation], values):
@@ -1,21 +1,61 @@
 import datetime
+from enum import Enum
 from typing import List, Tuple, Optional, Dict, Union
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from benchmark.model.execution import StorageConfiguration
 from benchmark.model.profile import ProfileOperationType, BenchmarkProfile
 
 
+class PhaseWindow(Enum):
+    WARMUP = "warmup"
+    MEASURE = "measure"
+    COOLDOWN = "cooldown"
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+
 class StepResult(BaseModel):
     filename: str
     operation_id: int
     operation_type: ProfileOperationType
     operation_random_access: bool
     ops_cnt: int
+    bytes: int = 0
     duration_sec: float
+    open_duration_sec: float = 0.0
     is_failed: bool
     time: datetime.datetime
-    units: list[Tuple[float, float]]
+    window: PhaseWindow = PhaseWindow.MEASURE
+    units: list[Tuple[float, float, int]]
+
+
+class HistogramData(BaseModel):
+    """Sparse counts of a log-bucketed latency histogram (bucket index -> count)"""
+    sub_bucket_bits: int
+    counts: Dict[int, int] = Field(default_factory=dict)
+    total_ns: int = 0
+    min_ns: int = 0
+    max_ns: int = 0
+
+
+class PerSecondCounters(BaseModel):
+    ops: List[int] = Field(default_factory=list)
+    bytes: List[int] = Field(default_factory=list)
+    errors: List[int] = Field(default_factory=list)
+
+
+class LatencyStats(BaseModel):
+    """Latency in seconds"""
+    count: int
+    mean: float
+    min: float
+    max: float
+    p50: float
+    p90: float
+    p99: float
+    p999: float
 
 
 class PhaseThreadResult(BaseModel):
@@ -26,12 +66,77 @@ class PhaseThreadResult(BaseModel):
     used_files: List[str]
     ops_cnt: int
     duration_sec: float
+    histograms: Dict[int, HistogramData] = Field(default_factory=dict)
+    per_second: Dict[int, PerSecondCounters] = Field(default_factory=dict)
+    streamed_batches: int = 0
+    measured_ops: int = 0
+    measured_bytes: int = 0
+    measured_errors: int = 0
+
+
+class SteadyStateResult(BaseModel):
+    """Whether throughput settled, reached_sec counts from the start of the measure window"""
+    reached: bool
+    reached_sec: Optional[float] = None
+    average: float = 0
+    excursion_pct: float = 0
+    slope_pct: float = 0
+
+
+class PhaseMetrics(BaseModel):
+    """Metrics merged over all workers of a phase, keyed by operation id.
+
+    Totals and latency cover the measure window only, per_second covers the whole phase."""
+    phase_id: int
+    ops: int
+    bytes: int
+    errors: int
+    warmup_sec: float = 0
+    cooldown_sec: float = 0
+    measured_sec: float = 0
+    steady_state: Optional[SteadyStateResult] = None
+    latency: Dict[int, LatencyStats] = Field(default_factory=dict)
+    histograms: Dict[int, HistogramData] = Field(default_factory=dict)
+    per_second: Dict[int, PerSecondCounters] = Field(default_factory=dict)
+
+
+class SaturationProbe(BaseModel):
+    """One phase run of a saturation search, p99 in seconds like LatencyStats"""
+    phase_id: int
+    value: int
+    iops: float
+    mbps: float
+    p99: float
+    errors: int = 0
+
+
+class SaturationResult(BaseModel):
+    """Throughput against latency of a saturation search, probes sorted by value.
+
+    phase_id is the phase of the profile, probes carry the phase ids their results are stored under."""
+    phase_id: int
+    parameter: str
+    metric: str
+    probes: List[SaturationProbe] = Field(default_factory=list)
+    knee: Optional[int] = None
+    knee_phase_id: Optional[int] = None
+    stop_reason: str
 
 
 class PhaseResult(BaseModel):
     threads: List[PhaseThreadResult]
     start_time: datetime.datetime
     finish_time: datetime.datetime
+    metrics: Optional[PhaseMetrics] = None
+
+
+class DatasetPreparationResult(BaseModel):
+    phase_id: int
+    files: int
+    reused_files: int = 0
+    bytes: int
+    duration_sec: float
+    mbps: float
 
 
 class BenchmarkResultSummary(BaseModel):
@@ -42,6 +147,9 @@ class BenchmarkResultSummary(BaseModel):
     profile: BenchmarkProfile
     storage_configuration: StorageConfiguration
     system_info: Dict[str, Union[str, int, float]]
+    preparations: List[DatasetPreparationResult] = Field(default_factory=list)
+    phases: List[PhaseMetrics] = Field(default_factory=list)
+    saturation: List[SaturationResult] = Field(default_factory=list)
 
 
 class BenchmarkResult(BaseModel):
@@ -52,10 +160,13 @@ class BenchmarkResult(BaseModel):
     profile: BenchmarkProfile
     storage_configuration: StorageConfiguration
     system_info: Dict[str, Union[str, int, float]]
+    preparations: List[DatasetPreparationResult] = Field(default_factory=list)
     phases_results: List[PhaseResult]
+    saturation: List[SaturationResult] = Field(default_factory=list)
 
     def get_summary(self) -> BenchmarkResultSummary:
-        return BenchmarkResultSummary(**self.dict())
+        return BenchmarkResultSummary(**self.dict(),
+                                      phases=[p.metrics for p in self.phases_results if p.metrics is not None])
 
 
 class DiskStatusUnit(BaseModel):
@@ -1,5 +1,5 @@
 from benchmark.model.profile import ProfilePhase, ProfileOperation, ProfileOperationType, ProfileFileSelection, \
-    BenchmarkProfile
+    BenchmarkProfile, ProfileSaturationSearch, SaturationParameter
 
 PHASE1 = ProfilePhase(threads=1, ops_cnt=1024, duration_sec=5, prepared_files=0, operations=[
     ProfileOperation(mode=ProfileOperationType.WRITE, random_access=True, ops_cnt=1024,
@@ -46,9 +46,19 @@ def gen_thread_increase2(n, op_cnt):
             for i in range(1, n + 1)]
 
 
+def gen_saturation_search(parameter=SaturationParameter.THREADS, p99_limit_ms=None):
+    """Instead of a linear sweep probes a growing number of threads until throughput stops growing"""
+    return ProfilePhase(duration_sec=10, prepared_files=8, operations=[
+        ProfileOperation(mode=ProfileOperationType.READ, random_access=True, ops_cnt=1024,
+                         file_selection=ProfileFileSelection.RANDOM_FILE),
+    ], files_sizes=[1024 ** 2 * 64],
+        saturation=ProfileSaturationSearch(parameter=parameter, max_value=64, p99_limit_ms=p99_limit_ms))
+
+
 PROFILE1 = BenchmarkProfile(phases=[PHASE3, PHASE4])
 PROFILE2 = BenchmarkProfile(phases=gen_thread_increase(4))
 PROFILE3 = BenchmarkProfile(phases=gen_thread_increase2(1, 64) + gen_thread_increase2(1, 1024))
+PROFILE4 = BenchmarkProfile(phases=[gen_saturation_search(p99_limit_ms=10)])
 
 # PHASE4 = ProfilePhase(threads=1, ops_cnt=1024, duration_sec=5, prepared_files=0, operations=[
 #     ProfileOperation(mode=ProfileOperationType.WRITE, random_access=True, ops_cnt=1024,
@@ -0,0 +1,195 @@
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from benchmark.model.results import BenchmarkResultSummary, PhaseMetrics
+
+CATALOG_FILE = "catalog.sqlite"
+SORT_COLUMNS = ("execution_id", "start_time", "finish_time", "duration_sec", "profile_name", "device", "status",
+                "iops", "mbps", "p99_us", "errors")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    execution_id TEXT PRIMARY KEY,
+    profile_name TEXT NOT NULL,
+    device TEXT,
+    storage_path TEXT,
+    status TEXT NOT NULL,
+    start_time TEXT,
+    finish_time TEXT,
+    duration_sec REAL,
+    phases INTEGER,
+    ops INTEGER,
+    bytes INTEGER,
+    errors INTEGER,
+    iops REAL,
+    mbps REAL,
+    p99_us REAL
+);
+CREATE INDEX IF NOT EXISTS runs_start_time ON runs (start_time);
+CREATE INDEX IF NOT EXISTS runs_profile_name ON runs (profile_name, start_time);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (status, start_time);
+CREATE TABLE IF NOT EXISTS aggregates (
+    execution_id TEXT NOT NULL,
+    phase_id INTEGER NOT NULL,
+    operation_id INTEGER NOT NULL,
+    operation_type TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (execution_id, phase_id, operation_id, operation_type, metric)
+);
+"""
+
+
+class RunEntry(NamedTuple):
+    execution_id: str
+    profile_name: str
+    device: Optional[str]
+    storage_path: Optional[str]
+    status: str
+    start_time: Optional[str]
+    finish_time: Optional[str]
+    duration_sec: Optional[float]
+    phases: int
+    ops: int
+    bytes: int
+    errors: int
+    iops: Optional[float]
+    mbps: Optional[float]
+    p99_us: Optional[float]
+
+
+class RunAggregate(NamedTuple):
+    """Metric of an operation of a phase over its measure window"""
+    phase_id: int
+    operation_id: int
+    operation_type: str
+    metric: str
+    value: Optional[float]
+
+
+class RunPage(NamedTuple):
+    runs: List[RunEntry]
+    total: int
+    page: int
+    page_size: int
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // self.page_size))
+
+
+def _measured_seconds(summary: BenchmarkResultSummary, metrics: PhaseMetrics) -> float:
+    if metrics.measured_sec:
+        return metrics.measured_sec
+    # summaries written before the measured window was kept
+    phases = summary.profile.phases
+    return (phases[metrics.phase_id - 1].duration_sec or 0) if 0 < metrics.phase_id <= len(phases) else 0
+
+
+def headline(summary: BenchmarkResultSummary, status: str) -> RunEntry:
+    """Catalog row of a run: totals of the measured windows and the worst p99 of its operations"""
+    metrics = summary.phases
+    seconds = sum(_measured_seconds(summary, m) for m in metrics)
+    ops = sum(m.ops for m in metrics)
+    size = sum(m.bytes for m in metrics)
+    p99 = [latency.p99 for m in metrics for latency in m.latency.values()]
+    duration = (summary.finish_time - summary.start_time).total_seconds() if summary.finish_time else None
+    return RunEntry(execution_id=summary.execution_id,
+                    profile_name=summary.profile_name,
+                    device=summary.storage_configuration.device,
+                    storage_path=summary.storage_configuration.path,
+                    status=status,
+                    start_time=summary.start_time.isoformat(sep=" ", timespec="seconds"),
+                    finish_time=summary.finish_time.isoformat(sep=" ", timespec="seconds")
+                    if summary.finish_time else None,
+                    duration_sec=duration,
+                    phases=len(summary.profile.phases),
+                    ops=ops,
+                    bytes=size,
+                    errors=sum(m.errors for m in metrics),
+                    iops=ops / seconds if seconds else None,
+                    mbps=size / 1024 ** 2 / seconds if seconds else None,
+                    p99_us=max(p99) * 1e6 if p99 else None)
+
+
+class RunCatalog:
+    """SQLite index of executions, so listings do not parse every summary file.
+
+    Written by the metric reporter of a run and read by the web process; a connection is
+    opened per call since both run in different processes.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self._path, timeout=30)
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._initialized = True
+        return connection
+
+    def record(self, summary: BenchmarkResultSummary, status: str):
+        entry = headline(summary, status)
+        with closing(self._connect()) as connection, connection:
+            connection.execute(f"INSERT OR REPLACE INTO runs VALUES ({', '.join('?' * len(entry))})", entry)
+
+    def set_status(self, execution_id: str, status: str):
+        with closing(self._connect()) as connection, connection:
+            connection.execute("UPDATE runs SET status = ? WHERE execution_id = ?", (status, execution_id))
+
+    def get(self, execution_id: str) -> Optional[RunEntry]:
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT * FROM runs WHERE execution_id = ?", (execution_id,)).fetchone()
+        return RunEntry(*row) if row else None
+
+    def record_aggregates(self, execution_id: str, aggregates: List[RunAggregate]):
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM aggregates WHERE execution_id = ?", (execution_id,))
+            connection.executemany("INSERT INTO aggregates VALUES (?, ?, ?, ?, ?, ?)",
+                                   [(execution_id, *a) for a in aggregates])
+
+    def aggregates(self, execution_id: str) -> List[RunAggregate]:
+        with closing(self._connect()) as connection:
+            return [RunAggregate(*row) for row in connection.execute(
+                "SELECT phase_id, operation_id, operation_type, metric, value FROM aggregates "
+                "WHERE execution_id = ? ORDER BY phase_id, operation_id, operation_type, metric", (execution_id,))]
+
+    def known(self) -> set[str]:
+        with closing(self._connect()) as connection:
+            return {row[0] for row in connection.execute("SELECT execution_id FROM runs")}
+
+    def query(self, profile_name: Optional[str] = None, device: Optional[str] = None, status: Optional[str] = None,
+              search: Optional[str] = None, sort: str = "start_time", descending: bool = True,
+              page: int = 1, page_size: int = 50) -> RunPage:
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort column {sort}")
+        conditions, args = [], []
+        for column, value in (("profile_name", profile_name), ("device", device), ("status", status)):
+            if value:
+                conditions.append(f"{column} = ?")
+                args.append(value)
+        if search:
+            conditions.append("(execution_id LIKE ? OR profile_name LIKE ?)")
+            args += [f"%{search}%"] * 2
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        page = max(1, page)
+        with closing(self._connect()) as connection:
+            total = connection.execute(f"SELECT COUNT(*) FROM runs {where}", args).fetchone()[0]
+            rows = connection.execute(
+                f"SELECT * FROM runs {where} ORDER BY {sort} IS NULL, {sort} {'DESC' if descending else 'ASC'}, "
+                f"execution_id LIMIT ? OFFSET ?", args + [page_size, (page - 1) * page_size]).fetchall()
+        return RunPage([RunEntry(*row) for row in rows], total, page, page_size)
+
+    def distinct(self, column: str) -> List[str]:
+        """Values of a column to filter by"""
+        if column not in ("profile_name", "device", "status"):
+            raise ValueError(f"Unknown filter column {column}")
+        with closing(self._connect()) as connection:
+            return [row[0] for row in connection.execute(
+                f"SELECT DISTINCT {column} FROM runs WHERE {column} IS NOT NULL ORDER BY {column}")]
@@ -1,12 +1,16 @@
 from pathlib import Path
 from typing import Optional
 
+from pydantic import ValidationError
+
 from benchmark.model.results import BenchmarkResultSummary
+from benchmark.repository.catalog import RunCatalog, RunPage, CATALOG_FILE
 
 
 class ReportRepository:
     def __init__(self, reports_path: Path):
         self._reports_path = reports_path
+        self.catalog = RunCatalog(reports_path / CATALOG_FILE)
 
     def get_summary(self, report_name: str) -> Optional[BenchmarkResultSummary]:
         path = self._reports_path / f"{report_name}_summary.json"
@@ -18,5 +22,22 @@ class ReportRepository:
     def list(self) -> list[str]:
         return [i.name[:-13] for i in self._reports_path.glob("*_summary.json")]
 
+    def sync(self):
+        """Adds runs the catalog does not know yet, like the ones made before it, by parsing their summaries once"""
+        known = self.catalog.known()
+        for name in self.list():
+            if name in known:
+                continue
+            try:
+                summary = self.get_summary(name)
+            except (ValidationError, ValueError) as e:
+                print(f"Summary of {name} is not readable: {e}")
+                continue
+            self.catalog.record(summary, "done" if summary.finish_time else "unknown")
+
+    def query(self, **filters) -> RunPage:
+        self.sync()
+        return self.catalog.query(**filters)
+
 
 reports = ReportRepository(Path("_results"))
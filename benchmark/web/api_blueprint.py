@@ -1,6 +1,14 @@
-from flask import Blueprint, request, jsonify
+import json
+import time
+
+from flask import Blueprint, request, jsonify, abort, Response, stream_with_context
 
 from benchmark.aggregation.aggregation import aggregate_throughput_per_steps, aggregate_throughput_summary
+from benchmark.aggregation.comparison import compare_runs
+from benchmark.config import METRICS_PATH, LIVE_DELAY_SEC, DYNAMIC_CHART_POINTS
+from benchmark.metrics.result_store import ResultStore, store_path, CSV_COLUMNS
+from benchmark.repository.catalog import RunCatalog, CATALOG_FILE
+from benchmark.workload.executor import BENCHMARK_EXECUTOR
 
 api_blueprint = Blueprint("api", __name__)
 
@@ -11,7 +19,8 @@ def get_result_summary_throughput():
     metric = request.args.get("metric", "mbps")
     group_by = request.args.get("group_by", "phase_id")
     aggregation = request.args.get("aggregation", "operation_type")
-    data = aggregate_throughput_summary(execution_id, metric, group_by, aggregation)
+    include_transient = request.args.get("include_transient", "false").lower() in ("1", "true")
+    data = aggregate_throughput_summary(execution_id, metric, group_by, aggregation, include_transient)
     return jsonify(data)
 
 
@@ -21,5 +30,64 @@ def get_result_throughput():
     group_by = request.args.get("group_by", "step")
     metric = request.args.get("metric", "mbps")
     aggregation = int(request.args.get("aggregation", "5"))
-    data = aggregate_throughput_per_steps(execution_id, group_by, metric, aggregation)
+    points = int(request.args.get("points", DYNAMIC_CHART_POINTS))
+    start = request.args.get("start")
+    end = request.args.get("end")
+    data = aggregate_throughput_per_steps(execution_id, group_by, metric, aggregation, points, start, end)
     return jsonify(data)
+
+
+@api_blueprint.route("/results/compare")
+def get_result_comparison():
+    """Per phase and operation metrics of several runs: ?execution_id=a&execution_id=b"""
+    execution_ids = list(dict.fromkeys(request.args.getlist("execution_id")))
+    if not execution_ids:
+        abort(400)
+    return jsonify(compare_runs(execution_ids))
+
+
+@api_blueprint.route("/results/export")
+def get_result_export():
+    """CSV export of a result table, streamed from the columnar store phase by phase"""
+    execution_id = request.args.get("execution_id")
+    table = request.args.get("table", "ops")
+    # only runs known to the catalog, the id becomes part of a path
+    if not execution_id or RunCatalog(METRICS_PATH / CATALOG_FILE).get(execution_id) is None:
+        abort(404)
+    store = ResultStore(store_path(METRICS_PATH, execution_id))
+    if table not in CSV_COLUMNS or not store.exists():
+        abort(404)
+    return Response(stream_with_context(store.iter_csv(table)), mimetype="text/csv",
+                    headers={"Content-Disposition": f"attachment; filename={execution_id}_{table}.csv"})
+
+
+@api_blueprint.route("/live")
+def get_live():
+    """Server-sent events with per second counters of a running execution, until it is over"""
+    execution_id = request.args.get("execution_id")
+    history = int(request.args.get("history", "300"))
+    live = BENCHMARK_EXECUTOR.live
+
+    def events():
+        last = int(time.time()) - LIVE_DELAY_SEC - history
+        streaming = False
+        while True:
+            status = BENCHMARK_EXECUTOR.status(execution_id)
+            running = status is not None and status["status"] == "running"
+            if not running and not streaming:
+                # the ring only holds the running execution, it may already belong to another one
+                yield "event: done\ndata: {}\n\n"
+                return
+            streaming = True
+            # once the execution is over the rest is sent without delay
+            now = int(time.time()) - (LIVE_DELAY_SEC if running else 0)
+            for second, counters in live.read(last + 1, now):
+                yield f"data: {json.dumps(live.second_summary(second, counters))}\n\n"
+            last = now
+            if not running:
+                yield "event: done\ndata: {}\n\n"
+                return
+            time.sleep(1)
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
@@ -3,11 +3,12 @@ import re
 import yaml
 from flask import Flask, render_template, flash, redirect, url_for, request
 
-from benchmark.config import STORAGE_CONFIG
+from benchmark.config import STORAGE_CONFIG, RUNS_PAGE_SIZE
 from benchmark.metrics.metric_reporter import metricFileReporter
 from benchmark.model.execution import ExecutionRequest
 from benchmark.model.profile import BenchmarkProfile, ProfilePhase
 from benchmark.repository.profile import profiles, profile_to_yaml, yaml_to_profile
+from benchmark.repository.catalog import SORT_COLUMNS
 from benchmark.repository.reports import reports
 from benchmark.web.api_blueprint import api_blueprint
 from benchmark.workload.executor import BENCHMARK_EXECUTOR
@@ -41,10 +42,29 @@ def _post_start_benchmark():
     return redirect(url_for('_get_start_benchmark'))
 
 
+def _catalog_filters():
+    return dict(profile_name=request.args.get('profile') or None,
+                device=request.args.get('device') or None,
+                status=request.args.get('status') or None,
+                search=request.args.get('q') or None,
+                sort=request.args.get('sort') if request.args.get('sort') in SORT_COLUMNS else 'start_time',
+                descending=request.args.get('order', 'desc') != 'asc',
+                page=request.args.get('page', 1, type=int),
+                page_size=RUNS_PAGE_SIZE)
+
+
+def _catalog_choices():
+    return {column: reports.catalog.distinct(column) for column in ('profile_name', 'device', 'status')}
+
+
 @app.route("/benchmarks")
 def _get_benchmark_list():
-    executions = BENCHMARK_EXECUTOR.all_executions()
-    return render_template("pages/benchmark_list.html", executions=executions.items())
+    runs = reports.query(**_catalog_filters())
+    # the catalog keeps "running" for runs that were cut off with the web process
+    states = BENCHMARK_EXECUTOR.all_executions()
+    statuses = {r.execution_id: states[r.execution_id]['status'] if r.execution_id in states
+                else ('interrupted' if r.status == 'running' else r.status) for r in runs.runs}
+    return render_template("pages/benchmark_list.html", runs=runs, statuses=statuses, choices=_catalog_choices())
 
 
 @app.route("/benchmark_status")
@@ -113,7 +133,8 @@ def _get_profile_editor_create():
 
 @app.route("/reports")
 def _get_report_list():
-    return render_template("pages/report_list.html", reports=reports.list())
+    runs = reports.query(**_catalog_filters())
+    return render_template("pages/report_list.html", runs=runs, choices=_catalog_choices())
 
 
 @app.route("/reports/report")
@@ -126,5 +147,20 @@ def _get_report_summary():
     return render_template("pages/report_summary.html", report_name=report_name, summary=summary)
 
 
+@app.route("/reports/compare")
+def _get_report_comparison():
+    execution_ids = list(dict.fromkeys(request.args.getlist('execution_id')))
+    if len(execution_ids) < 2:
+        flash("Выберите хотя бы два отчета для сравнения", "error")
+        return redirect(url_for('_get_report_list'))
+    return render_template("pages/report_comparison.html", execution_ids=execution_ids)
+
+
+@app.route("/reports/timed")
+def _get_report_timed():
+    execution_id = request.args.get('execution_id')
+    return render_template("pages/result_timed.html", execution_id=execution_id)
+
+
 def run_app():
     app.run(debug=True, host="0.0.0.0")
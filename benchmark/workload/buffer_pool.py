@@ -0,0 +1,50 @@
+import mmap
+import os
+from typing import Dict, List
+
+from benchmark.model.profile import ProfileDataPattern
+
+PATTERN_SIZE = 8 * 1024 ** 2
+
+_patterns: Dict[ProfileDataPattern, mmap.mmap] = {}
+
+
+class BufferPool:
+    """Page-aligned mmap buffers reused across I/O requests.
+
+    Each submitter slot owns one buffer, so O_DIRECT requests never allocate and
+    never fall back to unaligned Python bytes objects. Page alignment covers any
+    logical block size that divides the page size.
+    """
+
+    def __init__(self):
+        self._buffers: List[mmap.mmap] = []
+
+    def get(self, slot: int, size: int) -> memoryview:
+        while len(self._buffers) <= slot:
+            self._buffers.append(self._allocate(size))
+        buf = self._buffers[slot]
+        if len(buf) < size:
+            buf.close()
+            buf = self._buffers[slot] = self._allocate(size)
+        return memoryview(buf)[:size]
+
+    def _allocate(self, size: int) -> mmap.mmap:
+        buf = mmap.mmap(-1, -(-size // mmap.PAGESIZE) * mmap.PAGESIZE)
+        buf.write(os.urandom(len(buf)))
+        return buf
+
+    def close(self):
+        for buf in self._buffers:
+            buf.close()
+        self._buffers.clear()
+
+
+def get_pattern(data_pattern: ProfileDataPattern = ProfileDataPattern.RANDOM) -> memoryview:
+    """Returns the process-wide pattern buffer used to fill dataset files."""
+    pattern = _patterns.get(data_pattern)
+    if pattern is None:
+        pattern = _patterns[data_pattern] = mmap.mmap(-1, PATTERN_SIZE)
+        if data_pattern == ProfileDataPattern.RANDOM:
+            pattern.write(os.urandom(PATTERN_SIZE))
+    return memoryview(pattern)
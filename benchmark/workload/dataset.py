@@ -0,0 +1,124 @@
+import json
+import time
+import uuid
+from collections import defaultdict
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from benchmark.config import DATASET_PREPARATION_PROCESSES, DATASET_CACHE_BUDGET, DATASET_CACHE_INDEX
+from benchmark.model.execution import StorageConfiguration
+from benchmark.model.profile import ProfileDataPattern
+from benchmark.model.results import DatasetPreparationResult
+from benchmark.workload.file_handler import FileHandler, FileHandlerException, FSFileCreator
+
+
+def _prepare_file(handler: FileHandler) -> FileHandler:
+    handler.initialize(sync=True)
+    return handler
+
+
+def prepare_dataset(phase_id: int, files: List[FileHandler],
+                    processes: int = DATASET_PREPARATION_PROCESSES) -> Tuple[List[FileHandler], DatasetPreparationResult]:
+    """Creates and fills files in a process pool, returns initialized handlers in the same order."""
+    start_time = time.time()
+    if files:
+        with Pool(max(1, min(processes, len(files)))) as pool:
+            files = pool.map(_prepare_file, files, chunksize=1)
+    duration = time.time() - start_time
+    total_bytes = sum(f.file_size() for f in files)
+    result = DatasetPreparationResult(phase_id=phase_id, files=len(files), bytes=total_bytes, duration_sec=duration,
+                                      mbps=total_bytes / (1024 ** 2) / duration if duration > 0 else 0.0)
+    return files, result
+
+
+class DatasetCache:
+    """Keeps prepared files on the storage between phases and executions.
+
+    Files are matched by (storage path, file size, data pattern); the index lives next
+    to the files, least recently used files are removed once the budget is exceeded.
+    """
+
+    def __init__(self, storage_configuration: StorageConfiguration, budget_bytes: int = DATASET_CACHE_BUDGET):
+        self._file_creator = FSFileCreator(storage_configuration)
+        self._index_path = Path(storage_configuration.path) / DATASET_CACHE_INDEX
+        self._budget_bytes = budget_bytes
+        self._entries: Dict[str, dict] = self._load()
+        self._in_use = set()
+
+    def acquire(self, phase_id: int, sizes: List[int],
+                data_pattern: ProfileDataPattern) -> Tuple[List[FileHandler], DatasetPreparationResult]:
+        available = defaultdict(list)
+        for name, entry in sorted(self._entries.items(), key=lambda e: e[1]["last_used"]):
+            if name not in self._in_use and entry["data_pattern"] == data_pattern.value:
+                available[entry["size"]].append(name)
+
+        files = []
+        missing = []
+        for size in sizes:
+            if available[size]:
+                f = self._file_creator(size, available[size].pop(), data_pattern)
+                f.created = f.initialized = True
+            else:
+                f = self._file_creator(size, f"dataset_{size}_{data_pattern.value}_{uuid.uuid4()}", data_pattern)
+                missing.append(len(files))
+            files.append(f)
+
+        prepared, result = prepare_dataset(phase_id, [files[i] for i in missing])
+        for i, f in zip(missing, prepared):
+            files[i] = f
+        result.reused_files = len(files) - len(missing)
+        result.files = len(files)
+
+        for f in files:
+            self._in_use.add(f.file_name())
+            self._entries[f.file_name()] = {"size": f.file_size(), "data_pattern": data_pattern.value,
+                                            "last_used": time.time()}
+        self._evict()
+        self._save()
+        return files, result
+
+    def release(self, files: List[FileHandler], keep: bool = True):
+        for f in files:
+            self._in_use.discard(f.file_name())
+            if keep:
+                self._entries[f.file_name()]["last_used"] = time.time()
+            else:
+                self._remove(f)
+        self._evict()
+        self._save()
+
+    def _evict(self):
+        total = sum(e["size"] for e in self._entries.values())
+        for name, entry in sorted(self._entries.items(), key=lambda e: e[1]["last_used"]):
+            if total <= self._budget_bytes:
+                break
+            if name in self._in_use:
+                continue
+            self._remove(self._file_creator(entry["size"], name))
+            total -= entry["size"]
+
+    def _remove(self, f: FileHandler):
+        self._entries.pop(f.file_name(), None)
+        f.created = True
+        try:
+            f.delete()
+        except FileHandlerException as e:
+            print(f"Failed to remove cached dataset file: {e}")
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self._index_path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        directory = self._index_path.parent
+        return {name: entry for name, entry in entries.items()
+                if (directory / name).exists() and (directory / name).stat().st_size == entry["size"]}
+
+    def _save(self):
+        self._index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        tmp_path.replace(self._index_path)
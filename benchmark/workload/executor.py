@@ -1,87 +1,105 @@
 import os
 import random
 import signal
+import threading
 from datetime import datetime
-from typing import Callable
-from multiprocessing import Manager, Process, RLock
+from typing import Callable, Dict, Optional
+from multiprocessing import Event, Process, Value
 
+from benchmark.config import METRICS_PATH
+from benchmark.metrics.live import LiveRing
 from benchmark.metrics.metric_reporter import MetricReporter
 from benchmark.model.execution import ExecutionRequest
 from benchmark.model.profile import BenchmarkProfile
+from benchmark.repository.catalog import RunCatalog, CATALOG_FILE
 from benchmark.workload.file_handler import FileHandler, FSFileHandler
 from benchmark.workload.profile_runner import ProfileRunner, PhaseCallback
 
 
 class BenchmarkExecutor:
+    """Runs one execution at a time in its own process.
+
+    The execution process reports its phase and completion through shared memory, states of
+    all executions are kept in the web process.
+    """
+
     def __init__(self):
-        self._manager = Manager()
-        self._states = self._manager.dict()
-        self._current_pid = self._manager.Value('i', 0)
-        self._current_execution_id = self._manager.Value('s', None)
-        self._lock = self._manager.RLock()
+        self._states: Dict[str, dict] = {}
+        self._process: Optional[Process] = None
+        self._current_execution_id: Optional[str] = None
+        self._phase = Value('i', 0)
+        self._done = Event()
+        self._lock = threading.RLock()
+        # only one execution runs at a time, its workers publish live counters here
+        self.live = LiveRing()
 
     def execute(self, request: ExecutionRequest, metric_reporter: Callable[[str, ExecutionRequest], MetricReporter]):
         execution_id = datetime.now().strftime('%Y%m%d_%H%M%S') + '_' + hex(random.randint(0, 0xffff))[2:].zfill(4)
         with self._lock:
-            print(self._current_execution_id.value)
-            if self._current_execution_id.value is not None:
+            self._update()
+            print(self._current_execution_id)
+            if self._current_execution_id is not None:
                 raise Exception("An oter execution is already running")
-            self._current_execution_id.value = execution_id
-            self._current_pid.value = 0
-            self._states[execution_id] = {'status': 'initialized', 'phase': 0}
-
-        p = Process(
-            target=self._execute_profile,
-            args=(execution_id, request, metric_reporter(execution_id, request), self._lock)
-        )
-        p.start()
-        with self._lock:
-            if self._states[execution_id]['status'] != 'initialized':
-                raise Exception("An execution is already running")
-            self._current_pid.value = p.pid
+            self._phase.value = 0
+            self._done.clear()
+            self.live.clear()
+
+            p = Process(
+                target=self._execute_profile,
+                args=(execution_id, request, metric_reporter(execution_id, request))
+            )
+            p.start()
+            self._process = p
+            self._current_execution_id = execution_id
             self._states[execution_id] = {'status': 'running', 'phase': 0}
 
         return execution_id
 
-    def _execute_profile(self, execution_id: str, request: ExecutionRequest, metric_reporter: MetricReporter,
-                         lock: RLock):
+    def _execute_profile(self, execution_id: str, request: ExecutionRequest, metric_reporter: MetricReporter):
         try:
-            callback = PhaseCallback(self._lock, self._states, execution_id)
-            runner = ProfileRunner(request, metric_reporter, callback)
+            runner = ProfileRunner(request, metric_reporter, PhaseCallback(self._phase), self.live)
             runner.run(execution_id)
-            with lock:
-                self._states[execution_id] = {'status': 'done', 'phase': self._states[execution_id]['phase']}
-                self._current_execution_id.value = None
+            self._done.set()
             print(f"Benchmark execution {execution_id} finished")
         except KeyboardInterrupt as e:
             print(f"Execution {execution_id} interrupted")
 
-    def _phase_callback(self, execution_id: str, phase: int):
-        with self._lock:
-            self._states[execution_id] = {'status': 'running', 'phase': phase}
+    def _update(self):
+        """Takes over the phase and completion reported by the process of the current execution"""
+        execution_id = self._current_execution_id
+        if execution_id is None:
+            return
+        if self._done.is_set():
+            self._states[execution_id] = {'status': 'done', 'phase': self._phase.value}
+            self._current_execution_id = None
+            self._process.join()
+            self._process = None
+        else:
+            self._states[execution_id] = {'status': 'running', 'phase': self._phase.value}
 
     def interrupt(self, execution_id: str):
         with self._lock:
-            if self._states.get(execution_id, {'status': None})['status'] != 'running' or \
-                    self._current_execution_id.value != execution_id:
+            self._update()
+            if self._current_execution_id != execution_id:
                 raise Exception("An execution is not running")
-            pid = self._current_pid.value
-            self._current_pid.value = 0
-            self._current_execution_id.value = None
+            pid = self._process.pid
+            self._current_execution_id = None
+            self._process = None
             self._states[execution_id] = {'status': 'interrupted',
                                           'phase': self._states[execution_id]['phase']}
 
         os.kill(pid, signal.SIGINT)
+        RunCatalog(METRICS_PATH / CATALOG_FILE).set_status(execution_id, 'interrupted')
 
     def status(self, execution_id: str):
         with self._lock:
+            self._update()
             return self._states.get(execution_id, None)
 
     def all_executions(self):
         with self._lock:
+            self._update()
             return dict(self._states)
 
-    def close(self):
-        self._manager.shutdown()
 
 BENCHMARK_EXECUTOR = BenchmarkExecutor()
\ No newline at end of file
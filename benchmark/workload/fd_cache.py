@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from benchmark.workload.file_handler import FileHandler
+
+
+class FileDescriptorCache:
+    """LRU cache of open descriptors, so steps on the same file skip open/close.
+
+    The cache may be shared by the threads of a worker process: descriptors taken with
+    acquire are not evicted until released.
+    """
+
+    def __init__(self, max_open_files: int):
+        self._max_open_files = max_open_files
+        self._fds: OrderedDict[FileHandler, int] = OrderedDict()
+        self._pinned: Dict[FileHandler, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, handler: FileHandler) -> int:
+        with self._lock:
+            fd = self._get(handler)
+            self._evict(handler)
+            return fd
+
+    def acquire(self, handler: FileHandler) -> int:
+        with self._lock:
+            fd = self._get(handler)
+            self._pinned[handler] = self._pinned.get(handler, 0) + 1
+            self._evict(handler)
+            return fd
+
+    def release(self, handler: FileHandler):
+        with self._lock:
+            n = self._pinned.pop(handler, 0) - 1
+            if n > 0:
+                self._pinned[handler] = n
+            self._evict()
+
+    def _get(self, handler: FileHandler) -> int:
+        fd = self._fds.get(handler)
+        if fd is not None:
+            self._fds.move_to_end(handler)
+            return fd
+        fd = self._fds[handler] = handler.open()
+        return fd
+
+    def _evict(self, keep: Optional[FileHandler] = None):
+        if len(self._fds) <= self._max_open_files:
+            return
+        for handler in list(self._fds):
+            if len(self._fds) <= self._max_open_files:
+                break
+            if handler is not keep and handler not in self._pinned:
+                handler.close(self._fds.pop(handler))
+
+    def discard(self, handler: FileHandler):
+        with self._lock:
+            fd = self._fds.pop(handler, None)
+            self._pinned.pop(handler, None)
+            if fd is not None:
+                handler.close(fd)
+
+    def close(self):
+        with self._lock:
+            while self._fds:
+                handler, fd = self._fds.popitem()
+                handler.close(fd)
+            self._pinned.clear()
+
+    def __len__(self):
+        return len(self._fds)
@@ -1,11 +1,11 @@
 from abc import ABC, abstractmethod
-from mmap import mmap
 from pathlib import Path
+import mmap
 import os
 import time
 import uuid
 import random
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from smbprotocol.connection import Connection
 from smbprotocol.open import Open, CreateDisposition, FilePipePrinterAccessMask, ImpersonationLevel
@@ -13,6 +13,12 @@ from smbprotocol.session import Session
 from smbprotocol.tree import TreeConnect
 
 from benchmark.config import BLOCK_SIZE
+from benchmark.metrics.disk_status import get_logical_block_size
+from benchmark.model.execution import StorageConfiguration
+from benchmark.model.profile import default_access_distribution, ProfileDataPattern
+from benchmark.workload.buffer_pool import get_pattern
+from benchmark.workload.io_engine import get_engine
+from benchmark.workload.offsets import OffsetStream
 
 
 class FileHandler(ABC):
@@ -21,19 +27,45 @@ class FileHandler(ABC):
         """Создает файл, если он не еще не был создан."""
 
     @abstractmethod
-    def initialize(self):
-        """Заполняет файл случайными данными."""
+    def initialize(self, sync=False):
+        """Заполняет файл случайными данными, при sync сбрасывает их на устройство."""
 
     @abstractmethod
     def delete(self): pass
 
     @abstractmethod
-    def read_blocks(self, n=None, time_end=None, random_access=False):
-        """Читает n блоков из файла не более time_end секунд."""
+    def open(self) -> Optional[int]:
+        """Открывает файл и возвращает дескриптор для передачи в read_blocks/write_blocks.
+
+        None, если обработчик открывает файл сам на время каждого вызова."""
 
     @abstractmethod
-    def write_blocks(self, n=None, time_end=None, random_access=False):
-        """Пишет n блоков в файл не более time_end секунд."""
+    def close(self, fd: Optional[int]):
+        """Закрывает дескриптор, полученный из open."""
+
+    @abstractmethod
+    def read_blocks(self, n=None, time_end=None, random_access=False, iodepth=1, block_size=None,
+                    access_distribution=None, fd=None, schedule=None, on_units=None, stop=None):
+        """Читает n блоков из файла не более time_end секунд, держа до iodepth запросов в очереди.
+
+        block_size - словарь {размер блока: вес}, по умолчанию размер блока файла.
+        access_distribution - распределение смещений, по умолчанию определяется random_access.
+        fd - уже открытый дескриптор, иначе файл открывается на время вызова.
+        schedule - RateSchedule для открытого цикла с заданной интенсивностью.
+        on_units - вызывается с частями units во время длинного шага, в результат попадает остаток.
+        stop - возвращает True, когда шаг нужно прервать, не дожидаясь n и time_end."""
+
+    @abstractmethod
+    def write_blocks(self, n=None, time_end=None, random_access=False, iodepth=1, block_size=None,
+                     access_distribution=None, fd=None, schedule=None, on_units=None, stop=None):
+        """Пишет n блоков в файл не более time_end секунд, держа до iodepth запросов в очереди.
+
+        block_size - словарь {размер блока: вес}, по умолчанию размер блока файла.
+        access_distribution - распределение смещений, по умолчанию определяется random_access.
+        fd - уже открытый дескриптор, иначе файл открывается на время вызова.
+        schedule - RateSchedule для открытого цикла с заданной интенсивностью.
+        on_units - вызывается с частями units во время длинного шага, в результат попадает остаток.
+        stop - возвращает True, когда шаг нужно прервать, не дожидаясь n и time_end."""
 
     @abstractmethod
     def file_name(self): pass
@@ -58,10 +90,13 @@ class FileHandlerException(Exception):
 
 
 class FSFileHandler(FileHandler):
-    def __init__(self, basepath=".", filename=None, size=1024 ** 2, block_size=BLOCK_SIZE, binary=True):
+    def __init__(self, basepath=".", filename=None, size=1024 ** 2, block_size=BLOCK_SIZE, binary=True, alignment=512,
+                 data_pattern=ProfileDataPattern.RANDOM):
         self.filename = filename or f"{uuid.uuid4()}"
         self.size = size
         self.block_size = block_size
+        self.alignment = alignment
+        self.data_pattern = data_pattern
         self.binary = binary
         self.mode = 'b' if binary else ''
         self.path = Path(basepath) / self.filename
@@ -71,24 +106,37 @@ class FSFileHandler(FileHandler):
     def create(self):
         if self.created:
             return
-        if not self.path.exists():
-            # os.close(os.open(str(self.path), os.O_CREAT | os.O_WRONLY, 0o644))
-            # self.path.touch()
-            with open(str(self.path), 'wb') as f:
-                f.write(b'\0' * self.size)
+        try:
+            fd = os.open(str(self.path), os.O_CREAT | os.O_WRONLY, 0o644)
+            try:
+                try:
+                    os.posix_fallocate(fd, 0, self.size)
+                except OSError:
+                    # the filesystem can't preallocate, a sparse file of the right size will do
+                    os.ftruncate(fd, self.size)
+            finally:
+                os.close(fd)
+        except (IOError, OSError) as e:
+            raise FileHandlerException(str(e), self.filename)
         self.created = True
 
-    def initialize(self):
+    def initialize(self, sync=False):
         if self.initialized:
             return
 
         self.create()
-        mode = f'w{self.mode}+'
+        pattern = get_pattern(self.data_pattern)
         try:
-            with open(str(self.path), mode) as f:
-                for _ in range(self.size // self.block_size):
-                    data = self._random_block()
-                    f.write(data if self.binary else data.encode())
+            fd = os.open(str(self.path), os.O_WRONLY)
+            try:
+                pos = 0
+                while pos < self.size:
+                    pos += os.pwrite(fd, pattern[:min(len(pattern), self.size - pos)], pos)
+                if sync:
+                    os.fdatasync(fd)
+                    os.posix_fadvise(fd, 0, self.size, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
             self.initialized = True
         except (IOError, OSError) as e:
             raise FileHandlerException(str(e), self.filename)
@@ -104,57 +152,56 @@ class FSFileHandler(FileHandler):
         except (IOError, OSError) as e:
             raise FileHandlerException(str(e), self.filename)
 
-    def _do_io(self, mode, op_count=None, time_end=None, random_access=False) -> Tuple[List[Tuple[float, float]], bool]:
-        access_mode = f'{mode}{self.mode}'
-
+    def open(self) -> int:
         try:
-            start_time = time.time()
-            fd = os.open(str(self.path), os.O_RDWR | getattr(os, "O_DIRECT", 0))
-            if fd == 0:
-                print("zero fd", self.path)
-            with os.fdopen(fd, access_mode, buffering=0) as f:
-                file_size = self.file_size()
-                block = self._random_block()
-                positions = list(range(0, file_size, self.block_size))
-                ops = 0
-                units = []
-                prev_time = time.time()
-                while (op_count and ops < op_count) and (not time_end or time.time() < time_end):
-                    pos = random.choice(positions) if random_access else positions[ops % len(positions)]
-                    try:
-                        if random_access:
-                            os.lseek(fd, pos, os.SEEK_SET)
-                        if mode == 'r':
-                            os.read(fd, self.block_size)
-                        elif mode == 'r+':
-                            os.write(fd, block)
-                    except (IOError, OSError) as e:
-                        print("io_operation_error_2", e, self.path)
-                        return units, True
-                    now_time = time.time()
-                    units.append((now_time - start_time, now_time - prev_time))
-                    prev_time = now_time
-                    ops += 1
-                return units, False
+            return os.open(str(self.path), os.O_RDWR | getattr(os, "O_DIRECT", 0))
         except (IOError, OSError) as e:
             print("io_operation_error", e, self.path)
             raise FileHandlerException(str(e), self.filename)
 
-    def read_blocks(self, n=None, time_end=None, random_access=False):
-        return self._do_io('r', op_count=n, time_end=time_end, random_access=random_access)
-
-    def write_blocks(self, n=None, time_end=None, random_access=False):
-        return self._do_io('r+', op_count=n, time_end=time_end, random_access=random_access)
+    def close(self, fd: int):
+        try:
+            os.close(fd)
+        except (IOError, OSError) as e:
+            raise FileHandlerException(str(e), self.filename)
 
-    def _aligned_buffer(self, size):
-        buf = mmap(-1, size + BLOCK_SIZE)
-        offset = 0
-        return buf[offset:offset + size]
+    def _do_io(self, mode, op_count=None, time_end=None, random_access=False, iodepth=1, block_size=None,
+               access_distribution=None, fd=None, schedule=None,
+               on_units=None, stop=None) -> Tuple[List[Tuple[float, float, int]], bool]:
+        sizes = block_size or {self.block_size: 1.0}
+        access_distribution = access_distribution or default_access_distribution(random_access)
+        if mmap.PAGESIZE % self.alignment:
+            raise FileHandlerException(f"logical block size {self.alignment} does not divide page size "
+                                       f"{mmap.PAGESIZE} of I/O buffers", self.filename)
+        for size in sizes:
+            if size % self.alignment:
+                raise FileHandlerException(f"block size {size} is not aligned to logical block size "
+                                           f"{self.alignment}", self.filename)
+            if size > self.file_size():
+                raise FileHandlerException(f"block size {size} exceeds file size {self.file_size()}", self.filename)
+        own_fd = fd is None
+        if own_fd:
+            fd = self.open()
 
-    def _random_block(self):
-        if self.binary:
-            return os.urandom(self.block_size) # self._aligned_buffer(self.block_size)  #
-        return ''.join(random.choices('abcdefghijklmnopqrstuvwxyz', k=self.block_size))
+        try:
+            stream = OffsetStream(self.file_size(), sizes, access_distribution, op_count)
+            return get_engine(iodepth).run(fd, mode == 'r+', stream, max(sizes), op_count=op_count, time_end=time_end,
+                                           schedule=schedule, on_units=on_units, stop=stop)
+        finally:
+            if own_fd:
+                os.close(fd)
+
+    def read_blocks(self, n=None, time_end=None, random_access=False, iodepth=1, block_size=None,
+                    access_distribution=None, fd=None, schedule=None, on_units=None, stop=None):
+        return self._do_io('r', op_count=n, time_end=time_end, random_access=random_access, iodepth=iodepth,
+                           block_size=block_size, access_distribution=access_distribution, fd=fd, schedule=schedule,
+                           on_units=on_units, stop=stop)
+
+    def write_blocks(self, n=None, time_end=None, random_access=False, iodepth=1, block_size=None,
+                     access_distribution=None, fd=None, schedule=None, on_units=None, stop=None):
+        return self._do_io('r+', op_count=n, time_end=time_end, random_access=random_access, iodepth=iodepth,
+                           block_size=block_size, access_distribution=access_distribution, fd=fd, schedule=schedule,
+                           on_units=on_units, stop=stop)
 
     def file_name(self):
         return self.filename
@@ -163,6 +210,16 @@ class FSFileHandler(FileHandler):
         return self.size
 
 
+class FSFileCreator:
+    def __init__(self, storage_configuration: StorageConfiguration):
+        self.basepath = storage_configuration.path
+        self.alignment = get_logical_block_size(storage_configuration.device)
+
+    def __call__(self, size, filename=None, data_pattern=ProfileDataPattern.RANDOM) -> FileHandler:
+        return FSFileHandler(basepath=self.basepath, filename=filename, size=size, alignment=self.alignment,
+                             data_pattern=data_pattern)
+
+
 class SMBFileHandler(FileHandler):
     def __init__(self, server, share, username, password, filename=None, size=1024 ** 2, block_size=4096, binary=True):
         self.server = server
@@ -212,7 +269,7 @@ class SMBFileHandler(FileHandler):
         except Exception as e:
             raise FileHandlerException(str(e), self.filename)
 
-    def initialize(self):
+    def initialize(self, sync=False):
         if self.initialized:
             return
 
@@ -260,7 +317,7 @@ class SMBFileHandler(FileHandler):
         except Exception as e:
             raise FileHandlerException(str(e), self.filename)
 
-    def _do_io(self, mode, op_count=None, time_end=None, random_access=False):
+    def _do_io(self, mode, op_count=None, time_end=None, random_access=False, stop=None):
         self._ensure_connected()
 
         try:
@@ -277,9 +334,13 @@ class SMBFileHandler(FileHandler):
                 file_size = self.file_size()
                 positions = list(range(0, file_size, self.block_size))
                 ops = 0
+                units = []
+                start_time = time.perf_counter()
 
-                while (op_count and ops < op_count) and (not time_end or time.time() < time_end):
+                while (op_count and ops < op_count) and (not time_end or time.time() < time_end) \
+                        and not (stop and stop()):
                     pos = random.choice(positions) if random_access else positions[ops % len(positions)]
+                    begin = time.perf_counter()
                     f.seek(pos)
 
                     if mode == 'r':
@@ -290,17 +351,41 @@ class SMBFileHandler(FileHandler):
                             data = data.encode()
                         f.write(data)
 
+                    end = time.perf_counter()
+                    units.append((end - start_time, end - begin, self.block_size))
                     ops += 1
 
-                return ops
+                return units, False
         except Exception as e:
             raise FileHandlerException(str(e), self.filename)
 
-    def read_blocks(self, n=None, time_end=None, random_access=False):
-        return self._do_io('r', op_count=n, time_end=time_end, random_access=random_access)
-
-    def write_blocks(self, n=None, time_end=None, random_access=False):
-        return self._do_io('r+', op_count=n, time_end=time_end, random_access=random_access)
+    def open(self) -> Optional[int]:
+        # every call opens the file over the SMB tree, there is no descriptor to keep
+        return None
+
+    def close(self, fd: Optional[int]):
+        pass
+
+    def _check_supported(self, random_access, iodepth, block_size, access_distribution, schedule):
+        """SMB runs one request at a time with the handler's block size and uniform or sequential offsets"""
+        if iodepth != 1:
+            raise ValueError(f"SMB does not support iodepth {iodepth}, only 1")
+        if block_size and set(block_size) != {self.block_size}:
+            raise ValueError(f"SMB does not support block sizes {sorted(block_size)}, only {self.block_size}")
+        if access_distribution and access_distribution != default_access_distribution(random_access):
+            raise ValueError(f"SMB does not support access distribution {access_distribution.type.value}")
+        if schedule is not None:
+            raise ValueError("SMB does not support target_iops or target_mbps")
+
+    def read_blocks(self, n=None, time_end=None, random_access=False, iodepth=1, block_size=None,
+                    access_distribution=None, fd=None, schedule=None, on_units=None, stop=None):
+        self._check_supported(random_access, iodepth, block_size, access_distribution, schedule)
+        return self._do_io('r', op_count=n, time_end=time_end, random_access=random_access, stop=stop)
+
+    def write_blocks(self, n=None, time_end=None, random_access=False, iodepth=1, block_size=None,
+                     access_distribution=None, fd=None, schedule=None, on_units=None, stop=None):
+        self._check_supported(random_access, iodepth, block_size, access_distribution, schedule)
+        return self._do_io('r+', op_count=n, time_end=time_end, random_access=random_access, stop=stop)
 
     def _random_block(self):
         if self.binary:
@@ -0,0 +1,184 @@
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from benchmark.workload.buffer_pool import BufferPool
+
+Unit = Tuple[float, float, int]
+
+_local = threading.local()
+
+# during a long step units are handed off in chunks, at most every HANDOFF_UNITS units or HANDOFF_INTERVAL seconds
+HANDOFF_UNITS = 16 * 1024
+HANDOFF_INTERVAL = 1.0
+# how often a submitter checks whether the step has to stop early
+STOP_CHECK_INTERVAL = 0.05
+
+
+class RateSchedule:
+    """Open-loop timeline of intended request start times.
+
+    Requests are due at a fixed rate regardless of how long previous ones took, and
+    latency is measured from the intended start, so stalls are not hidden by the
+    generator slowing down (coordinated omission). The timeline starts with the first
+    request and continues across steps, but time between the steps that use it (other
+    operations, idle time, file setup) is not owed: a timeline behind is moved to the
+    start of the step, so the correction applies inside a step. mbps is in MiB/s, like
+    the reports.
+    """
+
+    def __init__(self, iops: Optional[float] = None, mbps: Optional[float] = None):
+        self._interval = 1 / iops if iops else 0.0
+        self._bytes_interval = 1 / (mbps * 1024 ** 2) if mbps else 0.0
+        self._next_time: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def next(self, size: int) -> float:
+        """Reserves the next slot for a request of `size` bytes and returns its intended start."""
+        with self._lock:
+            if self._next_time is None:
+                self._next_time = time.perf_counter()
+            intended = self._next_time
+            self._next_time += max(self._interval, size * self._bytes_interval)
+            return intended
+
+    def anchor(self):
+        """Called when a step using the timeline starts, drops the backlog left from before it"""
+        with self._lock:
+            if self._next_time is not None:
+                self._next_time = max(self._next_time, time.perf_counter())
+
+
+class IOEngine:
+    """Keeps up to `iodepth` positional requests in flight on a single descriptor.
+
+    os.pread/os.pwrite release the GIL, so `iodepth` submitter threads give the
+    device a real queue depth from one worker process. With `on_units`, completed
+    units are handed off in chunks while the step runs, with the offset the chunk
+    ends at, and only the rest is returned, so memory does not grow with the step.
+    `stop` is polled by the submitters and ends the step once it returns True.
+    """
+
+    def __init__(self, iodepth: int = 1):
+        self.iodepth = iodepth
+        self._buffers = BufferPool()
+        self._executor = ThreadPoolExecutor(max_workers=iodepth - 1, thread_name_prefix="io") \
+            if iodepth > 1 else None
+
+    def run(self, fd: int, write: bool, next_request: Callable[[int], Tuple[int, int]], max_block_size: int,
+            op_count: Optional[int] = None, time_end: Optional[float] = None,
+            schedule: Optional[RateSchedule] = None,
+            on_units: Optional[Callable[[List[Unit], float], None]] = None,
+            stop: Optional[Callable[[], bool]] = None) -> Tuple[List[Unit], bool]:
+        tickets = itertools.count()
+        failed = threading.Event()
+        stopped = threading.Event()
+        units: List[Unit] = []
+        start_time = time.perf_counter()
+        handoff_lock = threading.Lock()
+        handed_off = [start_time]
+
+        def hand_off(now: float):
+            with handoff_lock:
+                if now - handed_off[0] < HANDOFF_INTERVAL and len(units) < HANDOFF_UNITS:
+                    return
+                handed_off[0] = time.perf_counter()
+                chunk = units[:]
+                # other submitters keep appending behind the copied part
+                del units[:len(chunk)]
+                chunk.sort()
+                on_units(chunk, handed_off[0] - start_time)
+        deadline = start_time + (time_end - time.time()) if time_end else None
+
+        if schedule is not None:
+            schedule.anchor()
+
+        buffers = [self._buffers.get(slot, max_block_size) for slot in range(self.iodepth)]
+
+        def submitter(buf: memoryview):
+            views = {}
+            next_stop_check = start_time
+            while not failed.is_set() and not stopped.is_set():
+                ticket = next(tickets)
+                if op_count is not None and ticket >= op_count:
+                    break
+                begin = time.perf_counter()
+                if deadline is not None and begin >= deadline:
+                    break
+                if stop is not None and begin >= next_stop_check:
+                    next_stop_check = begin + STOP_CHECK_INTERVAL
+                    if stop():
+                        stopped.set()
+                        break
+                pos, size = next_request(ticket)
+                if schedule is not None:
+                    intended = schedule.next(size)
+                    if deadline is not None and intended >= deadline:
+                        break
+                    while intended > begin:
+                        time.sleep(min(intended - begin, STOP_CHECK_INTERVAL))
+                        begin = time.perf_counter()
+                        # a slow schedule must not hide a stop request
+                        if intended > begin and stop is not None and (stopped.is_set() or stop()):
+                            stopped.set()
+                            break
+                    if stopped.is_set():
+                        break
+                    begin = intended
+                view = views.get(size)
+                if view is None:
+                    view = views[size] = buf[:size]
+                try:
+                    if write:
+                        done = os.pwrite(fd, view, pos)
+                    else:
+                        done = os.preadv(fd, [view], pos)
+                except (IOError, OSError) as e:
+                    print("io_operation_error_2", e)
+                    failed.set()
+                    break
+                end = time.perf_counter()
+                units.append((end - start_time, end - begin, done))
+                if on_units is not None and (end - handed_off[0] >= HANDOFF_INTERVAL or len(units) >= HANDOFF_UNITS):
+                    hand_off(end)
+            for view in views.values():
+                view.release()
+
+        futures = [self._executor.submit(submitter, buf) for buf in buffers[1:]]
+        submitter(buffers[0])
+        for future in futures:
+            future.result()
+        for buf in buffers:
+            buf.release()
+        units.sort()
+        return units, failed.is_set()
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        self._buffers.close()
+
+
+def get_engine(iodepth: int) -> IOEngine:
+    """Returns an engine for the calling thread, so submitter threads survive between steps.
+
+    A thread keeps one engine, it is replaced when a step needs another iodepth.
+    """
+    engine = getattr(_local, "engine", None)
+    if engine is not None and engine.iodepth != iodepth:
+        engine.shutdown()
+        engine = None
+    if engine is None:
+        engine = _local.engine = IOEngine(iodepth)
+    return engine
+
+
+def release_engine():
+    """Shuts down the engine of the calling thread, called when the thread finishes a phase"""
+    engine = getattr(_local, "engine", None)
+    if engine is not None:
+        _local.engine = None
+        engine.shutdown()
@@ -0,0 +1,107 @@
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmark.model.profile import ProfileAccessDistribution, ProfileAccessDistributionType
+
+BATCH_SIZE = 4096
+
+
+class OffsetStream:
+    """Generates (offset, size) requests for a file in NumPy batches.
+
+    Requests are addressed by ticket number, so submitter threads of one IOEngine can
+    share a stream without locking on the hot path.
+    """
+
+    def __init__(self, file_size: int, sizes: Dict[int, float], distribution: ProfileAccessDistribution,
+                 op_count: Optional[int] = None, rng: Optional[np.random.Generator] = None):
+        self._file_size = file_size
+        self._sizes = np.array(list(sizes), dtype=np.int64)
+        weights = np.array(list(sizes.values()), dtype=np.float64)
+        self._weights = weights / weights.sum()
+        self._distribution = distribution
+        self._rng = rng or np.random.default_rng()
+        self._batch_size = max(1, min(op_count or BATCH_SIZE, BATCH_SIZE))
+        self._slots = file_size // int(self._sizes.min())
+        self._cursor = 0
+        self._next_batch = 0
+        self._batches: Dict[int, Tuple[List[int], List[int]]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, ticket: int) -> Tuple[int, int]:
+        batch_no, i = divmod(ticket, self._batch_size)
+        batch = self._batches.get(batch_no)
+        if batch is None:
+            batch = self._fill(batch_no)
+        return batch[0][i], batch[1][i]
+
+    def _fill(self, batch_no: int) -> Tuple[List[int], List[int]]:
+        with self._lock:
+            while self._next_batch <= batch_no:
+                self._batches[self._next_batch] = self._generate(self._batch_size)
+                self._batches.pop(self._next_batch - 3, None)
+                self._next_batch += 1
+            batch = self._batches.get(batch_no)
+            if batch is None:
+                # a submitter lagged behind the batch window, serve it from a one-off batch
+                batch = self._generate(self._batch_size)
+            return batch
+
+    def _generate(self, n: int) -> Tuple[List[int], List[int]]:
+        if len(self._sizes) == 1:
+            sizes = np.full(n, self._sizes[0], dtype=np.int64)
+        else:
+            sizes = self._rng.choice(self._sizes, size=n, p=self._weights)
+
+        if self._distribution.type == ProfileAccessDistributionType.SEQUENTIAL:
+            offsets = self._sequential(sizes)
+        else:
+            offsets = self._locations(n) * (self._file_size // sizes)
+            offsets = offsets.astype(np.int64) * sizes
+        return offsets.tolist(), sizes.tolist()
+
+    def _locations(self, n: int) -> np.ndarray:
+        """Returns request locations as fractions of the file in [0, 1)."""
+        d = self._distribution
+        if d.type == ProfileAccessDistributionType.UNIFORM:
+            return self._rng.random(n)
+        if d.type == ProfileAccessDistributionType.HOTSPOT:
+            hot = d.hot_space_pct / 100
+            u = self._rng.random(n)
+            return np.where(self._rng.random(n) < d.hot_ops_pct / 100, u * hot, hot + u * (1 - hot))
+        if d.type == ProfileAccessDistributionType.ZIPF:
+            ranks = bounded_zipf(self._rng, d.zipf_theta, self._slots, n)
+            return scatter(ranks, self._slots) / self._slots
+        raise ValueError("Unknown access distribution")
+
+    def _sequential(self, sizes: np.ndarray) -> np.ndarray:
+        steps = sizes + self._distribution.stride
+        offsets = (self._cursor + np.cumsum(steps) - steps) % self._file_size
+        offsets = offsets // sizes * sizes
+        offsets = np.where(offsets + sizes > self._file_size, 0, offsets)
+        self._cursor = int((offsets[-1] + steps[-1]) % self._file_size)
+        return offsets
+
+
+def bounded_zipf(rng: np.random.Generator, theta: float, n: int, size: int) -> np.ndarray:
+    """Samples 0-based ranks from a Zipf(theta) distribution truncated to n items.
+
+    Uses the inverse CDF of the continuous power law, so memory does not depend on n.
+    """
+    u = rng.random(size)
+    if math.isclose(theta, 1.0):
+        ranks = np.exp(u * math.log(n + 1))
+    else:
+        ranks = (u * ((n + 1) ** (1 - theta) - 1) + 1) ** (1 / (1 - theta))
+    return np.minimum(ranks.astype(np.int64) - 1, n - 1)
+
+
+def scatter(ranks: np.ndarray, n: int) -> np.ndarray:
+    """Spreads hot ranks over the file with a multiplicative bijection on [0, n)."""
+    multiplier = 2654435761 % n or 1
+    while math.gcd(multiplier, n) != 1:
+        multiplier += 1
+    return ranks * multiplier % n
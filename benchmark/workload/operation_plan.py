@@ -0,0 +1,111 @@
+import random
+from fractions import Fraction
+from math import lcm, gcd
+from typing import List, Optional, Sequence, Tuple
+
+from benchmark.model.profile import ProfileOperation, ProfileOperationType, ProfileFileSelection, \
+    ProfileOperationSelectionType
+
+# shares of the round-robin cycle are approximated by fractions up to 1/MAX_WEIGHT_DENOMINATOR,
+# if the cycle is still longer than MAX_CYCLE they are rounded to shares of MAX_CYCLE
+MAX_WEIGHT_DENOMINATOR = 100
+MAX_CYCLE = 1000
+
+
+def creates_file(op: ProfileOperation) -> bool:
+    """Only writes to a new file can run before a thread has any files"""
+    return op.file_selection == ProfileFileSelection.NEW_FILE and op.mode == ProfileOperationType.WRITE
+
+
+class AliasTable:
+    """Walker's alias method: weighted choice of an index with one random number and two lookups"""
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        self._probability = [1.0] * n
+        self._alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._probability[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1 - scaled[s]
+            (small if scaled[l] < 1 else large).append(l)
+        # leftovers keep probability 1, they only differ from it by rounding errors
+        self._n = n
+
+    def __call__(self, rng: random.Random) -> int:
+        u = rng.random() * self._n
+        i = int(u)
+        return i if u - i < self._probability[i] else self._alias[i]
+
+
+def round_robin_cycle(weights: Sequence[float]) -> List[int]:
+    """Indices in smooth weighted round-robin order, each index as often as its weight"""
+    total = sum(weights)
+    fractions = [Fraction(w / total).limit_denominator(MAX_WEIGHT_DENOMINATOR) for w in weights]
+    denominator = lcm(*(f.denominator for f in fractions))
+    counts = [int(f * denominator) for f in fractions]
+    if sum(counts) > MAX_CYCLE or not all(counts):
+        # every operation keeps at least one slot, however small its weight
+        counts = [max(1, round(w / total * MAX_CYCLE)) for w in weights]
+    divisor = gcd(*counts)
+    counts = [c // divisor for c in counts]
+    total = sum(counts)
+    current = [0] * len(counts)
+    cycle = []
+    for _ in range(total):
+        for i, c in enumerate(counts):
+            current[i] += c
+        i = max(range(len(counts)), key=lambda j: current[j])
+        current[i] -= total
+        cycle.append(i)
+    return cycle
+
+
+class OperationPlan:
+    """Choice of the next operation of a phase thread, compiled once before the phase starts.
+
+    Random selection draws from alias tables built from operation weights, sequential selection
+    walks a weighted round-robin cycle. Both have a variant restricted to operations creating a
+    file, used while the thread has no files yet.
+    """
+
+    def __init__(self, operations: List[ProfileOperation], selection_type: ProfileOperationSelectionType):
+        self._operations: List[Tuple[int, ProfileOperation]] = [(i, op) for i, op in enumerate(operations)
+                                                                  if op.weight > 0]
+        weights = [op.weight for _, op in self._operations]
+        creating = [j for j, (_, op) in enumerate(self._operations) if creates_file(op)]
+        self._creating = creating
+        self._random = selection_type == ProfileOperationSelectionType.RANDOM
+        if self._random:
+            self._any = AliasTable(weights) if weights else None
+            self._any_creating = AliasTable([weights[j] for j in creating]) if creating else None
+        else:
+            self._cycle = round_robin_cycle(weights) if weights else []
+            # position of the nearest operation creating a file at or after each position
+            self._next_creating: List[Optional[int]] = [None] * len(self._cycle)
+            nearest = None
+            for position in reversed(range(2 * len(self._cycle))):
+                position %= len(self._cycle)
+                if self._cycle[position] in creating:
+                    nearest = position
+                self._next_creating[position] = nearest
+            self._position = 0
+
+    def choose(self, rng: random.Random, has_files: bool) -> Tuple[int, ProfileOperation]:
+        if self._random:
+            if has_files:
+                assert self._any is not None, "No such possible ops"
+                return self._operations[self._any(rng)]
+            assert self._any_creating is not None, "No such possible ops"
+            return self._operations[self._creating[self._any_creating(rng)]]
+
+        assert self._cycle, "No such possible ops"
+        position = self._position if has_files else self._next_creating[self._position]
+        assert position is not None, "No such possible ops"
+        self._position = (position + 1) % len(self._cycle)
+        return self._operations[self._cycle[position]]
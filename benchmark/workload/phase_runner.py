@@ -1,97 +1,177 @@
-import datetime
+import random
 import signal
 import sys
-import time
-from multiprocessing import Pool, Barrier, Manager, Value, Process
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
+from typing import List, Optional
 
-from benchmark.config import DISKSTATUS_INTERVAL
-from benchmark.metrics.disk_status import get_physical_disk, get_diskstats
+from benchmark.metrics.histogram import merge_histograms, merge_counters
+from benchmark.metrics.live import LiveRing
 from benchmark.metrics.metric_reporter import MetricReporter
 from benchmark.metrics.phase_metric_reporter import ThreadPhaseMetricReporterImpl
 from benchmark.model.execution import StorageConfiguration
-from benchmark.model.profile import ProfilePhase
-from benchmark.model.results import PhaseThreadResult, DiskStatusUnit
+from benchmark.model.profile import ProfilePhase, ProfileOperationType, ProfileFileSelection, ProfileDataPattern
+from benchmark.model.results import PhaseThreadResult, PhaseMetrics, SteadyStateResult
+from benchmark.workload.dataset import prepare_dataset, DatasetCache
+from benchmark.workload.fd_cache import FileDescriptorCache
+from benchmark.workload.file_handler import FileHandler, FileHandlerException, FSFileCreator
 from benchmark.workload.phase_thread_runner import PhaseThreadRunner
+from benchmark.workload.steady_state import SteadyStateMonitor
+from benchmark.workload.worker_pool import WorkerPool, wait_for_start, stop_requested, result_sink, \
+    live_publisher
 
 
 class PhaseRunner:
     def __init__(self, phase_id: int, phase: ProfilePhase, metric_reporter: MetricReporter,
-                 storage_configuration: StorageConfiguration):
+                 storage_configuration: StorageConfiguration, dataset_cache: Optional[DatasetCache] = None,
+                 worker_pool: Optional[WorkerPool] = None):
         self._phase_id = phase_id
         self._phase = phase
         self._metric_reporter = metric_reporter
         self._storage_configuration = storage_configuration
-
-    def run(self):
-        num_workers = self._phase.threads
-
-        manager = Manager()
-        shared_barrier = manager.Barrier(num_workers)
-        running = manager.Value('i', 1)
-        diskstatus_results = manager.Value('O', [])
-
-        p = Process(
-            target=self._diskstatus_collector_worker,
-            args=(self._storage_configuration, running, diskstatus_results)
-        )
-        p.start()
-
-        with Pool(self._phase.threads) as pool:
-            per_thread_results = pool.starmap(self._thread_worker, [(i, shared_barrier) for i in range(num_workers)])
-
-        running.value = 0
-        p.join()
-
-        self._metric_reporter.report_phase(self._phase, per_thread_results)
-        self._metric_reporter.report_disk_status(self._phase_id, diskstatus_results.value)
-
-    def _thread_worker(self, worker_id: int, start_barrier: Barrier) -> PhaseThreadResult:
-        reporter = ThreadPhaseMetricReporterImpl(f"thread-{worker_id}")
-
-        thread_name = f"thread-{worker_id}"
-
-        runner = PhaseThreadRunner(self._phase, self._storage_configuration, reporter, thread_name)
+        self._dataset_cache = dataset_cache
+        self._worker_pool = worker_pool
+        self._steady_state: Optional[SteadyStateResult] = None
+
+    def run(self) -> PhaseMetrics:
+        prepared_files = self._prepare_files(self._phase.get_total_threads())
+        try:
+            return self._run(self._phase.get_processes(), prepared_files)
+        finally:
+            self._release_files([f for files in prepared_files for f in files])
+
+    def _run(self, num_workers: int, prepared_files: List[List[FileHandler]]) -> PhaseMetrics:
+        if self._worker_pool is None:
+            with WorkerPool(num_workers, self._storage_configuration.device,
+                            self._metric_reporter.result_store_path(),
+                            LiveRing() if self._phase.steady_state else None) as worker_pool:
+                per_thread_results, diskstatus_results = self._run_phase(worker_pool, num_workers, prepared_files)
+        else:
+            per_thread_results, diskstatus_results = self._run_phase(self._worker_pool, num_workers, prepared_files)
+
+        metrics = self._merge_metrics(per_thread_results)
+        for op_id, latency in metrics.latency.items():
+            print(f"phase {self._phase_id} operation {op_id}: p50={latency.p50 * 1e6:.0f}us "
+                  f"p99={latency.p99 * 1e6:.0f}us p99.9={latency.p999 * 1e6:.0f}us")
+        self._metric_reporter.report_phase(self._phase, per_thread_results, metrics)
+        self._metric_reporter.report_disk_status(self._phase_id, diskstatus_results)
+        return metrics
+
+    def _run_phase(self, worker_pool: WorkerPool, num_workers: int, prepared_files: List[List[FileHandler]]):
+        n = self._phase.threads_per_process
+        args = [(self._phase_id, self._phase, self._storage_configuration, i, prepared_files[i * n:(i + 1) * n])
+                for i in range(num_workers)]
+        monitor = None
+        if self._phase.steady_state is not None and worker_pool.live is not None:
+            monitor = SteadyStateMonitor(self._phase.steady_state, worker_pool.live, self._phase.warmup_sec,
+                                         lambda: worker_pool.running_phase() == self._phase_id,
+                                         worker_pool.stop_phase)
+        with monitor or nullcontext():
+            per_thread_results, diskstatus_results = worker_pool.run_phase(self._phase_id, self._process_worker,
+                                                                           args)
+        self._steady_state = monitor.result if monitor else None
+        worker_pool.wait_results_written(self._phase_id, sum(t.streamed_batches for t in per_thread_results))
+        return per_thread_results, diskstatus_results
+
+    def _merge_metrics(self, per_thread_results: List[PhaseThreadResult]) -> PhaseMetrics:
+        histograms = merge_histograms([t.histograms for t in per_thread_results])
+        counters = merge_counters([t.per_second for t in per_thread_results])
+        start = min(t.start_time for t in per_thread_results) + timedelta(seconds=self._phase.warmup_sec)
+        finish = max(t.finish_time for t in per_thread_results)
+        if self._phase.duration_sec:
+            finish = min(finish, start + timedelta(seconds=self._phase.duration_sec))
+        return PhaseMetrics(phase_id=self._phase_id,
+                            ops=sum(t.measured_ops for t in per_thread_results),
+                            bytes=sum(t.measured_bytes for t in per_thread_results),
+                            errors=sum(t.measured_errors for t in per_thread_results),
+                            warmup_sec=self._phase.warmup_sec,
+                            cooldown_sec=self._phase.cooldown_sec,
+                            measured_sec=max((finish - start).total_seconds(), 0.0),
+                            steady_state=self._steady_state,
+                            latency={op_id: h.stats() for op_id, h in histograms.items()},
+                            histograms={op_id: h.to_data() for op_id, h in histograms.items()},
+                            per_second={op_id: c.to_data() for op_id, c in counters.items()})
+
+    def _prepare_files(self, num_workers: int) -> List[List[FileHandler]]:
+        sizes = [random.choice(self._phase.files_sizes) for _ in range(num_workers * self._phase.prepared_files)]
+        if self._use_dataset_cache():
+            files, result = self._dataset_cache.acquire(self._phase_id, sizes, self._phase.data_pattern)
+        else:
+            file_creator = FSFileCreator(self._storage_configuration)
+            files, result = prepare_dataset(self._phase_id,
+                                            [file_creator(size, data_pattern=self._phase.data_pattern)
+                                             for size in sizes])
+        print(f"phase {self._phase_id} dataset prepared: {result.files} files ({result.reused_files} reused), "
+              f"{result.mbps:.1f} MB/s")
+        self._metric_reporter.report_preparation(result)
+        n = self._phase.prepared_files
+        return [files[i * n:(i + 1) * n] for i in range(num_workers)]
+
+    def _release_files(self, files: List[FileHandler]):
+        if self._use_dataset_cache():
+            # writes would break a non-random pattern the files are cached under
+            writes_prepared = any(op.mode == ProfileOperationType.WRITE and
+                                  op.file_selection != ProfileFileSelection.NEW_FILE for op in self._phase.operations)
+            self._dataset_cache.release(files, keep=self._phase.data_pattern == ProfileDataPattern.RANDOM
+                                        or not writes_prepared)
+            return
+        for f in files:
+            try:
+                f.delete()
+            except FileHandlerException as e:
+                print(f"Failed to remove prepared file: {e}")
+
+    def _use_dataset_cache(self) -> bool:
+        return self._dataset_cache is not None and not self._phase.fresh_dataset
+
+    @staticmethod
+    def _process_worker(phase_id: int, phase: ProfilePhase, storage_configuration: StorageConfiguration,
+                        worker_id: int, prepared_files: List[List[FileHandler]]) -> PhaseThreadResult:
+        """Runs threads_per_process threads sharing one fd cache and one set of histograms"""
+        threads = phase.threads_per_process
+        if threads == 1:
+            reporter_name = f"thread-{worker_id}"
+            thread_names = [f"thread-{worker_id}"]
+        else:
+            reporter_name = f"process-{worker_id}"
+            thread_names = [f"thread-{worker_id}-{j}" for j in range(threads)]
+        reporter = ThreadPhaseMetricReporterImpl(reporter_name, phase.capture_units, result_sink(phase_id), worker_id,
+                                                 live_publisher())
+
+        fd_cache = FileDescriptorCache(phase.max_open_files)
+        runners = [PhaseThreadRunner(phase, storage_configuration, reporter, name, stop_requested, fd_cache)
+                   for name in thread_names]
+
+        def cleanup():
+            for r in runners:
+                r.cleanup()
+            fd_cache.close()
 
         def SIGINT_handler(signum, frame):
-            runner.cleanup()
+            cleanup()
             if signum == signal.SIGINT or signum == signal.SIGTERM:
                 sys.exit(0)
 
         signal.signal(signal.SIGINT, SIGINT_handler)
         signal.signal(signal.SIGTERM, SIGINT_handler)
 
-        runner.initialize()
-        print(f"thread {worker_id} initialized")
-
-        start_barrier.wait()
-        print(f"thread {worker_id} started")
-        runner.execute()
-
-        print(f"thread {worker_id} finished")
-        runner.cleanup()
-
-        return reporter.phase_metric([f.file_name() for f in runner.files])
-
-    def _diskstatus_collector_worker(self, storage_configuration: StorageConfiguration, is_running: Value,
-                                     results_value: Value):
-        storage_device = storage_configuration.device
-        if storage_device is None:
-            print(f"No storage device found for {storage_configuration}")
-            return
-
-        units = []
-
-        prev_status = get_diskstats(storage_device)
-        while is_running.value == 1:
-            time.sleep(DISKSTATUS_INTERVAL)
-            status = get_diskstats(storage_device)
-            diff = prev_status.compare(status, DISKSTATUS_INTERVAL)
-            prev_status = status
-            units.append(DiskStatusUnit(
-                time=datetime.datetime.now(),
-                read_utilization=diff['read_utilization'],
-                write_utilization=diff['write_utilization'],
-                total_utilization=diff['total_utilization'],
-                queue_length=diff['queue_length']
-            ))
-        results_value.value = units
+        try:
+            for runner, files in zip(runners, prepared_files):
+                runner.initialize(files)
+            print(f"worker {worker_id} initialized")
+        finally:
+            wait_for_start()
+        print(f"worker {worker_id} started")
+
+        with ThreadPoolExecutor(max_workers=threads - 1) if threads > 1 else nullcontext() as executor:
+            futures = [executor.submit(r.execute) for r in runners[1:]]
+            runners[0].execute()
+            for future in futures:
+                future.result()
+
+        print(f"worker {worker_id} finished")
+        used_files = [f.file_name() for r in runners for f in r.files]
+        cleanup()
+
+        return reporter.phase_metric(used_files)
@@ -1,77 +1,113 @@
 import random
 import time
-from datetime import datetime
-from typing import Callable, List, Tuple
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
 
 from benchmark.config import MAX_PHASE_TIME
 from benchmark.metrics.phase_metric_reporter import ThreadPhaseMetricReporter
 from benchmark.model.execution import StorageConfiguration
-from benchmark.model.results import StepResult
-from benchmark.model.profile import ProfilePhase, ProfileOperation, ProfileOperationType, ProfileFileSelection, \
-    ProfileOperationSelectionType
-from benchmark.workload.file_handler import FileHandler, FileHandlerException, FSFileHandler
+from benchmark.model.results import StepResult, PhaseWindow
+from benchmark.model.profile import ProfilePhase, ProfileOperation, ProfileOperationType, ProfileFileSelection
+from benchmark.workload.fd_cache import FileDescriptorCache
+from benchmark.workload.file_handler import FileHandler, FileHandlerException, FSFileCreator
+from benchmark.workload.io_engine import RateSchedule, release_engine
+from benchmark.workload.operation_plan import OperationPlan
 
 
 class PhaseThreadRunner:
     phase: ProfilePhase
     files: List[FileHandler]
     file_creator: Callable[[int], FileHandler]
-    operation_offset: int
+    operation_plan: OperationPlan
     random: random.Random
 
     def __init__(self, phase: ProfilePhase, storage_configuration: StorageConfiguration,
-                 metric_reporter: ThreadPhaseMetricReporter, thread_name: str):
+                 metric_reporter: ThreadPhaseMetricReporter, thread_name: str,
+                 stop_requested: Callable[[], bool] = lambda: False,
+                 fd_cache: Optional[FileDescriptorCache] = None):
         self.phase = phase
         self.files = []
-        self.file_creator = lambda size: FSFileHandler(basepath=storage_configuration.path, size=size)
-        self.operation_offset = 0
+        self.file_creator = FSFileCreator(storage_configuration)
+        self.operation_plan = OperationPlan(phase.operations, phase.operations_selection_type)
         self.random = random.Random()
         self.metric_reporter = metric_reporter
         self.thread_name = thread_name
+        self.stop_requested = stop_requested
+        self.measure_start = 0.0
+        self.measure_end: Optional[float] = None
+        self.own_fd_cache = fd_cache is None
+        self.fd_cache = fd_cache or FileDescriptorCache(phase.max_open_files)
+        self.prepared_files = set()
+        self.phase_schedule = self._schedule(phase.target_iops, phase.target_mbps)
+        self.operation_schedules: Dict[int, RateSchedule] = {
+            op_id: self._schedule(op.target_iops, op.target_mbps) for op_id, op in enumerate(phase.operations)
+            if op.target_iops or op.target_mbps}
 
-    def initialize(self):
-        """Create random files"""
+    def _schedule(self, iops: Optional[float], mbps: Optional[float]) -> Optional[RateSchedule]:
+        """Target rates are given for the whole phase and split evenly between threads"""
+        if not iops and not mbps:
+            return None
+        threads = self.phase.get_total_threads()
+        return RateSchedule(iops / threads if iops else None, mbps / threads if mbps else None)
+
+    def initialize(self, prepared_files: List[FileHandler] = None):
+        """Create random files, or use files prepared (and later removed) by the phase runner"""
+        if prepared_files is not None:
+            self.files.extend(prepared_files)
+            self.prepared_files.update(prepared_files)
+            return
+        reads = any(op.mode == ProfileOperationType.READ for op in self.phase.operations)
         for i in range(self.phase.prepared_files):
-            self.files.append(self._create_file())
+            f = self._create_file()
+            if reads:
+                f.initialize()
+            self.files.append(f)
 
     def cleanup(self):
         """Cleanup after phases"""
+        try:
+            if self.own_fd_cache:
+                self.fd_cache.close()
+        except FileHandlerException as e:
+            pass
         for f in self.files:
+            if f in self.prepared_files:
+                continue
             try:
+                if not self.own_fd_cache:
+                    self.fd_cache.discard(f)
                 f.delete()
             except FileHandlerException as e:
                 pass
 
         self.files.clear()
+        self.prepared_files.clear()
 
     def execute(self):
         self.metric_reporter.start_phase()
         start_time = time.time()
-        deadline = start_time + (self.phase.duration_sec if self.phase.duration_sec else MAX_PHASE_TIME)
+        # duration_sec is the measured window, warm-up runs before it and cool-down after it
+        self.measure_start = start_time + self.phase.warmup_sec
+        if self.phase.duration_sec:
+            self.measure_end = self.measure_start + self.phase.duration_sec
+            deadline = self.measure_end + self.phase.cooldown_sec
+        else:
+            self.measure_end = None
+            deadline = start_time + MAX_PHASE_TIME
         n_ops = 0
-        while time.time() < deadline and (not self.phase.ops_cnt or n_ops < self.phase.ops_cnt):
-            op_id, op = self._choose_op()
-            n_ops += 1
-            self._execute_operation(op_id, op, deadline)
+        try:
+            while time.time() < deadline and (not self.phase.ops_cnt or n_ops < self.phase.ops_cnt) \
+                    and not self.stop_requested():
+                op_id, op = self._choose_op()
+                n_ops += 1
+                self._execute_operation(op_id, op, deadline)
+        finally:
+            # workers outlive the phase, its submitter threads and buffers do not
+            release_engine()
         self.metric_reporter.finish_phase(time.time() - start_time, n_ops)
 
     def _choose_op(self) -> tuple[int, ProfileOperation]:
-        possible_ops = []
-        if not self.files:
-            for op_id,op in enumerate(self.phase.operations):
-                if op.file_selection == ProfileFileSelection.NEW_FILE and op.mode == ProfileOperationType.WRITE:
-                    possible_ops.append((op_id, op))
-        else:
-            possible_ops = list(enumerate(self.phase.operations))
-        assert len(possible_ops) > 0, "No such possible ops"
-
-        if self.phase.operations_selection_type == ProfileOperationSelectionType.RANDOM:
-            return self.random.choice(possible_ops)
-        else:
-            op_id = self.operation_offset % len(self.phase.operations)
-            op = self.phase.operations[op_id]
-            self.operation_offset += 1
-            return op_id, op
+        return self.operation_plan.choose(self.random, bool(self.files))
 
     def _execute_operation(self, op_id: int, op: ProfileOperation, phase_deadline: time.time()):
         if op.file_selection == ProfileFileSelection.NEW_FILE:
@@ -84,38 +120,87 @@ class PhaseThreadRunner:
         else:
             raise ValueError("Unknown profile file selection")
 
-        f.create()
+        # only reads need the data pattern in the file, writes overwrite it anyway, so a new file
+        # written first is just preallocated. A new file read first is filled before its step starts.
+        if op.mode == ProfileOperationType.READ:
+            f.initialize()
+        else:
+            f.create()
 
         start_time = time.time()
         start_date_time = datetime.now()
         deadline = min(phase_deadline, start_time + op.duration_sec) if op.duration_sec else phase_deadline
+        window, window_end = self._window(start_time)
+        if window_end is not None:
+            # steps do not cross window boundaries, so every step belongs to one window
+            deadline = min(deadline, window_end)
+        open_seconds = 0.0
+        acquired = False
+        # a long step is logged as consecutive segments, one per chunk of units handed off by the engine
+        segment_start = 0.0
+
+        def log_segment(units, end, is_failed):
+            nonlocal segment_start
+            if segment_start:
+                units = [(u[0] - segment_start, u[1], u[2]) for u in units]
+            self._log_step(start_date_time + timedelta(seconds=segment_start), f, op_id, op, len(units),
+                           sum(u[2] for u in units), end - segment_start,
+                           0.0 if segment_start else open_seconds, is_failed, units, window)
+            segment_start = end
+
         try:
+            fd = self.fd_cache.acquire(f)
+            acquired = True
+            open_seconds = time.time() - start_time
+            start_time += open_seconds
+            start_date_time += timedelta(seconds=open_seconds)
+            schedule = self.operation_schedules.get(op_id, self.phase_schedule)
+            on_units = lambda units, end: log_segment(units, end, False)
             if op.mode == ProfileOperationType.READ:
-                (units, is_failed) = f.read_blocks(op.ops_cnt, deadline, op.random_access)
+                (units, is_failed) = f.read_blocks(op.ops_cnt, deadline, op.random_access, op.iodepth,
+                                                     op.block_size, op.get_access_distribution(), fd, schedule,
+                                                     on_units, self.stop_requested)
             elif op.mode == ProfileOperationType.WRITE:
-                (units, is_failed) = f.write_blocks(op.ops_cnt, deadline, op.random_access)
+                (units, is_failed) = f.write_blocks(op.ops_cnt, deadline, op.random_access, op.iodepth,
+                                                      op.block_size, op.get_access_distribution(), fd, schedule,
+                                                      on_units, self.stop_requested)
             else:
                 raise ValueError("Unknown profile operation mode")
-            done_seconds = time.time() - start_time
-            self._log_step(start_date_time, f, op_id, op, len(units), done_seconds, is_failed, units)
+            if units or is_failed or not segment_start:
+                log_segment(units, time.time() - start_time, is_failed)
         except FileHandlerException as e:
-            done_seconds = time.time() - start_time
-            self._log_step(start_date_time, f, op_id, op, 0, done_seconds, True, [])
+            log_segment([], time.time() - start_time, True)
+        finally:
+            if acquired:
+                self.fd_cache.release(f)
         if op.idle_time:
             idle_time = self.random.choice(op.idle_time)
             print(f"{self.thread_name} idle for {idle_time} msec")
             time.sleep(idle_time / 1000)
 
-    def _log_step(self, start_time, f, op_id, op, done_ops, done_seconds, is_failed, units):
+    def _window(self, t: float) -> Tuple[PhaseWindow, Optional[float]]:
+        """Returns the window of time t and the time the window ends"""
+        if t < self.measure_start:
+            return PhaseWindow.WARMUP, self.measure_start
+        if self.measure_end is None or t < self.measure_end:
+            return PhaseWindow.MEASURE, self.measure_end
+        return PhaseWindow.COOLDOWN, None
+
+    def _log_step(self, start_time, f, op_id, op, done_ops, done_bytes, done_seconds, open_seconds, is_failed,
+                  units, window=PhaseWindow.MEASURE):
         self.metric_reporter.report_operation(StepResult(filename=f.file_name(),
                                                          operation_id=op_id,
                                                          operation_type=op.mode,
                                                          operation_random_access=op.random_access,
-                                                         ops_cnt=done_ops, duration_sec=done_seconds,
+                                                         ops_cnt=done_ops, bytes=done_bytes,
+                                                         duration_sec=done_seconds,
+                                                         open_duration_sec=open_seconds
+                                                         if self.phase.measure_open_time else 0.0,
                                                          is_failed=is_failed,
                                                          time=start_time,
+                                                         window=window,
                                                          units=units
                                                          ))
 
     def _create_file(self):
-        return self.file_creator(self.random.choice(self.phase.files_sizes))
+        return self.file_creator(self.random.choice(self.phase.files_sizes), data_pattern=self.phase.data_pattern)
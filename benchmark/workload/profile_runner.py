@@ -1,21 +1,24 @@
-from multiprocessing import RLock
+from multiprocessing.sharedctypes import Synchronized
+from typing import Optional
 
+from benchmark.metrics.live import LiveRing
 from benchmark.metrics.metric_reporter import MetricReporter
 from benchmark.model.execution import ExecutionRequest
+from benchmark.model.profile import ProfilePhase
+from benchmark.workload.dataset import DatasetCache
 from benchmark.workload.phase_runner import PhaseRunner
+from benchmark.workload.saturation import SaturationSearch, probe_phase, probe_result
+from benchmark.workload.worker_pool import WorkerPool
 
 
 class PhaseCallback:
-    def __init__(self, lock: RLock, states, execution_id: str):
-        self.lock = lock
-        self.states = states
-        self.execution_id = execution_id
+    """Publishes the running phase to the web process through a shared value"""
 
-    def set(self, phase: int):
-        with self.lock:
-            self.states[self.execution_id] = {'status': 'running', 'phase': phase}
+    def __init__(self, phase: Synchronized):
+        self.phase = phase
 
-        # self.phase = phase
+    def set(self, phase: int):
+        self.phase.value = phase
 
 
 class ProfileRunner:
@@ -23,18 +26,50 @@ class ProfileRunner:
     _metric_reporter: MetricReporter
 
     def __init__(self, request: ExecutionRequest, metric_reporter: MetricReporter,
-                 phase_callback: PhaseCallback):
+                 phase_callback: PhaseCallback, live: Optional[LiveRing] = None):
         self._request = request
         self._metric_reporter = metric_reporter
         self._phase_callback = phase_callback
+        self._live = live
 
     def run(self, execution_id: str):
         self._metric_reporter.start_execution()
+        dataset_cache = DatasetCache(self._request.storage_configuration)
+        processes = max((phase.get_processes() for phase in self._request.profile.phases), default=1)
+        if self._live is None and any(phase.steady_state for phase in self._request.profile.phases):
+            # steady state is detected from the per second counters workers publish to the ring
+            self._live = LiveRing()
 
-        for i, phase in enumerate(self._request.profile.phases):
-            self._phase_callback.set(i + 1)
-            # time.sleep(1)
-            runner = PhaseRunner(i + 1, phase, self._metric_reporter, self._request.storage_configuration)
-            runner.run()
+        with WorkerPool(processes, self._request.storage_configuration.device,
+                        self._metric_reporter.result_store_path(), self._live) as worker_pool:
+            # a saturation phase runs several probes, each stored as a phase of its own
+            phase_id = 0
+            phases = self._request.profile.phases
+            for i, phase in enumerate(phases):
+                self._phase_callback.set(i + 1)
+                # processes no later phase needs are released instead of idling until the end of the run
+                worker_pool.resize(max(p.get_processes() for p in phases[i:]))
+                if phase.saturation is not None:
+                    phase_id = self._search_saturation(i + 1, phase, phase_id, dataset_cache, worker_pool)
+                    continue
+                phase_id += 1
+                runner = PhaseRunner(phase_id, phase, self._metric_reporter, self._request.storage_configuration,
+                                     dataset_cache, worker_pool)
+                runner.run()
 
         self._metric_reporter.summarize()
+
+    def _search_saturation(self, profile_phase_id: int, phase: ProfilePhase, phase_id: int,
+                           dataset_cache: DatasetCache, worker_pool: WorkerPool) -> int:
+        """Runs probes of a saturation phase, returns the id of the last one"""
+        search = SaturationSearch(phase.saturation)
+        while (value := search.next_value()) is not None:
+            phase_id += 1
+            print(f"phase {profile_phase_id} saturation probe {phase.saturation.parameter}={value}")
+            runner = PhaseRunner(phase_id, probe_phase(phase, value), self._metric_reporter,
+                                 self._request.storage_configuration, dataset_cache, worker_pool)
+            search.add(probe_result(phase_id, value, runner.run()))
+        result = search.result(profile_phase_id)
+        print(f"phase {profile_phase_id} saturation knee {result.parameter}={result.knee} ({result.stop_reason})")
+        self._metric_reporter.report_saturation(result)
+        return phase_id
@@ -0,0 +1,114 @@
+import math
+from typing import Dict, Optional
+
+from benchmark.model.profile import ProfilePhase, ProfileSaturationSearch, SaturationParameter, ThroughputMetric
+from benchmark.model.results import PhaseMetrics, SaturationProbe, SaturationResult
+
+GROW = "grow"
+PLATEAU = "plateau"
+LATENCY_LIMIT = "latency_limit"
+MAX_VALUE = "max_value"
+MAX_PROBES = "max_probes"
+
+
+def probe_phase(phase: ProfilePhase, value: int) -> ProfilePhase:
+    """Copy of a saturation phase with the searched parameter set to value"""
+    if phase.saturation.parameter == SaturationParameter.IODEPTH:
+        operations = [op.model_copy(update={"iodepth": value}) for op in phase.operations]
+        return phase.model_copy(update={"saturation": None, "operations": operations})
+    if phase.processes is None:
+        return phase.model_copy(update={"saturation": None, "threads": value})
+    return phase.model_copy(update={"saturation": None, "processes": value})
+
+
+def probe_result(phase_id: int, value: int, metrics: PhaseMetrics) -> SaturationProbe:
+    seconds = metrics.measured_sec
+    return SaturationProbe(phase_id=phase_id, value=value,
+                           iops=metrics.ops / seconds if seconds else 0.0,
+                           mbps=metrics.bytes / 1024 ** 2 / seconds if seconds else 0.0,
+                           p99=max((latency.p99 for latency in metrics.latency.values()), default=0.0),
+                           errors=metrics.errors)
+
+
+class SaturationSearch:
+    """Chooses the value of the next probe from the results of the previous ones.
+
+    Values grow geometrically until a probe exceeds the latency limit or gains less than
+    plateau_pct over the previous one. The interval where that happened is then bisected:
+    after a breach towards the largest value within the limit, after a plateau towards the
+    smallest value reaching the plateau throughput.
+    """
+
+    def __init__(self, search: ProfileSaturationSearch):
+        self._search = search
+        self._probes: Dict[int, SaturationProbe] = {}
+        self._mode = GROW
+        self._last: Optional[int] = None
+        self._low = self._high = 0
+        self._stop_reason: Optional[str] = None
+
+    def _throughput(self, probe: SaturationProbe) -> float:
+        return probe.iops if self._search.metric == ThroughputMetric.IOPS else probe.mbps
+
+    def _within_limit(self, probe: SaturationProbe) -> bool:
+        return self._search.p99_limit_ms is None or probe.p99 * 1000 <= self._search.p99_limit_ms
+
+    def _plateau(self) -> float:
+        """Throughput within the tolerance of the best probe that meets the latency limit"""
+        best = max((self._throughput(p) for p in self._probes.values() if self._within_limit(p)), default=0.0)
+        return best * (1 - self._search.plateau_pct / 100)
+
+    def next_value(self) -> Optional[int]:
+        if self._stop_reason is not None:
+            return None
+        if len(self._probes) >= self._search.max_probes:
+            self._stop_reason = MAX_PROBES
+            return None
+        if self._mode == GROW:
+            if self._last is None:
+                return min(self._search.start, self._search.max_value)
+            if self._last >= self._search.max_value:
+                self._stop_reason = MAX_VALUE
+                return None
+            return min(max(self._last + 1, math.ceil(self._last * self._search.growth)), self._search.max_value)
+        if self._high - self._low <= 1:
+            self._stop_reason = self._mode
+            return None
+        return (self._low + self._high) // 2
+
+    def add(self, probe: SaturationProbe):
+        self._probes[probe.value] = probe
+        if self._mode == GROW:
+            previous = self._probes.get(self._last)
+            if not self._within_limit(probe):
+                self._mode = LATENCY_LIMIT
+                self._low, self._high = self._last or 0, probe.value
+            elif previous is not None and \
+                    self._throughput(probe) < self._throughput(previous) * (1 + self._search.plateau_pct / 100):
+                # the previous probe already reached the plateau, the knee lies after the one before it
+                self._mode = PLATEAU
+                grown = sorted(v for v in self._probes if v < self._last)
+                self._low, self._high = (grown[-1] if grown else self._last), self._last
+            self._last = probe.value
+        elif self._mode == LATENCY_LIMIT:
+            if self._within_limit(probe):
+                self._low = probe.value
+            else:
+                self._high = probe.value
+        elif self._within_limit(probe) and self._throughput(probe) >= self._plateau():
+            self._high = probe.value
+        else:
+            self._low = probe.value
+
+    def result(self, phase_id: int) -> SaturationResult:
+        """The knee is the smallest value within the latency limit reaching the plateau throughput"""
+        probes = sorted(self._probes.values(), key=lambda p: p.value)
+        plateau = self._plateau()
+        knee = next((p for p in probes if self._within_limit(p) and self._throughput(p) >= plateau), None)
+        return SaturationResult(phase_id=phase_id,
+                                parameter=str(self._search.parameter),
+                                metric=str(self._search.metric),
+                                probes=probes,
+                                knee=knee.value if knee else None,
+                                knee_phase_id=knee.phase_id if knee else None,
+                                stop_reason=self._stop_reason or self._mode)
@@ -0,0 +1,85 @@
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from benchmark.config import LIVE_DELAY_SEC
+from benchmark.metrics.live import LiveRing, OPS, BYTES
+from benchmark.model.profile import ProfileSteadyState, ThroughputMetric
+from benchmark.model.results import SteadyStateResult
+
+CHECK_INTERVAL = 1.0
+
+
+def evaluate_window(values: np.ndarray, criterion: ProfileSteadyState) -> SteadyStateResult:
+    """Checks per second throughput of a window against the excursion and slope limits"""
+    average = float(values.mean())
+    if average <= 0:
+        return SteadyStateResult(reached=False)
+    excursion = float(values.max() - values.min()) / average * 100
+    # change of the least squares line from the first to the last second of the window
+    slope = abs(float(np.polyfit(np.arange(len(values)), values, 1)[0])) * (len(values) - 1) / average * 100
+    return SteadyStateResult(reached=excursion <= criterion.excursion_pct and slope <= criterion.slope_pct,
+                             average=average, excursion_pct=excursion, slope_pct=slope)
+
+
+class SteadyStateMonitor:
+    """Watches per second counters of the live ring while a phase runs and stops it at steady state.
+
+    Seconds are taken with the live delay, so workers have published them. A second without
+    counters counts as zero throughput.
+    """
+
+    def __init__(self, criterion: ProfileSteadyState, ring: LiveRing, warmup_sec: float,
+                 started: Callable[[], bool], stop: Callable[[], None]):
+        self._criterion = criterion
+        self._ring = ring
+        self._warmup_sec = warmup_sec
+        self._started = started
+        self._stop = stop
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._measure_start: Optional[float] = None
+        self._last: Optional[SteadyStateResult] = None
+        self.result: Optional[SteadyStateResult] = None
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._done.set()
+        self._thread.join()
+        if self.result is None:
+            # the phase ended first, the last evaluated window shows how far it was
+            self.result = self._last or SteadyStateResult(reached=False)
+
+    def _throughput(self, first: int, last: int) -> np.ndarray:
+        column = OPS if self._criterion.metric == ThroughputMetric.IOPS else BYTES
+        values = np.zeros(last - first + 1)
+        for second, counters in self._ring.read(first, last):
+            values[second - first] = counters[:, column].sum()
+        if self._criterion.metric == ThroughputMetric.MBPS:
+            values /= 1024 ** 2
+        return values
+
+    def _run(self):
+        while not self._done.is_set() and not self._started():
+            self._done.wait(0.05)
+        self._measure_start = time.time() + self._warmup_sec
+        first = math.ceil(self._measure_start)
+        while not self._done.wait(CHECK_INTERVAL):
+            last = int(time.time()) - LIVE_DELAY_SEC
+            measured = last - first + 1
+            if measured < max(self._criterion.window_sec, self._criterion.min_duration_sec):
+                continue
+            self._last = evaluate_window(self._throughput(last - self._criterion.window_sec + 1, last),
+                                         self._criterion)
+            if self._last.reached:
+                self.result = self._last.model_copy(update={"reached_sec": float(last + 1 - self._measure_start)})
+                print(f"steady state reached after {self.result.reached_sec:.0f} sec: "
+                      f"excursion {self._last.excursion_pct:.1f}%, slope {self._last.slope_pct:.1f}%")
+                self._stop()
+                return
@@ -0,0 +1,245 @@
+import datetime
+import multiprocessing
+import queue
+import time
+from multiprocessing import Pool, Process
+from multiprocessing.sharedctypes import SynchronizedArray
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from benchmark.config import DISKSTATUS_INTERVAL
+from benchmark.metrics.disk_status import get_diskstats
+from benchmark.metrics.live import LiveRing, LivePublisher
+from benchmark.metrics.result_store import ResultBatch, ResultStoreWriter
+from benchmark.model.results import DiskStatusUnit
+
+# slots of the shared control block
+PHASE = 0
+READY = 1
+STOP = 2
+ALIVE = 3
+DONE = 4
+
+START_POLL_INTERVAL = 0.0005
+COLLECTOR_POLL_INTERVAL = 0.005
+# batches in flight to the result writer; workers block when it falls behind
+RESULT_QUEUE_SIZE = 64
+RESULT_WRITER_TIMEOUT = 60
+
+_control: Optional[SynchronizedArray] = None
+_start: Optional[multiprocessing.Event] = None
+_results: Optional[multiprocessing.Queue] = None
+_live: Optional[LiveRing] = None
+
+
+def _init_worker(control: SynchronizedArray, start: multiprocessing.Event,
+                 results: Optional[multiprocessing.Queue], live: Optional[LiveRing]):
+    global _control, _start, _results, _live
+    _control = control
+    _start = start
+    _results = results
+    _live = live
+
+
+def wait_for_start():
+    """Called by a worker once it is initialized; blocks until all workers of the phase are ready."""
+    with _control.get_lock():
+        _control[READY] += 1
+    _start.wait()
+
+
+def stop_requested() -> bool:
+    return _control is not None and _control[STOP] == 1
+
+
+def result_sink(phase_id: int) -> Optional[Callable[[ResultBatch], None]]:
+    """Returns a callable sending result batches of the phase to the writer process, if there is one"""
+    if _results is None:
+        return None
+    return lambda batch: _results.put((phase_id, batch))
+
+
+def live_publisher() -> Optional[LivePublisher]:
+    """Returns a publisher of per second counters to the live ring of the execution, if there is one"""
+    return LivePublisher(_live) if _live is not None else None
+
+
+class WorkerPool:
+    """Worker processes and disk status collector living for a whole profile run.
+
+    Phases dispatch their thread workers to it instead of spawning a Manager, Pool and
+    collector each time. Phase start and stop go through a shared memory control block.
+    With a result store, workers stream step results through a bounded queue to a writer
+    process that appends them to the store while the phase runs. With a live ring, workers
+    publish per second counters to it.
+    """
+
+    def __init__(self, processes: int = 1, device: Optional[str] = None, result_store: Optional[Path] = None,
+                 live: Optional[LiveRing] = None):
+        self._control = multiprocessing.Array('i', 5)
+        self._start = multiprocessing.Event()
+        self._processes = 0
+        self._pool = None
+        self._diskstatus = multiprocessing.Queue()
+        self._control[ALIVE] = 1
+        self._collector = Process(target=_diskstatus_collector_worker,
+                                  args=(device, self._control, self._diskstatus), daemon=True)
+        self._collector.start()
+        self._live = live
+        self._results = None
+        self._writer = None
+        if result_store is not None:
+            self._results = multiprocessing.Queue(RESULT_QUEUE_SIZE)
+            self._written = multiprocessing.Queue()
+            self._writer = Process(target=_result_writer_worker, args=(result_store, self._results, self._written),
+                                   daemon=True)
+            self._writer.start()
+        self.resize(processes)
+
+    @property
+    def processes(self) -> int:
+        return self._processes
+
+    @property
+    def live(self) -> Optional[LiveRing]:
+        return self._live
+
+    def running_phase(self) -> int:
+        """Id of the phase the workers have started, 0 between phases"""
+        return self._control[PHASE]
+
+    def resize(self, processes: int):
+        """Sets the number of worker processes, the pool is only recreated when the number changes"""
+        if processes == self._processes:
+            return
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+        self._pool = Pool(processes, initializer=_init_worker, initargs=(self._control, self._start, self._results, self._live))
+        self._processes = processes
+
+    def run_phase(self, phase_id: int, func: Callable, args: Iterable[Tuple]) -> Tuple[list, List[DiskStatusUnit]]:
+        args = list(args)
+        # every task of a phase gets its own process, a larger pool is kept
+        if len(args) > self._processes:
+            self.resize(len(args))
+        self._start.clear()
+        with self._control.get_lock():
+            self._control[READY] = 0
+            self._control[STOP] = 0
+        tasks = [self._pool.apply_async(func, a) for a in args]
+
+        # a task that finished before getting ready has failed, release the others instead of waiting forever
+        while self._control[READY] < len(args) and not any(t.ready() for t in tasks):
+            time.sleep(START_POLL_INTERVAL)
+        self._control[PHASE] = phase_id
+        self._start.set()
+        try:
+            results = [t.get() for t in tasks]
+        finally:
+            self._control[PHASE] = 0
+            self._control[DONE] = phase_id
+        return results, self._collect_diskstatus(phase_id)
+
+    def wait_results_written(self, phase_id: int, batches: int):
+        """Waits until the writer has stored all batches streamed during the phase"""
+        if self._writer is None:
+            return
+        self._results.put((phase_id, batches))
+        while True:
+            try:
+                if self._written.get(timeout=RESULT_WRITER_TIMEOUT) == phase_id:
+                    return
+            except queue.Empty:
+                print(f"results of phase {phase_id} are not written in {RESULT_WRITER_TIMEOUT} sec")
+                return
+
+    def stop_phase(self):
+        """Asks the workers of the running phase to finish after their current step"""
+        self._control[STOP] = 1
+
+    def _collect_diskstatus(self, phase_id: int) -> List[DiskStatusUnit]:
+        while True:
+            try:
+                collected_phase, units = self._diskstatus.get(timeout=DISKSTATUS_INTERVAL * 5)
+            except queue.Empty:
+                return []
+            if collected_phase == phase_id:
+                return units
+
+    def close(self):
+        self._control[ALIVE] = 0
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+        self._collector.join(DISKSTATUS_INTERVAL * 2)
+        if self._collector.is_alive():
+            self._collector.terminate()
+        if self._writer is not None:
+            # batches already queued are still written, so an interrupted run keeps them
+            self._results.put(None)
+            self._writer.join(RESULT_WRITER_TIMEOUT)
+            if self._writer.is_alive():
+                self._writer.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _diskstatus_collector_worker(device: Optional[str], control: SynchronizedArray, results: multiprocessing.Queue):
+    if device is None:
+        print("No storage device configured, disk status is not collected")
+
+    phase_id = 0
+    done = 0
+    units = []
+    prev_status = None
+    next_sample = 0.0
+    while control[ALIVE] == 1:
+        if control[DONE] != done:
+            done = control[DONE]
+            results.put((done, units if phase_id == done else []))
+            phase_id, units, prev_status = 0, [], None
+        current_phase = control[PHASE]
+        if current_phase and current_phase != phase_id:
+            phase_id = current_phase
+            units = []
+            prev_status = get_diskstats(device) if device else None
+            next_sample = time.monotonic() + DISKSTATUS_INTERVAL
+
+        if prev_status is not None and time.monotonic() >= next_sample:
+            next_sample += DISKSTATUS_INTERVAL
+            status = get_diskstats(device)
+            if status is not None:
+                diff = prev_status.compare(status, DISKSTATUS_INTERVAL)
+                prev_status = status
+                units.append(DiskStatusUnit(
+                    time=datetime.datetime.now(),
+                    read_utilization=diff['read_utilization'],
+                    write_utilization=diff['write_utilization'],
+                    total_utilization=diff['total_utilization'],
+                    queue_length=diff['queue_length']
+                ))
+        time.sleep(COLLECTOR_POLL_INTERVAL)
+
+
+def _result_writer_worker(path: Path, results: multiprocessing.Queue, written: multiprocessing.Queue):
+    writer = ResultStoreWriter(path, create=False)
+    batches: Dict[int, int] = {}
+    expected: Dict[int, int] = {}
+    while True:
+        item = results.get()
+        if item is None:
+            break
+        phase_id, batch = item
+        if isinstance(batch, ResultBatch):
+            writer.append_batch(phase_id, batch)
+            batches[phase_id] = batches.get(phase_id, 0) + 1
+        else:
+            expected[phase_id] = batch
+        if phase_id in expected and batches.get(phase_id, 0) >= expected[phase_id]:
+            del expected[phase_id]
+            written.put(phase_id)
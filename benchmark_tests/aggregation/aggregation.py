@@ -0,0 +1,61 @@
+import pandas as pd
+
+from benchmark.aggregation.aggregation import filter_windows, latency_quantile, zoom, add_axis, add_axis_labels, axis_keys, build_xy_data, \
+    group_metric
+
+
+def test_transient_windows_are_excluded_by_default():
+    df = pd.DataFrame({"ops": [1, 2, 3], "window": ["warmup", "measure", "cooldown"]})
+
+    assert filter_windows(df.copy(), False)["ops"].tolist() == [2]
+    assert filter_windows(df.copy(), True)["ops"].tolist() == [1, 2, 3]
+
+
+def test_results_without_windows_are_measured():
+    df = pd.DataFrame({"ops": [1, 2]})
+
+    assert filter_windows(df, False)["ops"].tolist() == [1, 2]
+
+
+def per_steps(df, group_by, aggregation, metric):
+    df = add_axis(df, group_by, aggregation)
+    group = group_metric(df.groupby(["operation_type", *axis_keys(group_by)], observed=True)[["duration", "ops"]],
+                         metric)
+    return build_xy_data(add_axis_labels(group, group_by), "value", "operation_type")
+
+
+def test_steps_and_seconds_are_grouped_by_integer_keys():
+    df = pd.DataFrame({"phase_id": [1, 1, 1, 2],
+                       "step_id": [0, 1, 2, 0],
+                       "time": pd.to_datetime(["2025-01-01 12:00:00.5", "2025-01-01 12:00:01.5",
+                                               "2025-01-01 12:00:02.5", "2025-01-01 12:00:03.5"]),
+                       "operation_type": pd.Categorical(["read", "read", "read", "write"]),
+                       "ops": [10, 20, 30, 40],
+                       "duration": [1.0, 1.0, 2.0, 4.0]})
+
+    by_step = per_steps(df.copy(), "step", 2, "iops")
+    assert by_step["read"] == {"x": [(1, 0), (1, 2)], "y": [15.0, 15.0]}
+    assert by_step["write"] == {"x": [(2, 0)], "y": [10.0]}
+
+    by_time = per_steps(df.copy(), "time", 2, "iops")
+    assert by_time["read"]["x"] == ["2025-01-01 12:00:00", "2025-01-01 12:00:02"]
+
+
+def test_latency_quantile_metric_names():
+    assert latency_quantile("latency_p50") == 0.5
+    assert latency_quantile("latency_p9999") == 0.9999
+    assert latency_quantile("latency_p100") == 1.0
+    assert latency_quantile("latency_p10") == 0.1
+    assert latency_quantile("latency_max") is None
+    assert latency_quantile("latency") is None
+
+
+def test_zoom_window_bounds_are_inclusive():
+    df = add_axis(pd.DataFrame({"phase_id": [1, 1, 1, 2, 2], "step_id": [0, 5, 10, 0, 5]}), "step", 5)
+
+    assert zoom(df, "step", 5, "1,5", "2,0")["step_id"].tolist() == [5, 10, 0]
+    assert zoom(df, "step", 5, None, "1,7")["step_id"].tolist() == [0, 5]
+
+    df = add_axis(pd.DataFrame({"time": pd.to_datetime(["2025-01-01 12:00:00", "2025-01-01 12:00:04",
+                                                         "2025-01-01 12:00:09"])}), "time", 2)
+    assert len(zoom(df, "time", 2, "2025-01-01 12:00:03.5", "2025-01-01 12:00:07.9")) == 1
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from benchmark.aggregation.cache import FrameCache
+
+
+def frame(n):
+    return pd.DataFrame({"x": range(n)})
+
+
+def test_cache_reloads_only_when_signature_changes():
+    cache = FrameCache()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return frame(10)
+
+    df = cache.get("a", (1.0, 100), load)
+    df["y"] = 1
+    assert "y" not in cache.get("a", (1.0, 100), load)
+    assert len(loads) == 1
+
+    cache.get("a", (2.0, 200), load)
+    assert len(loads) == 2
+    cache.get("a", None, load)
+    assert len(loads) == 3
+
+
+def test_cache_evicts_least_recently_used_over_budget():
+    size = int(frame(1000).memory_usage(deep=True).sum())
+    cache = FrameCache(budget_bytes=size * 2)
+    cache.get("a", (1.0, 1), lambda: frame(1000))
+    cache.get("b", (1.0, 1), lambda: frame(1000))
+    cache.get("a", (1.0, 1), lambda: frame(1000))
+    cache.get("c", (1.0, 1), lambda: frame(1000))
+
+    assert len(cache) == 2
+    reloaded = []
+    cache.get("b", (1.0, 1), lambda: reloaded.append(1) or frame(1000))
+    assert reloaded == [1]
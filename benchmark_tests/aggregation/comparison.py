@@ -0,0 +1,41 @@
+import shutil
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+import benchmark.aggregation.aggregation as aggregation
+from benchmark.aggregation.comparison import compare_runs
+from benchmark.metrics.result_store import ResultStoreWriter, ResultStore, encode_batch, store_path
+from benchmark.metrics.rollup import write_rollups
+from benchmark.model.profile import ProfileOperationType
+from benchmark.repository.catalog import RunCatalog
+from benchmark_tests.metrics.result_store import step
+from benchmark_tests.repository.catalog import summary
+
+
+def write_run(metrics_path: Path, execution_id: str, units):
+    path = store_path(metrics_path, execution_id)
+    writer = ResultStoreWriter(path)
+    writer.append_batch(1, encode_batch([step("a", ProfileOperationType.READ, units)], 0))
+    write_rollups(ResultStore(path), writer, 1)
+
+
+def test_runs_are_aligned_by_phase_and_operation(monkeypatch):
+    with TemporaryDirectory() as temp_dir:
+        metrics_path = Path(temp_dir)
+        monkeypatch.setattr(aggregation, "METRICS_PATH", metrics_path)
+        catalog = RunCatalog(metrics_path / "catalog.sqlite")
+        write_run(metrics_path, "base", [(0.1, 0.001, 4096)])
+        write_run(metrics_path, "new", [(0.1, 0.001, 4096), (0.2, 0.001, 4096)])
+        catalog.record(summary("base", "alpha", 1, 1), "done")
+
+        result = compare_runs(["base", "new"], catalog)
+        assert result["keys"] == ["Фаза 1, Операция 2 (read)"]
+        iops = result["metrics"]["iops"]
+        assert iops["new"][0] == pytest.approx(2 * iops["base"][0])
+
+        # aggregates of a finished run are kept, the store is not read again
+        shutil.rmtree(store_path(metrics_path, "base"))
+        assert compare_runs(["base"], catalog)["metrics"]["iops"]["base"] == iops["base"]
+        assert catalog.aggregates("new") == []
@@ -0,0 +1,21 @@
+import numpy as np
+
+from benchmark.aggregation.downsampling import lttb_indices
+
+
+def test_lttb_keeps_ends_and_spikes():
+    x = np.arange(10_000)
+    y = np.zeros(10_000)
+    y[4321] = 100
+    y[7000] = -50
+
+    indices = lttb_indices(x, y, 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 9999
+    assert np.all(np.diff(indices) > 0)
+    assert 4321 in indices and 7000 in indices
+
+
+def test_short_series_are_kept():
+    assert lttb_indices(np.arange(5), np.ones(5), 10).tolist() == [0, 1, 2, 3, 4]
+    assert lttb_indices(np.arange(5), np.ones(5), 2).tolist() == [0, 4]
@@ -0,0 +1,38 @@
+import numpy as np
+
+from benchmark.metrics.histogram import LatencyHistogram, SecondCounters, merge_histograms
+
+
+def test_quantiles_match_exact_percentiles():
+    latencies = np.random.default_rng(1).lognormal(mean=-8, sigma=1.5, size=200_000)
+    h = LatencyHistogram()
+    h.record(latencies)
+    for q in (0.5, 0.99, 0.999):
+        exact = np.quantile(latencies, q)
+        assert abs(h.quantile(q) - exact) / exact < 0.01
+    assert h.count == len(latencies)
+    assert abs(h.stats().mean - latencies.mean()) / latencies.mean() < 1e-6
+
+
+def test_merged_worker_histograms_equal_single_histogram():
+    latencies = np.random.default_rng(2).exponential(1e-3, size=10_000)
+    whole = LatencyHistogram()
+    whole.record(latencies)
+    parts = []
+    for chunk in np.array_split(latencies, 4):
+        h = LatencyHistogram()
+        h.record(chunk)
+        parts.append({0: h.to_data()})
+    merged = merge_histograms(parts)[0]
+    assert np.array_equal(merged.counts, whole.counts)
+    assert merged.stats() == whole.stats()
+
+
+def test_second_counters():
+    c = SecondCounters()
+    c.record(np.array([0.1, 0.9, 2.5]), np.array([4096, 4096, 8192]))
+    c.record_error(3.2)
+    data = c.to_data()
+    assert data.ops == [2, 0, 1, 0]
+    assert data.bytes == [8192, 0, 8192, 0]
+    assert data.errors == [0, 0, 0, 1]
@@ -0,0 +1,34 @@
+from benchmark.metrics.live import LiveRing, LivePublisher
+from benchmark.model.profile import ProfileOperationType
+from benchmark_tests.metrics.result_store import step, START
+
+
+def test_completed_seconds_are_published_to_ring():
+    ring = LiveRing(seconds=8)
+    publisher = LivePublisher(ring)
+    second = int(START.timestamp())
+
+    publisher.record(step("a", ProfileOperationType.WRITE, [(0.1, 0.001, 4096), (0.2, 0.001, 4096)]))
+    publisher.record(step("a", ProfileOperationType.READ, [(0.1, 0.002, 4096)], offset=1.0))
+    assert [s for s, _ in ring.read(0, second + 10)] == [second]
+
+    publisher.flush()
+    seconds = ring.read(0, second + 10)
+    assert [s for s, _ in seconds] == [second, second + 1]
+
+    summary = ring.second_summary(*seconds[0])
+    assert summary["write"]["iops"] == 2
+    assert summary["read"]["iops"] == 0
+    assert summary["total"]["mbps"] == 8192 / 1024 ** 2
+    assert 900 < summary["total"]["p99"] < 1100
+
+
+def test_ring_slot_is_reused_by_later_second():
+    ring = LiveRing(seconds=4)
+    counters = ring.new_counters()
+    counters[0, 0] = 1
+    ring.publish(10, counters)
+    ring.publish(14, counters)
+    ring.publish(10, counters)
+
+    assert [s for s, _ in ring.read(0, 100)] == [14]
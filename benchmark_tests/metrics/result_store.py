@@ -0,0 +1,50 @@
+import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+
+from benchmark.metrics.result_store import ResultStoreWriter, ResultStore, step_columns, unit_columns, OPS, UNITS
+from benchmark.model.profile import ProfileOperationType
+from benchmark.model.results import StepResult, PhaseWindow
+
+START = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+def step(filename, op_type, units, window=PhaseWindow.MEASURE, offset=0.0):
+    return StepResult(filename=filename, operation_id=int(op_type == ProfileOperationType.READ),
+                      operation_type=op_type, operation_random_access=True, ops_cnt=len(units),
+                      bytes=sum(u[2] for u in units), duration_sec=0.5, is_failed=False,
+                      time=START + datetime.timedelta(seconds=offset), window=window, units=units)
+
+
+def test_store_round_trip_and_csv_export():
+    steps = [step("a", ProfileOperationType.WRITE, [(0.001, 0.001, 4096), (0.002, 0.0005, 8192)], PhaseWindow.WARMUP),
+             step("b", ProfileOperationType.READ, [(0.5, 0.25, 4096)], offset=1.0),
+             step("a", ProfileOperationType.READ, [], offset=2.0)]
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "run_store"
+        writer = ResultStoreWriter(path)
+        for thread_id in range(2):
+            ids = writer.filename_ids(1, (s.filename for s in steps))
+            writer.append(OPS, 1, step_columns(steps, thread_id, ids))
+            writer.append(UNITS, 1, unit_columns(steps, thread_id, ids))
+
+        store = ResultStore(path)
+        ops = store.read_frame(OPS)
+        units = store.read_frame(UNITS)
+        assert store.phases() == [1]
+        assert len(ops) == 6
+        assert ops["filename"].tolist()[:3] == ["a", "b", "a"]
+        assert ops["operation_type"].tolist()[:3] == ["write", "read", "read"]
+        assert ops["window"].tolist()[:2] == ["warmup", "measure"]
+        assert units["unit_id"].tolist() == [0, 1, 0] * 2
+        assert units["thread_id"].tolist() == [0, 0, 0, 1, 1, 1]
+        assert units["time"][2] == pd.Timestamp(START) + pd.Timedelta(seconds=1.5)
+        assert abs(units["duration"][2] - 0.25) < 1e-6
+
+        export = Path(temp_dir) / "units.csv"
+        store.export_csv(UNITS, export)
+        csv = pd.read_csv(export)
+        assert csv.columns.tolist()[:3] == ["time", "phase_id", "thread_id"]
+        assert csv["bytes"].tolist() == [4096, 8192, 4096] * 2
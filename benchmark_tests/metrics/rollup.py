@@ -0,0 +1,47 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmark.metrics.result_store import ResultStoreWriter, ResultStore, encode_batch, ROLLUP_SECONDS, \
+    ROLLUP_STEPS, ROLLUP_LATENCY
+from benchmark.metrics.rollup import write_rollups
+from benchmark.model.profile import ProfileOperationType
+from benchmark_tests.metrics.result_store import step
+
+
+def test_rollups_keep_sums_of_raw_results():
+    steps = [step("a", ProfileOperationType.WRITE, [(0.1, 0.001, 4096), (0.2, 0.003, 4096)]),
+             step("b", ProfileOperationType.READ, [(0.9, 0.002, 8192)], offset=0.5),
+             step("a", ProfileOperationType.READ, [(0.1, 0.004, 4096)], offset=1.0)]
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "run_store"
+        writer = ResultStoreWriter(path)
+        for thread_id in range(2):
+            writer.append_batch(1, encode_batch(steps, thread_id))
+        store = ResultStore(path)
+        # latency histograms and partial rollups are written along with the units
+        assert store.read_frame(ROLLUP_LATENCY)["count"].sum() == 8
+        assert len(store.read_frame(ROLLUP_STEPS)) == 6
+        write_rollups(store, writer, 1)
+        assert len(store.read_frame(ROLLUP_STEPS)) == 3
+
+        seconds = store.read_frame(ROLLUP_SECONDS)
+        assert seconds["steps"].sum() == 6
+        assert seconds["bytes"].sum() == 2 * 20480
+        assert seconds["units"].sum() == 8
+        # the unit of the second step belongs to the next second
+        read = seconds[(seconds["thread_id"] == 0) & (seconds["operation_type"] == "read")]
+        assert read[["steps", "units"]].values.tolist() == [[1, 0], [1, 2]]
+        assert abs(read["latency_max"].max() - 0.004) < 1e-9
+
+        per_step = store.read_frame(ROLLUP_STEPS)
+        assert per_step.groupby("step_id")["ops"].sum().tolist() == [4, 2, 2]
+
+
+def test_latency_histograms_are_kept_without_units():
+    steps = [step("a", ProfileOperationType.READ, [(0.1, 0.001, 4096), (0.2, 0.003, 4096)])]
+    batch = encode_batch(steps, 0, capture_units=False)
+
+    assert len(batch.units["duration"]) == 0
+    assert batch.latency["count"].sum() == 2
+    assert batch.rollups[ROLLUP_SECONDS]["units"].sum() == 2
+    assert abs(batch.rollups[ROLLUP_SECONDS]["latency_max"].max() - 0.003) < 1e-9
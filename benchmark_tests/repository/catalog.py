@@ -0,0 +1,65 @@
+import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from benchmark.model.execution import StorageConfiguration
+from benchmark.model.profile import BenchmarkProfile, ProfilePhase, ProfileOperation, ProfileOperationType
+from benchmark.model.results import BenchmarkResultSummary, PhaseMetrics, LatencyStats
+from benchmark.repository.catalog import RunCatalog
+
+profile = BenchmarkProfile(
+    phases=[
+        ProfilePhase(threads=1, ops_cnt=1024, duration_sec=10, prepared_files=0,
+                     operations=[ProfileOperation(mode=ProfileOperationType.WRITE, random_access=True, ops_cnt=1024)],
+                     files_sizes=[1024 ** 2]),
+    ])
+
+
+def summary(execution_id: str, profile_name: str, day: int, ops: int) -> BenchmarkResultSummary:
+    start = datetime.datetime(2025, 1, day, 12)
+    latency = LatencyStats(count=ops, mean=0.001, min=0.0001, max=0.01, p50=0.001, p90=0.002, p99=0.005,
+                           p999=0.008)
+    return BenchmarkResultSummary(execution_id=execution_id, start_time=start,
+                                  finish_time=start + datetime.timedelta(seconds=12),
+                                  profile_name=profile_name, profile=profile,
+                                  storage_configuration=StorageConfiguration(path="/mnt/test", device="/dev/sda"),
+                                  system_info={},
+                                  phases=[PhaseMetrics(phase_id=1, ops=ops, bytes=ops * 4096, errors=0,
+                                                       latency={0: latency})])
+
+
+@pytest.fixture
+def catalog():
+    with TemporaryDirectory() as tmpdir:
+        yield RunCatalog(Path(tmpdir) / "catalog.sqlite")
+
+
+def test_record(catalog):
+    catalog.record(summary("run_1", "alpha", 1, 1000), "done")
+
+    run = catalog.query().runs[0]
+    assert run.execution_id == "run_1"
+    assert run.iops == 100
+    assert run.mbps == pytest.approx(1000 * 4096 / 1024 ** 2 / 10)
+    assert run.p99_us == pytest.approx(5000)
+    assert run.duration_sec == 12
+
+
+def test_query(catalog):
+    for day in range(1, 6):
+        catalog.record(summary(f"run_{day}", "alpha" if day % 2 else "beta", day, day * 100), "done")
+    catalog.set_status("run_5", "interrupted")
+
+    page = catalog.query(page_size=2)
+    assert [r.execution_id for r in page.runs] == ["run_5", "run_4"]
+    assert page.total == 5 and page.pages == 3
+    assert [r.execution_id for r in catalog.query(page=3, page_size=2).runs] == ["run_1"]
+    assert [r.execution_id for r in catalog.query(profile_name="beta", sort="iops", descending=False).runs] == \
+           ["run_2", "run_4"]
+    assert [r.execution_id for r in catalog.query(status="interrupted").runs] == ["run_5"]
+    assert [r.execution_id for r in catalog.query(search="run_3").runs] == ["run_3"]
+    assert catalog.distinct("profile_name") == ["alpha", "beta"]
+    with pytest.raises(ValueError):
+        catalog.query(sort="1; DROP TABLE runs")
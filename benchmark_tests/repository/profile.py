@@ -3,7 +3,7 @@ from pathlib import Path
 from tempfile import TemporaryDirectory
 
 from benchmark.model.profile import BenchmarkProfile, ProfilePhase, ProfileOperation, ProfileOperationType, \
-    ProfileFileSelection
+    ProfileFileSelection, ProfileAccessDistributionType
 from benchmark.repository.profile import ProfileRepository, profile_to_yaml
 
 profile1 = BenchmarkProfile(
@@ -193,3 +193,58 @@ idle_time: 100.5
     assert repo.get("new").idle_time == [100.5]
     assert repo.get("new").phases[0].idle_time == [100.5]
     assert repo.get("new").phases[0].operations[0].idle_time == [100.5]
+
+
+def test_profile_op_block_size_mix(repo):
+    profile = """phases:
+- threads: 1
+  duration_sec: 5
+  operations:
+  - mode: read
+    ops_cnt: 1024
+    block_size:
+      4096: 70
+      65536: 20
+      1048576: 10
+  - mode: write
+    ops_cnt: 1024
+    block_size: 8192
+"""
+    write_profile_text(profile, repo._profiles_path / "new.yaml")
+    operations = repo.get("new").phases[0].operations
+    assert operations[0].block_size == {4096: 70.0, 65536: 20.0, 1048576: 10.0}
+    assert operations[1].block_size == {8192: 1.0}
+
+    write_profile(repo.get("new"), repo._profiles_path / "copy.yaml")
+    assert repo.get("copy") == repo.get("new")
+
+
+def test_profile_op_access_distribution(repo):
+    profile = """phases:
+- threads: 1
+  duration_sec: 5
+  operations:
+  - mode: read
+    access_distribution: zipf
+  - mode: read
+    access_distribution:
+      type: hotspot
+      hot_ops_pct: 90
+      hot_space_pct: 5
+  - mode: write
+    random_access: false
+"""
+    write_profile_text(profile, repo._profiles_path / "new.yaml")
+    operations = repo.get("new").phases[0].operations
+    assert operations[0].get_access_distribution().type == ProfileAccessDistributionType.ZIPF
+    assert operations[1].get_access_distribution().hot_space_pct == 5
+    assert operations[2].get_access_distribution().type == ProfileAccessDistributionType.SEQUENTIAL
+
+    write_profile(repo.get("new"), repo._profiles_path / "copy.yaml")
+    assert repo.get("copy") == repo.get("new")
+
+
+def test_profile_cooldown_requires_duration():
+    assert ProfilePhase(duration_sec=10, cooldown_sec=2).cooldown_sec == 2
+    with pytest.raises(ValueError):
+        ProfilePhase(ops_cnt=100, cooldown_sec=2)
@@ -0,0 +1,63 @@
+import os
+from tempfile import TemporaryDirectory
+
+from benchmark.model.execution import StorageConfiguration
+from benchmark.model.profile import ProfileDataPattern
+from benchmark.workload.dataset import prepare_dataset, DatasetCache
+from benchmark.workload.file_handler import FSFileHandler
+
+
+def test_prepare_dataset_fills_files():
+    with TemporaryDirectory() as temp_dir:
+        sizes = [1024 ** 2, 3 * 1024 ** 2 + 4096, 64 * 1024]
+        files, result = prepare_dataset(1, [FSFileHandler(basepath=temp_dir, size=size) for size in sizes], 2)
+
+        assert [f.file_size() for f in files] == sizes
+        assert all(f.created and f.initialized for f in files)
+        for f in files:
+            assert os.path.getsize(f.path) == f.file_size()
+            with open(f.path, "rb") as data:
+                assert data.read(4096) != b"\0" * 4096
+        assert result.files == 3
+        assert result.bytes == sum(sizes)
+        assert result.mbps > 0
+
+
+def test_prepare_empty_dataset():
+    files, result = prepare_dataset(2, [])
+
+    assert files == []
+    assert result.bytes == 0
+
+
+def test_dataset_cache_reuses_files_between_runs():
+    with TemporaryDirectory() as temp_dir:
+        storage = StorageConfiguration(path=temp_dir, device="")
+        cache = DatasetCache(storage)
+        files, result = cache.acquire(1, [64 * 1024, 128 * 1024], ProfileDataPattern.RANDOM)
+        cache.release(files)
+        assert result.reused_files == 0
+
+        cache = DatasetCache(storage)
+        reused, result = cache.acquire(2, [128 * 1024, 64 * 1024, 64 * 1024], ProfileDataPattern.RANDOM)
+        assert result.reused_files == 2
+        assert result.bytes == 64 * 1024
+        assert {f.file_name() for f in files} < {f.file_name() for f in reused}
+        assert all(f.initialized for f in reused)
+
+        zeros, result = cache.acquire(3, [64 * 1024], ProfileDataPattern.ZERO)
+        assert result.reused_files == 0
+
+
+def test_dataset_cache_evicts_least_recently_used():
+    with TemporaryDirectory() as temp_dir:
+        cache = DatasetCache(StorageConfiguration(path=temp_dir, device=""), budget_bytes=128 * 1024)
+        old, _ = cache.acquire(1, [64 * 1024], ProfileDataPattern.RANDOM)
+        cache.release(old)
+        new, _ = cache.acquire(2, [128 * 1024], ProfileDataPattern.RANDOM)
+
+        assert not os.path.exists(old[0].path)
+        assert os.path.exists(new[0].path)
+
+        cache.release(new, keep=False)
+        assert not os.path.exists(new[0].path)
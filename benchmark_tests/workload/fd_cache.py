@@ -0,0 +1,81 @@
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from benchmark.workload.fd_cache import FileDescriptorCache
+from benchmark.workload.file_handler import FSFileHandler
+
+
+class CountingHandler(FSFileHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened = 0
+        self.closed = 0
+
+    def open(self):
+        self.opened += 1
+        return super().open()
+
+    def close(self, fd):
+        self.closed += 1
+        super().close(fd)
+
+
+@pytest.fixture
+def handlers():
+    with TemporaryDirectory() as temp_dir:
+        handlers = [CountingHandler(basepath=temp_dir, size=64 * 1024) for _ in range(3)]
+        for h in handlers:
+            h.create()
+        yield handlers
+
+
+def test_cache_reuses_descriptors(handlers):
+    cache = FileDescriptorCache(2)
+    fd = cache.get(handlers[0])
+
+    assert cache.get(handlers[0]) == fd
+    assert handlers[0].opened == 1
+    cache.close()
+    assert handlers[0].closed == 1
+
+
+def test_cache_evicts_least_recently_used(handlers):
+    cache = FileDescriptorCache(2)
+    cache.get(handlers[0])
+    cache.get(handlers[1])
+    cache.get(handlers[0])
+    cache.get(handlers[2])
+
+    assert len(cache) == 2
+    assert handlers[1].closed == 1
+    assert handlers[0].closed == 0
+
+    cache.discard(handlers[0])
+    assert handlers[0].closed == 1
+    cache.close()
+    assert len(cache) == 0
+    assert handlers[2].closed == 1
+
+
+def test_handler_io_with_cached_descriptor(handlers):
+    cache = FileDescriptorCache(1)
+    units, is_failed = handlers[0].read_blocks(16, fd=cache.get(handlers[0]))
+    cache.close()
+
+    assert not is_failed
+    assert len(units) == 16
+
+
+def test_acquired_descriptors_are_not_evicted(handlers):
+    cache = FileDescriptorCache(1)
+    fd = cache.acquire(handlers[0])
+    cache.get(handlers[1])
+
+    assert handlers[0].closed == 0
+    assert handlers[1].closed == 0
+    assert cache.get(handlers[0]) == fd
+    cache.release(handlers[0])
+    assert handlers[1].closed == 1
+    assert len(cache) == 1
+    cache.close()
@@ -0,0 +1,148 @@
+import os
+import time
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from benchmark.workload import io_engine
+from benchmark.workload.io_engine import IOEngine, RateSchedule, get_engine, release_engine
+
+BLOCK = 4096
+BLOCKS = 64
+
+
+@pytest.fixture
+def fd():
+    with TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "data")
+        with open(path, "wb") as f:
+            f.write(b"\0" * BLOCK * BLOCKS)
+        fd = os.open(path, os.O_RDWR)
+        yield fd
+        os.close(fd)
+
+
+@pytest.mark.parametrize("iodepth", [1, 4, 16])
+def test_engine_executes_exact_ops_cnt(fd, iodepth):
+    engine = IOEngine(iodepth)
+    units, is_failed = engine.run(fd, False, lambda t: (t % BLOCKS * BLOCK, BLOCK), BLOCK, op_count=1000)
+    engine.shutdown()
+
+    assert not is_failed
+    assert len(units) == 1000
+    assert [u[0] for u in units] == sorted(u[0] for u in units)
+
+
+def test_engine_stops_at_deadline(fd):
+    engine = IOEngine(4)
+    units, is_failed = engine.run(fd, True, lambda t: (t % BLOCKS * BLOCK, BLOCK), BLOCK,
+                                  time_end=time.time() + 0.1)
+    engine.shutdown()
+
+    assert not is_failed
+    assert len(units) > 0
+    assert units[-1][0] < 0.5
+
+
+def test_engine_reports_failure(fd):
+    units, is_failed = IOEngine(2).run(-1, False, lambda t: (0, BLOCK), BLOCK, op_count=10)
+
+    assert is_failed
+    assert units == []
+
+
+def test_engine_reuses_aligned_buffers(fd):
+    engine = IOEngine(2)
+    engine.run(fd, False, lambda t: (0, BLOCK), BLOCK, op_count=4)
+    first = list(engine._buffers._buffers)
+    engine.run(fd, True, lambda t: (BLOCK, BLOCK), BLOCK, op_count=4)
+    second = list(engine._buffers._buffers)
+    engine.shutdown()
+
+    assert len(first) == 2
+    assert all(a is b for a, b in zip(first, second))
+
+
+def test_engine_records_bytes_per_request(fd):
+    sizes = [BLOCK, BLOCK * 4]
+    units, is_failed = IOEngine(2).run(fd, False, lambda t: (0, sizes[t % 2]), BLOCK * 4, op_count=10)
+
+    assert not is_failed
+    assert sorted(u[2] for u in units) == [BLOCK] * 5 + [BLOCK * 4] * 5
+
+
+def test_schedule_holds_target_rate(fd):
+    engine = IOEngine(4)
+    units, _ = engine.run(fd, False, lambda t: (t % BLOCKS * BLOCK, BLOCK), BLOCK,
+                          time_end=time.time() + 0.5, schedule=RateSchedule(iops=1000))
+    engine.shutdown()
+
+    assert 450 <= len(units) <= 510
+
+
+def test_schedule_measures_latency_from_intended_start(fd):
+    def slow_request(t):
+        if t == 10:
+            time.sleep(0.05)
+        return t % BLOCKS * BLOCK, BLOCK
+
+    engine = IOEngine(1)
+    units, _ = engine.run(fd, False, slow_request, BLOCK, op_count=30, schedule=RateSchedule(iops=1000))
+    engine.shutdown()
+
+    # requests queued behind the stall carry the wait in their latency
+    assert sum(1 for u in units if u[1] >= 0.03) >= 10
+
+
+def test_schedule_does_not_owe_time_between_steps(fd):
+    engine = IOEngine(1)
+    reads, writes = RateSchedule(iops=1000), RateSchedule(iops=1000)
+    engine.run(fd, False, lambda t: (t % BLOCKS * BLOCK, BLOCK), BLOCK, op_count=20, schedule=reads)
+    engine.run(fd, True, lambda t: (t % BLOCKS * BLOCK, BLOCK), BLOCK, op_count=20, schedule=writes)
+    time.sleep(0.1)
+    units, _ = engine.run(fd, False, lambda t: (t % BLOCKS * BLOCK, BLOCK), BLOCK, op_count=20, schedule=reads)
+    engine.shutdown()
+
+    # the reads keep their rate instead of bursting through the slots of the writes and the pause
+    assert units[-1][0] >= 0.015
+    assert max(u[1] for u in units) < 0.05
+
+
+@pytest.mark.parametrize("iodepth", [1, 4])
+def test_engine_hands_off_units_in_chunks(fd, iodepth, monkeypatch):
+    monkeypatch.setattr(io_engine, "HANDOFF_UNITS", 100)
+    chunks = []
+    engine = IOEngine(iodepth)
+    units, is_failed = engine.run(fd, False, lambda t: (t % BLOCKS * BLOCK, BLOCK), BLOCK, op_count=1000,
+                                  on_units=lambda chunk, end: chunks.append((chunk, end)))
+    engine.shutdown()
+
+    assert not is_failed
+    assert len(chunks) >= 9
+    assert all(len(chunk) <= 100 + iodepth for chunk, _ in chunks)
+    assert sum(len(chunk) for chunk, _ in chunks) + len(units) == 1000
+    assert [end for _, end in chunks] == sorted(end for _, end in chunks)
+
+
+def test_engine_stops_when_requested(fd):
+    stop_at = time.time() + 0.1
+    engine = IOEngine(4)
+    units, is_failed = engine.run(fd, False, lambda t: (t % BLOCKS * BLOCK, BLOCK), BLOCK,
+                                  time_end=time.time() + 10, schedule=RateSchedule(iops=100),
+                                  stop=lambda: time.time() >= stop_at)
+    engine.shutdown()
+
+    assert not is_failed
+    assert 0 < len(units) <= 15
+    assert units[-1][0] < 0.5
+
+
+def test_thread_keeps_one_engine():
+    first = get_engine(4)
+    assert get_engine(4) is first
+    second = get_engine(8)
+    release_engine()
+
+    assert second is not first
+    assert first._executor._shutdown
+    assert second._executor._shutdown
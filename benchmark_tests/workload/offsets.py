@@ -0,0 +1,63 @@
+import numpy as np
+
+from benchmark.model.profile import ProfileAccessDistribution, ProfileAccessDistributionType
+from benchmark.workload.offsets import OffsetStream, bounded_zipf
+
+FILE_SIZE = 64 * 1024 ** 2
+BLOCK = 4096
+
+
+def collect(stream, n):
+    requests = [stream(t) for t in range(n)]
+    return np.array([r[0] for r in requests]), np.array([r[1] for r in requests])
+
+
+def distribution(t, **kwargs):
+    return ProfileAccessDistribution(type=t, **kwargs)
+
+
+def test_uniform_offsets_are_aligned_and_in_file():
+    sizes = {BLOCK: 1, BLOCK * 16: 1}
+    offsets, block_sizes = collect(OffsetStream(FILE_SIZE, sizes, distribution(ProfileAccessDistributionType.UNIFORM)),
+                                   10000)
+
+    assert set(block_sizes) == set(sizes)
+    assert (offsets % block_sizes == 0).all()
+    assert (offsets + block_sizes <= FILE_SIZE).all()
+
+
+def test_sequential_offsets_with_stride():
+    stream = OffsetStream(FILE_SIZE, {BLOCK: 1}, distribution(ProfileAccessDistributionType.SEQUENTIAL, stride=BLOCK))
+    offsets, _ = collect(stream, 10000)
+
+    assert offsets[:4].tolist() == [0, 2 * BLOCK, 4 * BLOCK, 6 * BLOCK]
+    assert offsets[8192] == 0
+
+
+def test_hotspot_concentrates_ops():
+    stream = OffsetStream(FILE_SIZE, {BLOCK: 1}, distribution(ProfileAccessDistributionType.HOTSPOT,
+                                                              hot_ops_pct=90, hot_space_pct=10))
+    offsets, _ = collect(stream, 20000)
+
+    hot_share = (offsets < FILE_SIZE * 0.1).mean()
+    assert 0.87 < hot_share < 0.93
+
+
+def test_zipf_is_skewed_and_bounded():
+    ranks = bounded_zipf(np.random.default_rng(1), 1.2, 1000, 100000)
+
+    assert ranks.min() >= 0 and ranks.max() < 1000
+    assert (ranks == 0).mean() > 0.1
+
+    stream = OffsetStream(FILE_SIZE, {BLOCK: 1}, distribution(ProfileAccessDistributionType.ZIPF))
+    offsets, _ = collect(stream, 10000)
+    _, counts = np.unique(offsets, return_counts=True)
+    assert counts.max() > 100
+    assert (offsets + BLOCK <= FILE_SIZE).all()
+
+
+def test_stream_batches_are_bounded_by_op_count():
+    stream = OffsetStream(FILE_SIZE, {BLOCK: 1}, distribution(ProfileAccessDistributionType.UNIFORM), op_count=64)
+    collect(stream, 64)
+
+    assert len(stream._batches[0][0]) == 64
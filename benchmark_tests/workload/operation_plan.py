@@ -0,0 +1,44 @@
+import random
+from collections import Counter
+
+import pytest
+
+from benchmark.model.profile import ProfileOperation, ProfileOperationType, ProfileFileSelection, \
+    ProfileOperationSelectionType, ProfilePhase
+from benchmark.workload.operation_plan import OperationPlan, round_robin_cycle
+
+READ = ProfileOperation(mode=ProfileOperationType.READ, weight=70)
+WRITE = ProfileOperation(mode=ProfileOperationType.WRITE, weight=30, file_selection=ProfileFileSelection.NEW_FILE)
+
+
+def test_random_choice_follows_weights():
+    plan = OperationPlan([READ, WRITE], ProfileOperationSelectionType.RANDOM)
+    rng = random.Random(1)
+
+    counts = Counter(plan.choose(rng, True)[0] for _ in range(100_000))
+    assert abs(counts[0] / 100_000 - 0.7) < 0.01
+    # a thread without files can only create one
+    assert {plan.choose(rng, False)[0] for _ in range(100)} == {1}
+
+
+def test_sequential_choice_interleaves_weights():
+    assert round_robin_cycle([0.7, 0.3]) == [0, 1, 0, 0, 0, 1, 0, 0, 1, 0]
+    assert Counter(round_robin_cycle([2, 1, 1])) == {0: 2, 1: 1, 2: 1}
+
+    plan = OperationPlan([READ, WRITE], ProfileOperationSelectionType.SEQUENTIAL)
+    rng = random.Random(1)
+    assert [plan.choose(rng, True)[0] for _ in range(10)] == [0, 1, 0, 0, 0, 1, 0, 0, 1, 0]
+    assert plan.choose(rng, False)[0] == 1
+
+
+def test_small_weights_keep_their_share():
+    assert Counter(round_robin_cycle([0.001, 0.002])) == {0: 1, 1: 2}
+    assert Counter(round_robin_cycle([1, 0.001])) == {0: 999, 1: 1}
+
+
+def test_zero_weight_operations_are_skipped():
+    plan = OperationPlan([READ, WRITE.model_copy(update={"weight": 0})], ProfileOperationSelectionType.RANDOM)
+
+    assert {plan.choose(random.Random(1), True)[0] for _ in range(100)} == {0}
+    with pytest.raises(ValueError):
+        ProfilePhase(operations=[READ.model_copy(update={"weight": 0})])
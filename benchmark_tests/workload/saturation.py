@@ -0,0 +1,49 @@
+from benchmark.model.profile import ProfileSaturationSearch, ProfilePhase, ProfileOperation, ProfileOperationType, \
+    SaturationParameter
+from benchmark.model.results import SaturationProbe
+from benchmark.workload.saturation import SaturationSearch, probe_phase
+
+
+def run_search(search: SaturationSearch, iops, p99=lambda v: 0.001):
+    values = []
+    while (value := search.next_value()) is not None:
+        values.append(value)
+        search.add(SaturationProbe(phase_id=len(values), value=value, iops=iops(value), mbps=0, p99=p99(value)))
+    return values
+
+
+def test_plateau_is_narrowed_down_by_bisection():
+    # throughput grows linearly up to 12 threads
+    search = SaturationSearch(ProfileSaturationSearch(max_value=256))
+    values = run_search(search, lambda v: 1000 * min(v, 12))
+
+    assert values == [1, 2, 4, 8, 16, 32, 12, 10, 11]
+    result = search.result(1)
+    assert result.knee == 12 and result.stop_reason == "plateau"
+    assert [p.value for p in result.probes] == [1, 2, 4, 8, 10, 11, 12, 16, 32]
+
+
+def test_latency_limit_stops_the_search():
+    search = SaturationSearch(ProfileSaturationSearch(p99_limit_ms=5))
+    values = run_search(search, lambda v: 1000 * v, lambda v: v / 1000)
+
+    assert values == [1, 2, 4, 8, 6, 5]
+    result = search.result(1)
+    assert result.knee == 5 and result.stop_reason == "latency_limit"
+
+
+def test_search_ends_at_max_value():
+    search = SaturationSearch(ProfileSaturationSearch(max_value=6))
+
+    assert run_search(search, lambda v: 1000 * v) == [1, 2, 4, 6]
+    assert search.result(1).knee == 6
+
+
+def test_probe_phase_sets_searched_parameter():
+    phase = ProfilePhase(operations=[ProfileOperation(mode=ProfileOperationType.READ)],
+                         saturation=ProfileSaturationSearch(parameter=SaturationParameter.IODEPTH))
+
+    probe = probe_phase(phase, 16)
+    assert probe.saturation is None
+    assert probe.operations[0].iodepth == 16 and phase.operations[0].iodepth == 1
+    assert probe_phase(phase.model_copy(update={"saturation": ProfileSaturationSearch()}), 8).threads == 8
@@ -0,0 +1,26 @@
+import numpy as np
+
+from benchmark.model.profile import ProfileSteadyState
+from benchmark.workload.steady_state import evaluate_window
+
+CRITERION = ProfileSteadyState(window_sec=5, excursion_pct=20, slope_pct=10)
+
+
+def test_flat_throughput_is_steady():
+    result = evaluate_window(np.array([1000, 1050, 980, 1020, 990]), CRITERION)
+
+    assert result.reached
+    assert result.average == 1008
+    assert abs(result.excursion_pct - 70 / 1008 * 100) < 1e-9
+
+
+def test_rising_throughput_is_not_steady():
+    # every second is within the excursion limit, but the trend is not
+    result = evaluate_window(np.array([920, 960, 1000, 1040, 1080]), CRITERION)
+
+    assert result.excursion_pct < 20
+    assert not result.reached
+
+
+def test_idle_window_is_not_steady():
+    assert not evaluate_window(np.zeros(5), CRITERION).reached
@@ -0,0 +1,77 @@
+import datetime
+import os
+import threading
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmark.metrics.result_store import ResultStoreWriter, ResultStore, encode_batch, UNITS
+from benchmark.model.profile import ProfileOperationType
+from benchmark.model.results import StepResult
+from benchmark.workload.worker_pool import WorkerPool, wait_for_start, stop_requested, result_sink
+
+
+def started_at(worker_id):
+    wait_for_start()
+    return worker_id, os.getpid(), time.perf_counter()
+
+
+def run_until_stopped(worker_id):
+    wait_for_start()
+    deadline = time.time() + 10
+    while not stop_requested() and time.time() < deadline:
+        time.sleep(0.001)
+    return stop_requested()
+
+
+def test_workers_are_reused_and_start_together():
+    with WorkerPool(4) as pool:
+        first, _ = pool.run_phase(1, started_at, [(i,) for i in range(4)])
+        second, diskstatus = pool.run_phase(2, started_at, [(i,) for i in range(2)])
+
+    assert [r[0] for r in first] == [0, 1, 2, 3]
+    assert {r[1] for r in second} <= {r[1] for r in first}
+    assert max(r[2] for r in first) - min(r[2] for r in first) < 0.05
+    assert diskstatus == []
+
+
+def test_pool_grows_for_larger_phase_and_stops_on_signal():
+    with WorkerPool(1) as pool:
+        pool.run_phase(1, started_at, [(0,)])
+        task = time.time()
+        threading.Timer(0.2, pool.stop_phase).start()
+        stopped, _ = pool.run_phase(2, run_until_stopped, [(i,) for i in range(3)])
+        assert pool.processes == 3
+        pool.resize(1)
+        shrunk, _ = pool.run_phase(3, started_at, [(0,)])
+        assert pool.processes == 1
+
+    assert stopped == [True, True, True]
+    assert len(shrunk) == 1
+    assert time.time() - task < 5
+
+
+def stream_steps(phase_id, worker_id):
+    wait_for_start()
+    sink = result_sink(phase_id)
+    for first_step in range(0, 30, 10):
+        steps = [StepResult(filename=f"file-{worker_id}", operation_id=0, operation_type=ProfileOperationType.READ,
+                            operation_random_access=True, ops_cnt=1, bytes=4096, duration_sec=0.001,
+                            is_failed=False, time=datetime.datetime.now(), units=[(0.0, 0.001, 4096)])
+                 for _ in range(10)]
+        sink(encode_batch(steps, worker_id, first_step))
+    return 3
+
+
+def test_streamed_results_are_written_before_phase_returns():
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "run_store"
+        ResultStoreWriter(path)
+        with WorkerPool(2, result_store=path) as pool:
+            batches, _ = pool.run_phase(1, stream_steps, [(1, i) for i in range(2)])
+            pool.wait_results_written(1, sum(batches))
+
+            units = ResultStore(path).read_frame(UNITS)
+            assert len(units) == 60
+            assert sorted(units[units["thread_id"] == 1]["step_id"].tolist()) == list(range(30))
+            assert set(units["filename"]) == {"file-0", "file-1"}
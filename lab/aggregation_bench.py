@@ -0,0 +1,87 @@
+"""Сравнение старой и векторизованной группировки результатов на синтетических данных.
+
+python -m lab.aggregation_bench --rows 10000000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmark.aggregation.aggregation import add_axis, add_axis_labels, axis_keys, build_summary_data, \
+    build_xy_data, fields_by_metric, group_metric
+from benchmark.metrics.result_store import OPERATION_TYPES, WINDOWS
+from lab.utils import timemeasure
+
+
+def synthetic_units(rows: int, threads: int = 16, seconds: int = 600) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    start = np.datetime64("2025-01-01T12:00:00", "ns").astype(np.int64)
+    operation_id = rng.integers(0, 3, rows, dtype=np.uint16)
+    df = pd.DataFrame({
+        "phase_id": np.repeat(np.arange(1, 5, dtype=np.uint16), -(-rows // 4))[:rows],
+        "time": np.sort(start + rng.integers(0, seconds * 10 ** 9, rows)).view("datetime64[ns]"),
+        "thread_id": rng.integers(0, threads, rows, dtype=np.uint32),
+        "step_id": (np.arange(rows) // (256 * threads)).astype(np.uint32),
+        "operation_id": operation_id,
+        "operation_type": pd.Categorical.from_codes(operation_id % 2, categories=OPERATION_TYPES),
+        "window": pd.Categorical.from_codes(np.ones(rows, dtype=np.uint8), categories=WINDOWS),
+        "bytes": np.full(rows, 4096, dtype=np.uint32),
+        "duration": rng.exponential(1e-4, rows).astype(np.float32),
+    })
+    df["latency_ns"] = df["duration"] * 1000 * 1000
+    return df
+
+
+def legacy_per_steps(df, group_by, aggregation):
+    """Старая реализация: построчный apply, строковые метки времени и лямбды с np.percentile"""
+    df = df.copy()
+    if group_by == "time":
+        df["x"] = (df["time"].dt.floor(f"{aggregation}s")).astype(str)
+    else:
+        df["step_group"] = df["step_id"] // aggregation * aggregation
+        df["x"] = df.apply(lambda row: (row["phase_id"], row["step_group"]), axis=1)
+    group = df.groupby(["operation_type", "x"], observed=True).agg(
+        value=("latency_ns", lambda x: np.percentile(x, 99))).reset_index()
+    result = {}
+    for op in group["operation_type"].unique():
+        sub = group[group["operation_type"] == op]
+        result[op] = {"x": sub["x"].tolist(), "y": sub["value"].tolist()}
+    return result
+
+
+def vectorized_per_steps(df, group_by, aggregation):
+    df = add_axis(df.copy(deep=False), group_by, aggregation)
+    gb = ["operation_type", *axis_keys(group_by)]
+    group = group_metric(df.groupby(gb, observed=True)[fields_by_metric("latency_p99")], "latency_p99")
+    return build_xy_data(add_axis_labels(group, group_by), "value", "operation_type")
+
+
+def vectorized_summary(df):
+    group = group_metric(df.groupby(["phase_id", "operation_id"], observed=True)[["latency_ns"]], "latency")
+    return build_summary_data(group, "value", "phase_id", "operation_id")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=None,
+                        help="старую реализацию по шагам можно запустить на части строк, apply очень медленный")
+    args = parser.parse_args()
+
+    df = synthetic_units(args.rows)
+    print(f"{len(df)} строк, {df.memory_usage(deep=True).sum() / 1024 ** 2:.0f} MB")
+    for group_by, aggregation in (("time", 5), ("step", 5)):
+        legacy_df = df if args.legacy_rows is None or group_by == "time" else df.head(args.legacy_rows)
+        with timemeasure() as legacy:
+            legacy_per_steps(legacy_df, group_by, aggregation)
+        with timemeasure() as vectorized:
+            vectorized_per_steps(df, group_by, aggregation)
+        print(f"{group_by}: старая {legacy.formatted()} на {len(legacy_df)} строк, "
+              f"векторизованная {vectorized.formatted()} на {len(df)} строк")
+    with timemeasure() as summary:
+        vectorized_summary(df)
+    print(f"summary: {summary.formatted()}")
+
+
+if __name__ == "__main__":
+    main()